@@ -0,0 +1,98 @@
+# REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+"""
+Asynchronous EnLitePy (EV charging) simulations for the /ensite endpoint.
+
+The job id is the sha256 of the normalized EnLitePy payload, so identical requests share one simulation. Job progress
+and results are kept in the Django cache shared by the web and celery workers: results for ENLITEPY_RESULTS_TTL_SECONDS
+and a failed job for ENLITEPY_JOB_ERROR_SECONDS, after which it can be submitted again.
+"""
+import hashlib
+import json
+import os
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.core.cache import cache
+from django.utils import timezone
+logger = get_task_logger(__name__)
+
+ENLITEPY_RESULTS_TTL_SECONDS = int(os.environ.get('ENLITEPY_RESULTS_TTL_SECONDS', 7 * 24 * 3600))
+# A queued or running simulation blocks new ones with the same payload for at most this long
+ENLITEPY_JOB_TIMEOUT_SECONDS = int(os.environ.get('ENLITEPY_JOB_TIMEOUT_SECONDS', 3600))
+ENLITEPY_JOB_ERROR_SECONDS = 60
+
+
+def enlitepy_job_id(enlitepy_payload, include_debug_payload=False):
+    """
+    :return: str, sha256 of the canonical JSON of the payload (and whether the payload is echoed in the results)
+    """
+    canonical = json.dumps({"payload": enlitepy_payload, "includeDebugPayload": bool(include_debug_payload)},
+                           sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def enlitepy_job_key(job_id):
+    return "load_builder_enlitepy_job_{}".format(job_id)
+
+
+def enlitepy_results_key(job_id):
+    return "load_builder_enlitepy_results_{}".format(job_id)
+
+
+def get_enlitepy_results(job_id):
+    return cache.get(enlitepy_results_key(job_id))
+
+
+def save_enlitepy_results(job_id, results):
+    cache.set(enlitepy_results_key(job_id), results, timeout=ENLITEPY_RESULTS_TTL_SECONDS)
+
+
+def get_enlitepy_job(job_id):
+    """
+    :return: dict with the job_id, status ("Queued", "Running", "Completed" or "Error") and the results once completed
+        or error message if it failed; None for an unknown (or expired) job_id
+    """
+    results = get_enlitepy_results(job_id)
+    if results is not None:
+        return {"job_id": job_id, "status": "Completed", "results": results}
+    progress = cache.get(enlitepy_job_key(job_id))
+    if progress is None:
+        return None
+    job = {"job_id": job_id}
+    job.update(progress)
+    if job.get("started") is not None and job["status"] == "Running":
+        job["elapsed_seconds"] = round((timezone.now() - job["started"]).total_seconds(), 1)
+    return job
+
+
+def queue_enlitepy_job(enlitepy_payload, include_debug_payload=False):
+    """
+    Queue an EnLitePy simulation unless the same payload already has results or is queued or running.
+    :return: dict, see get_enlitepy_job
+    """
+    job_id = enlitepy_job_id(enlitepy_payload, include_debug_payload)
+    if get_enlitepy_results(job_id) is None:
+        progress = {"status": "Queued", "queued": timezone.now(), "started": None}
+        if cache.add(enlitepy_job_key(job_id), progress, timeout=ENLITEPY_JOB_TIMEOUT_SECONDS):
+            run_enlitepy_task.delay(job_id, enlitepy_payload, include_debug_payload)
+    return get_enlitepy_job(job_id)
+
+
+@shared_task
+def run_enlitepy_task(job_id, enlitepy_payload, include_debug_payload=False):
+    # imported here because load_builder.views imports this module
+    from load_builder.views import run_enlitepy
+
+    key = enlitepy_job_key(job_id)
+    progress = cache.get(key) or {"status": "Queued", "queued": timezone.now()}
+    progress.update({"status": "Running", "started": timezone.now()})
+    cache.set(key, progress, timeout=ENLITEPY_JOB_TIMEOUT_SECONDS)
+    try:
+        results = run_enlitepy(enlitepy_payload, include_debug_payload)
+    except Exception as e:
+        logger.error("EnLitePy job {} failed: {}".format(job_id, e))
+        progress.update({"status": "Error", "error": "EnLitePy execution failed: {}".format(e)})
+        cache.set(key, progress, timeout=ENLITEPY_JOB_ERROR_SECONDS)
+        return False
+    save_enlitepy_results(job_id, results)
+    cache.delete(key)
+    return True
@@ -1,8 +1,13 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
 import json
 import os
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
 from tastypie.test import ResourceTestCaseMixin
+from load_builder.views import _normalize_and_enrich
+from load_builder.tasks import enlitepy_job_id, enlitepy_job_key, enlitepy_results_key, get_enlitepy_job, \
+    run_enlitepy_task
 
 
 class TestLoadBuilder(ResourceTestCaseMixin, TestCase):
@@ -28,4 +33,85 @@ class TestLoadBuilder(ResourceTestCaseMixin, TestCase):
         self.assertEqual(list(csv_resp.keys())[0], 'critical_loads_kw')
 
         # Check that we get same result
-        self.assertEqual(json_resp, csv_resp)
\ No newline at end of file
+        self.assertEqual(json_resp, csv_resp)
+
+        # 15 minute load repeats each hourly value
+        r = self.api_client.post(self.submit_url + '?time_steps_per_hour=4', data=post)
+        subhourly_resp = json.loads(r.content)
+        self.assertEqual(len(subhourly_resp['critical_loads_kw']), 35040)
+        self.assertEqual(subhourly_resp['critical_loads_kw'][::4], csv_resp['critical_loads_kw'])
+
+    def test_ensite_annual_series_and_jobs(self):
+        week = [float(h % 24) * 1000 for h in range(168)]
+        results = {"timeseries": {"power_in_grid": week}}
+        _normalize_and_enrich(results)
+        annual = results["timeseries"]["power_in_grid_annual"]
+        self.assertEqual(len(annual), 8760)
+        self.assertEqual(annual, [x / 1000 for x in (week * 53)[:8760]])
+
+        # job ids do not depend on the order of the payload keys
+        payload = {"simConfig": {"tStart": 0, "tEnd": 604800}, "schemaVersion": 3}
+        self.assertEqual(enlitepy_job_id(payload), enlitepy_job_id(dict(reversed(list(payload.items())))))
+        self.assertNotEqual(enlitepy_job_id(payload), enlitepy_job_id(payload, include_debug_payload=True))
+
+        job_id = enlitepy_job_id(payload)
+        self.assertIsNone(get_enlitepy_job(job_id))
+        r = self.api_client.get('/v3/ensite/{}'.format(job_id))
+        self.assertEqual(r.status_code, 404)
+
+    def test_ensite_async_jobs(self):
+        week = [float(h % 24) * 1000 for h in range(168)]
+        payload = {"simConfig": {"tStart": 0, "tEnd": 604800}, "schemaVersion": 3, "test": "test_ensite_async_jobs"}
+        job_id = enlitepy_job_id(payload)
+        cache.delete_many([enlitepy_job_key(job_id), enlitepy_results_key(job_id)])
+        self.addCleanup(cache.delete_many, [enlitepy_job_key(job_id), enlitepy_results_key(job_id)])
+        enlitepyapi = mock.MagicMock()
+        enlitepyapi.run.side_effect = RuntimeError("simulation failed")
+
+        with mock.patch('load_builder.views.enlitepyapi', enlitepyapi), \
+                mock.patch.object(run_enlitepy_task, 'delay') as delay:
+            # queued until a worker runs the (eager) task
+            r = self.api_client.post('/v3/ensite/?async=true', format='json', data=payload)
+            self.assertEqual(r.status_code, 202)
+            self.assertEqual(json.loads(r.content)["job_id"], job_id)
+            self.assertEqual(json.loads(r.content)["status"], "Queued")
+            self.assertEqual(self.api_client.get('/v3/ensite/{}'.format(job_id)).status_code, 202)
+            # the same payload is not queued again
+            r = self.api_client.post('/v3/ensite/?async=true', format='json', data=payload)
+            self.assertEqual(r.status_code, 202)
+            self.assertEqual(delay.call_count, 1)
+
+            # a failed job is reported until its error expires (ENLITEPY_JOB_ERROR_SECONDS)
+            self.assertFalse(run_enlitepy_task.apply(args=delay.call_args.args).get())
+            r = self.api_client.get('/v3/ensite/{}'.format(job_id))
+            self.assertEqual(r.status_code, 500)
+            self.assertEqual(json.loads(r.content)["status"], "Error")
+            self.assertIn("simulation failed", json.loads(r.content)["error"])
+            r = self.api_client.post('/v3/ensite/?async=true', format='json', data=payload)
+            self.assertEqual(r.status_code, 500)
+            self.assertEqual(delay.call_count, 1)
+
+            # then it can be submitted again
+            cache.delete(enlitepy_job_key(job_id))
+            r = self.api_client.post('/v3/ensite/?async=true', format='json', data=payload)
+            self.assertEqual(r.status_code, 202)
+            self.assertEqual(delay.call_count, 2)
+            enlitepyapi.run.side_effect = lambda p: {"timeseries": {"power_in_grid": list(week)}}
+            self.assertTrue(run_enlitepy_task.apply(args=delay.call_args.args).get())
+            self.assertEqual(enlitepyapi.run.call_count, 2)
+
+            r = self.api_client.get('/v3/ensite/{}'.format(job_id))
+            self.assertEqual(r.status_code, 200)
+            job = json.loads(r.content)
+            self.assertEqual(job["status"], "Completed")
+            self.assertEqual(job["results"]["timeseries"]["power_in_grid_annual"], [x / 1000 for x in (week * 53)[:8760]])
+
+            # identical requests, asynchronous or not, are served from the cached results
+            r = self.api_client.post('/v3/ensite/?async=true', format='json', data=payload)
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(json.loads(r.content), job)
+            r = self.api_client.post('/v3/ensite/', format='json', data=payload)
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(json.loads(r.content)["results"], job["results"])
+            self.assertEqual(delay.call_count, 2)
+            self.assertEqual(enlitepyapi.run.call_count, 2)
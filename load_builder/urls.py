@@ -6,4 +6,5 @@ from . import views
 urlpatterns = [
     re_path(r'^load_builder/?$', views.load_builder),
     re_path(r'^ensite/?$', views.ensite_view),
+    re_path(r'^ensite/(?P<job_id>[0-9a-f]{64})/?$', views.ensite_job_view),
 ]
\ No newline at end of file
@@ -6,6 +6,8 @@ import sys
 import numpy as np
 from django.http import JsonResponse
 from reo.exceptions import UnexpectedError
+from load_builder.tasks import enlitepy_job_id, get_enlitepy_job, get_enlitepy_results, queue_enlitepy_job, \
+    save_enlitepy_results
 
 try:
     from ensitepy.simextension import enlitepyapi
@@ -269,8 +271,35 @@ def is_ui_input(data):
     # Default to UI format for safety
     return True
 
+def run_enlitepy(enlitepy_payload, include_debug_payload=False):
+    """
+    Run an EnLitePy simulation and annualize its results.
+    :return: dict, results returned by /ensite
+    """
+    results = enlitepyapi.run(enlitepy_payload)
+    if isinstance(results, dict) and 'logs' not in results:
+        results['logs'] = []
+    if include_debug_payload and isinstance(results, dict):
+        # Attach payload echo for debugging/audit (safe subset of request inputs)
+        results.setdefault('debug', {})
+        results['debug']['payloadEcho'] = enlitepy_payload
+        try:
+            results['logs'].append('Debug: payloadEcho attached (includes computed pChgMax values in Watts).')
+        except Exception:
+            pass
+    # Always normalize and annualize for client convenience
+    _normalize_and_enrich(results)
+    # Bump enrichment version to 2 to reflect unit change (power_in_grid_annual now in kW)
+    results.setdefault('version', 2)
+    return results
+
+
 def ensite_view(request):
-    """Enhanced EnLitePy endpoint that handles both UI inputs and direct payloads."""
+    """
+    Enhanced EnLitePy endpoint that handles both UI inputs and direct payloads.
+    With ?async=true the simulation is queued and the response (202) has a job_id to GET from /ensite/<job_id>.
+    Results are cached by payload, so repeated requests do not run the simulation again.
+    """
     if enlitepyapi is not None:
         try:
             if request.method == 'POST':
@@ -287,25 +316,20 @@ def ensite_view(request):
                         return JsonResponse({"Error": f"Failed to build EnLitePy payload: {e}"}, status=400)
                 else:
                     enlitepy_payload = input_data
-                try:
-                    results = enlitepyapi.run(enlitepy_payload)
-                    if isinstance(results, dict) and 'logs' not in results:
-                        results['logs'] = []
-                    if include_debug_payload and isinstance(results, dict):
-                        # Attach payload echo for debugging/audit (safe subset of request inputs)
-                        results.setdefault('debug', {})
-                        results['debug']['payloadEcho'] = enlitepy_payload
-                        try:
-                            results['logs'].append('Debug: payloadEcho attached (includes computed pChgMax values in Watts).')
-                        except Exception:
-                            pass
-                    # Always normalize and annualize for client convenience
-                    _normalize_and_enrich(results)
-                    # Bump enrichment version to 2 to reflect unit change (power_in_grid_annual now in kW)
-                    results.setdefault('version', 2)
-                    return JsonResponse({"results": results})
-                except Exception as e:
-                    return JsonResponse({"Error": f"EnLitePy execution failed: {e}"}, status=500)
+
+                if request.GET.get('async', '').lower() == 'true':
+                    job = queue_enlitepy_job(enlitepy_payload, include_debug_payload)
+                    return enlitepy_job_response(job)
+
+                job_id = enlitepy_job_id(enlitepy_payload, include_debug_payload)
+                results = get_enlitepy_results(job_id)
+                if results is None:
+                    try:
+                        results = run_enlitepy(enlitepy_payload, include_debug_payload)
+                    except Exception as e:
+                        return JsonResponse({"Error": f"EnLitePy execution failed: {e}"}, status=500)
+                    save_enlitepy_results(job_id, results)
+                return JsonResponse({"results": results})
             else:
                 return JsonResponse({"Error": "Must POST a JSON body for ensitepy."}, status=400)
         except Exception:
@@ -314,6 +338,22 @@ def ensite_view(request):
             return JsonResponse({"Error": err.message}, status=500)
     else:
         return JsonResponse({"Error": "ensitepy is not installed."}, status=500)
+
+
+def ensite_job_view(request, job_id):
+    """
+    Status of an asynchronous EnLitePy job, with its results once the status is "Completed"
+    """
+    job = get_enlitepy_job(job_id)
+    if job is None:
+        return JsonResponse({"Error": "Unknown or expired EnLitePy job_id {}".format(job_id)}, status=404)
+    return enlitepy_job_response(job)
+
+
+def enlitepy_job_response(job):
+    if job["status"] == "Error":
+        return JsonResponse(job, status=500)
+    return JsonResponse(job, status=200 if job["status"] == "Completed" else 202)
     
 
 def check_load_builder_inputs(loads_table):
@@ -356,11 +396,14 @@ def validate_load_builder_inputs(loads_table):
 def load_builder(request):
     """
     Convert the SolarResilient Component Load Builder CSV into an 8760 Load
-    :param request:
-    :return: 8760 list for critical_load_kw input into REOpt
+    :param request: optional time_steps_per_hour query parameter (1, 2, or 4) for a sub-hourly load
+    :return: 8760 (* time_steps_per_hour) list for critical_load_kw input into REOpt
     """
     try:
         if request.method == 'POST':
+            time_steps_per_hour = request.GET.get("time_steps_per_hour", "1")
+            if time_steps_per_hour not in ("1", "2", "4"):
+                return JsonResponse({"Error": "time_steps_per_hour must be 1, 2, or 4"})
             post = request.body
             try:
                 # Try to import JSON, then fall back to CSV
@@ -382,7 +425,7 @@ def load_builder(request):
                 return JsonResponse({"Error": "Some input values are invalid"})
 
             # Run conversion and respond
-            loads_kw = convert_loads(loads_table)
+            loads_kw = convert_loads(loads_table, int(time_steps_per_hour))
             return JsonResponse({"critical_loads_kw": loads_kw})
 
         else:
@@ -395,21 +438,14 @@ def load_builder(request):
         return JsonResponse({"Error": err.message}, status=500)
 
 
-def convert_loads(loads_table):
+def convert_loads(loads_table, time_steps_per_hour=1):
     """
     Generates critical load profile from critical load builder
     :param loads_table: (json string) contain data from load table
-    :return: (1 list) hourly load values (8,760 values) in kw
+    :param time_steps_per_hour: (int) 1, 2, or 4; each hourly value is repeated for sub-hourly time steps
+    :return: (1 list) load values (8,760 * time_steps_per_hour values) in kw
     """
 
-    class Load:
-        def __init__(self, power_total, start_hour, stop_hour, start_month, stop_month):
-            self.power_total = power_total
-            self.start_hour = start_hour
-            self.stop_hour = stop_hour
-            self.start_month = start_month
-            self.stop_month = stop_month
-
     def translate_months(string):
         """
         Translate month names to number
@@ -432,7 +468,8 @@ def convert_loads(loads_table):
         }
         return switcher.get(string, 0)
 
-    loads = []
+    # one (power, months, hours) period per row, or more if the row wraps around the end of the year or midnight
+    powers, start_months, stop_months, start_hours, stop_hours = [], [], [], [], []
     for row in loads_table:
         power = int(row["Power (W)"]) * int(row["Quantity"]) * (float(row["% Run Time"]) / 100) / 1000  # total hourly power in kW
         # checks if stop_month has a smaller value than start_month
@@ -455,30 +492,39 @@ def convert_loads(loads_table):
             hours.append((0, stop_hr))
         for (start_mo, stop_mo) in months:
             for (start_hr, stop_hr) in hours:
-                loads.append(Load(power, start_hr, stop_hr, start_mo, stop_mo))
+                powers.append(power)
+                start_months.append(start_mo)
+                stop_months.append(stop_mo)
+                start_hours.append(start_hr)
+                stop_hours.append(stop_hr)
+
+    # month x hour of day mask of each period (months are inclusive, stop hours exclusive)
+    month = np.arange(12)
+    hour = np.arange(24)
+    month_mask = (np.array(start_months, dtype=int)[:, None] <= month) & (np.array(stop_months, dtype=int)[:, None] >= month)
+    hour_mask = (np.array(start_hours, dtype=int)[:, None] <= hour) & (np.array(stop_hours, dtype=int)[:, None] > hour)
+    mask = month_mask[:, :, None] & hour_mask[:, None, :]
+    # summing over the first axis adds the periods in order, like adding them one at a time
+    month_hour_kw = np.add.reduce(np.array(powers, dtype=float)[:, None, None] * mask, axis=0) if powers \
+        else np.zeros((12, 24))
+    is_on = mask.any(axis=0) if powers else np.zeros((12, 24), dtype=bool)
+
     loads_kw = []
     days_per_month = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    for month in range(12):
-        number_days = days_per_month[month]
-        for days in range(number_days):
-            for hr in range(24):
-                hour_load = 0
-                for load in loads:
-                    if load.start_month <= month and load.stop_month >= month:
-                        if load.start_hour <= hr and load.stop_hour > hr:
-                            hour_load += load.power_total
-                loads_kw.append(hour_load)
+    for mo in range(12):
+        # hours without any load are int 0, as in the original loop
+        day_kw = [kw if on else 0 for kw, on in zip(month_hour_kw[mo].tolist(), is_on[mo].tolist())]
+        day_kw = [kw for kw in day_kw for _ in range(time_steps_per_hour)]
+        loads_kw.extend(day_kw * days_per_month[mo])
     return loads_kw
 
 # (Removed duplicate constant definitions that appeared earlier in file)
 
 def _replicate_to_8760(series):
+    """Tile a (weekly) series to 8760 values as a numpy array"""
     if not isinstance(series, list) or len(series) == 0:
         return series
-    if len(series) == 8760:
-        return series
-    reps = (8760 // len(series)) + 1
-    return (series * reps)[:8760]
+    return np.resize(np.asarray(series, dtype=float), 8760)
 
 def _annualize_equipment(stats_list):
     if not isinstance(stats_list, list):
@@ -534,9 +580,9 @@ def _normalize_and_enrich(results_dict):
     # Annual replication for timeseries
     if isinstance(timeseries, dict) and 'power_in_grid' in timeseries:
         annual_series = _replicate_to_8760(timeseries['power_in_grid'])
-        if isinstance(annual_series, list) and len(annual_series) == 8760:
+        if isinstance(annual_series, np.ndarray):
             # Convert from W (simulation native) to kW for annual series exposure
-            timeseries['power_in_grid_annual'] = [x / 1000 for x in annual_series]
+            timeseries['power_in_grid_annual'] = (annual_series / 1000).tolist()
     equip_annual = _annualize_equipment(equipment) if equipment else []
     ev_annual = _annualize_ev(evstats) if evstats else []
     if equip_annual:
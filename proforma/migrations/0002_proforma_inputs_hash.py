@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proforma', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proforma',
+            name='inputs_hash',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -2,10 +2,10 @@
 from django.db import models
 import uuid
 import os
-import datetime, tzlocal
+from django.utils import timezone
 from reo.models import ScenarioModel
 import logging
-from proforma.proforma_generator import generate_proforma
+from proforma.proforma_generator import generate_proforma, proforma_inputs_hash
 log = logging.getLogger(__name__)
 
 
@@ -21,6 +21,7 @@ class ProForma(models.Model):
     )
     uuid = models.UUIDField(default=uuid.uuid4, null=False)
     spreadsheet_created = models.DateTimeField(null=True)
+    inputs_hash = models.TextField(null=True, blank=True)  # proforma_inputs_hash of the saved spreadsheet
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     
@@ -48,8 +49,26 @@ class ProForma(models.Model):
             os.makedirs(folder)
         return os.path.join(folder, self.output_file_name)
           
-    def generate_spreadsheet(self):
+    def is_stale(self, inputs_hash):
+        """
+        :return: True if the spreadsheet has not been generated, is missing from storage, or was generated from other
+            inputs (or by another version of the generator)
+        """
+        return self.spreadsheet_created is None or self.inputs_hash != inputs_hash \
+            or not os.path.exists(self.output_file)
+
+    def generate_spreadsheet(self, inputs_hash=None):
         log.info("Generating proforma spreadsheet")
-        generate_proforma(self.scenariomodel, self.output_file)
-        self.spreadsheet_created = tzlocal.get_localzone().localize(datetime.datetime.now())
+        if inputs_hash is None:
+            inputs_hash = proforma_inputs_hash(self.scenariomodel)
+        # write next to the output file and rename it, so that concurrent downloads never read a partial spreadsheet
+        tmp_file = "{}.{}.tmp".format(self.output_file, os.getpid())
+        try:
+            generate_proforma(self.scenariomodel, tmp_file)
+            os.replace(tmp_file, self.output_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        self.inputs_hash = inputs_hash
+        self.spreadsheet_created = timezone.now()
         return True
@@ -1,9 +1,13 @@
+import hashlib
+import io
+import json
 import os
+from functools import lru_cache
 import numpy as np
 from openpyxl.styles import PatternFill, Border, Font, Side, Alignment
 from reo.models import SiteModel, LoadProfileModel, PVModel, WindModel, GeneratorModel, StorageModel, FinancialModel, \
     ElectricTariffModel, CHPModel, AbsorptionChillerModel, HotTESModel, ColdTESModel, FuelTariffModel, BoilerModel, \
-    SteamTurbineModel, GHPModel
+    SteamTurbineModel, GHPModel, ScenarioModel
 from openpyxl import load_workbook
 from reo.src.data_manager import big_number
 from reo.nested_inputs import macrs_five_year, macrs_seven_year
@@ -11,6 +15,73 @@ from reo.utilities import empty_record
 
 one_party_workbook = os.path.join('proforma', 'REoptCashFlowTemplateOneParty.xlsx')
 third_party_workbook = os.path.join('proforma', 'REoptCashFlowTemplateThirdPartyOwner.xlsx')
+# every model that generate_proforma reads, see results_hash
+proforma_models = (ScenarioModel, StorageModel, PVModel, WindModel, GeneratorModel, ElectricTariffModel, FinancialModel,
+                   SiteModel, LoadProfileModel, CHPModel, AbsorptionChillerModel, ColdTESModel, HotTESModel,
+                   FuelTariffModel, BoilerModel, SteamTurbineModel, GHPModel)
+
+
+@lru_cache(maxsize=None)
+def get_template(path):
+    """
+    :return: bytes of the workbook template, read from disk once per process
+    """
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def load_template(path):
+    """
+    :return: new openpyxl Workbook of the template (with its VBA) parsed from the bytes cached in memory
+    """
+    return load_workbook(io.BytesIO(get_template(path)), read_only=False, keep_vba=True)
+
+
+@lru_cache(maxsize=None)
+def get_generator_signature():
+    """
+    :return: str, sha256 of the templates and of this module, so that spreadsheets are regenerated when either changes
+    """
+    signature = hashlib.sha256()
+    for path in (one_party_workbook, third_party_workbook, os.path.abspath(__file__)):
+        with open(path, 'rb') as f:
+            signature.update(f.read())
+    return signature.hexdigest()
+
+
+def results_hash(run_uuid):
+    """
+    :return: str, sha256 of every database record of run_uuid that the spreadsheet is generated from, including the
+        time series, so it is saved on the ScenarioModel and only recomputed after ModelManager.update clears it
+    """
+    results = hashlib.sha256()
+    for model in proforma_models:
+        records = list(model.objects.filter(run_uuid=run_uuid).order_by('pk').values())
+        for record in records:
+            record.pop("results_hash", None)
+        results.update(json.dumps([model.__name__, records], sort_keys=True, default=str).encode("utf-8"))
+    return results.hexdigest()
+
+
+def save_results_hash(run_uuid):
+    """
+    Store results_hash on the ScenarioModel
+    :return: str, results_hash
+    """
+    h = results_hash(run_uuid)
+    ScenarioModel.objects.filter(run_uuid=run_uuid).update(results_hash=h)
+    return h
+
+
+def proforma_inputs_hash(scenariomodel):
+    """
+    :return: str, sha256 of the saved ScenarioModel.results_hash and of the generator itself; a spreadsheet generated
+        with the same hash is identical
+    """
+    h = scenariomodel.results_hash
+    if not h:  # first download since the results were saved
+        h = scenariomodel.results_hash = save_results_hash(scenariomodel.run_uuid)
+    return hashlib.sha256((get_generator_signature() + h).encode("utf-8")).hexdigest()
 
 
 def generate_proforma(scenariomodel, output_file_path):
@@ -60,11 +131,11 @@ def generate_proforma(scenariomodel, output_file_path):
 
     # Open file for reading
     if financial.third_party_ownership is True:
-        wb = load_workbook(third_party_workbook, read_only=False, keep_vba=True)
+        wb = load_template(third_party_workbook)
         third_party_cashflow_sheet_name = 'Third-party Owner Cash Flow'
         host_cashflow_sheet_name = 'Host Cash Flow'
     else:
-        wb = load_workbook(one_party_workbook, read_only=False, keep_vba=True)
+        wb = load_template(one_party_workbook)
         third_party_cashflow_sheet_name = 'Optimal Cash Flow'
         host_cashflow_sheet_name = 'BAU Cash Flow'
 
@@ -1,13 +1,18 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
-import tzlocal
 import json
-import datetime
+import os
+import uuid
+from unittest import mock
 from django.test import TestCase
+from django.utils import timezone
 from tastypie.test import ResourceTestCaseMixin
+from proforma.models import ProForma
+from proforma.proforma_generator import get_template, load_template, one_party_workbook, proforma_inputs_hash
+from reo.models import FinancialModel, ScenarioModel
 
 
 def now():
-    return tzlocal.get_localzone().localize(datetime.datetime.now())
+    return timezone.now()
 
 
 class CashFlowTest(ResourceTestCaseMixin, TestCase):
@@ -42,4 +47,72 @@ class CashFlowTest(ResourceTestCaseMixin, TestCase):
         # status = response['outputs']['Scenario']['status']
         self.assertDictEqual(response,
                              {u'outputs': {u'Scenario': {u'status': u'error'}},
-                              u'messages': {u'error': u'badly formed hexadecimal UUID string'}})
\ No newline at end of file
+                              u'messages': {u'error': u'badly formed hexadecimal UUID string'}})
+
+    def test_template_and_staleness(self):
+        get_template.cache_clear()
+        wb1 = load_template(one_party_workbook)
+        wb2 = load_template(one_party_workbook)
+        self.assertEqual(get_template.cache_info().misses, 1)
+        wb1['Inputs and Outputs']['A1'] = "changed"
+        self.assertNotEqual(wb2['Inputs and Outputs']['A1'].value, "changed")
+        self.assertIsNotNone(wb2.vba_archive)
+
+        scenario = ScenarioModel.create(run_uuid=uuid.uuid4(), status="optimal")
+        financial = FinancialModel.create(run_uuid=scenario.run_uuid, analysis_years=25)
+        pf = ProForma.create(scenariomodel=scenario)
+        inputs_hash = proforma_inputs_hash(scenario)
+        self.assertTrue(pf.is_stale(inputs_hash))
+
+        pf.inputs_hash = inputs_hash
+        pf.spreadsheet_created = now()
+        open(pf.output_file, 'wb').close()
+        try:
+            scenario = ScenarioModel.objects.get(run_uuid=scenario.run_uuid)
+            self.assertIsNotNone(scenario.results_hash)  # saved by the first proforma_inputs_hash
+            self.assertFalse(pf.is_stale(proforma_inputs_hash(scenario)))
+            # results are saved again with ModelManager.update, which clears results_hash
+            financial.analysis_years = 20
+            financial.save()
+            ScenarioModel.objects.filter(run_uuid=scenario.run_uuid).update(results_hash=None)
+            scenario = ScenarioModel.objects.get(run_uuid=scenario.run_uuid)
+            self.assertTrue(pf.is_stale(proforma_inputs_hash(scenario)))
+        finally:
+            os.remove(pf.output_file)
+
+    def test_proforma_download_is_reused(self):
+        """
+        Downloading the proforma again should stream the saved spreadsheet, until the results change
+        """
+        scenario = ScenarioModel.create(run_uuid=uuid.uuid4(), status="optimal")
+        financial = FinancialModel.create(run_uuid=scenario.run_uuid, analysis_years=25)
+        proforma_url = self.proforma_url.replace('<run_uuid>', str(scenario.run_uuid))
+
+        def fake_generate_proforma(scenariomodel, output_file_path):
+            with open(output_file_path, 'wb') as f:
+                f.write("spreadsheet {}".format(generate.call_count).encode("utf-8"))
+
+        with mock.patch('proforma.models.generate_proforma', side_effect=fake_generate_proforma) as generate:
+            try:
+                contents = []
+                for _ in range(2):
+                    resp = self.api_client.get(proforma_url)
+                    self.assertEqual(resp.status_code, 200)
+                    contents.append(b"".join(resp.streaming_content))
+                self.assertEqual(generate.call_count, 1)
+                self.assertEqual(contents, [b"spreadsheet 1"] * 2)
+                pf = ProForma.objects.get(scenariomodel=scenario)
+                self.assertIsNotNone(pf.spreadsheet_created)
+                self.assertIsNotNone(pf.inputs_hash)
+
+                # saving new results clears results_hash
+                financial.analysis_years = 20
+                financial.save()
+                ScenarioModel.objects.filter(run_uuid=scenario.run_uuid).update(results_hash=None)
+                resp = self.api_client.get(proforma_url)
+                self.assertEqual(b"".join(resp.streaming_content), b"spreadsheet 2")
+                self.assertEqual(generate.call_count, 2)
+            finally:
+                pf = ProForma.objects.filter(scenariomodel=scenario).first()
+                if pf is not None and os.path.exists(pf.output_file):
+                    os.remove(pf.output_file)
@@ -5,8 +5,8 @@ import uuid
 import traceback
 from django.http import JsonResponse
 from proforma.models import ProForma, ScenarioModel
-from django.http import HttpResponse
-from wsgiref.util import FileWrapper
+from proforma.proforma_generator import proforma_inputs_hash
+from django.http import FileResponse, HttpResponse
 from reo.exceptions import UnexpectedError
 
 
@@ -39,12 +39,14 @@ def proforma(request, run_uuid):
         except:
             pf = ProForma.create(scenariomodel=scenario)
 
-        pf.generate_spreadsheet()
-        pf.save()
+        # reuse the saved spreadsheet unless the results (or the generator) changed since it was generated
+        inputs_hash = proforma_inputs_hash(scenario)
+        if pf.is_stale(inputs_hash):
+            pf.generate_spreadsheet(inputs_hash)
+            pf.save()
 
-        wrapper = FileWrapper(open(pf.output_file, "rb"))
- 
-        response = HttpResponse(wrapper, content_type='application/vnd.ms-excel.sheet.macroEnabled.12')
+        # streamed from storage in chunks
+        response = FileResponse(open(pf.output_file, "rb"), content_type='application/vnd.ms-excel.sheet.macroEnabled.12')
         response['Content-Length'] = os.path.getsize(pf.output_file)
         response['Content-Disposition'] = 'attachment; filename=%s' % (pf.output_file_name)
         return response
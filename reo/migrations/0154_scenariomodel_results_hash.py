@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reo', '0153_merge_20230329_1652'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scenariomodel',
+            name='results_hash',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
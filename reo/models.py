@@ -98,6 +98,8 @@ class ScenarioModel(models.Model):
 
     include_climate_in_objective = models.BooleanField(null=True, blank=True)
     include_health_in_objective = models.BooleanField(null=True, blank=True)
+    # sha256 of the saved results, computed by the first proforma download and cleared by ModelManager.update
+    results_hash = models.TextField(null=True, blank=True)
 
     @classmethod
     def create(cls, **kwargs):
@@ -1369,7 +1371,8 @@ class ModelManager(object):
             else:
                 MessageModel.create(run_uuid=run_uuid, message_type=message_type, message=message)
         # Do this last so that the status does not change to optimal before the rest of the results are filled in
-        ScenarioModel.objects.filter(run_uuid=run_uuid).update(**attribute_inputs(d))  # force_update=True
+        # Clearing results_hash marks a saved proforma spreadsheet as stale (see proforma.proforma_generator)
+        ScenarioModel.objects.filter(run_uuid=run_uuid).update(results_hash=None, **attribute_inputs(d))  # force_update=True
 
     @staticmethod
     def update_scenario_and_messages(data, run_uuid):
@@ -1487,6 +1490,7 @@ class ModelManager(object):
                 raise Exception
         scenario_data = remove_ids(model_to_dict(scenario_model))
         del scenario_data['job_type']
+        del scenario_data['results_hash']
         resp['outputs']['Scenario'] = scenario_data
         resp['outputs']['Scenario']['run_uuid'] = str(run_uuid)
         resp['outputs']['Scenario']['Site'] = remove_ids(model_to_dict(SiteModel.objects.get(run_uuid=run_uuid)))
@@ -4,9 +4,10 @@ import copy
 import math
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import namedtuple
 from reo.utilities import degradation_factor, get_climate_zone_and_nearest_city
+from reo.src.reference_profiles import get_normalized_profile, get_month_index
 import logging
 from reo.exceptions import LoadProfileError
 log = logging.getLogger(__name__)
@@ -17,6 +18,7 @@ load_type_file_map = {"Electric": "Load8760_norm_",
                         "SpaceHeating": "SpaceHeating8760_norm_",
                         "DHW": "DHW8760_norm_",
                         "Cooling": "Cooling8760_norm_"}
+space_heating_fraction_flat_load = json.load(open(os.path.join(library_path_base, 'space_heating_fraction_flat_load.json'), 'rb'))
 
 default_annual_electric_loads = {
       "Albuquerque": {
@@ -451,9 +453,9 @@ class BuiltInProfile(object):
     def built_in_profile(self):
         if self.monthly_energy in [None, []]:
             if self.doe_reference_name in ['FlatLoad'] + self.flatload_alternate_options:
-                return [ld * self.annual_energy * self.heating_fraction[0] for ld in self.custom_normalized_flatload]            
+                return (np.array(self.custom_normalized_flatload) * self.annual_energy * self.heating_fraction[0]).tolist()
             else:
-                return [ld * self.annual_energy for ld in self.normalized_profile]
+                return (self.normalized_profile * self.annual_energy).tolist()
         return self.monthly_scaled_profile
 
     @property
@@ -515,60 +517,29 @@ class BuiltInProfile(object):
 
     @property
     def monthly_scaled_profile(self):
-
-        load_profile = []
-
-        datetime_current = datetime(self.year, 1, 1, 0)
-        month_total = 0
-        month_scale_factor = []
-
         if self.doe_reference_name in ['FlatLoad'] + self.flatload_alternate_options:
-            normalized_profile = self.custom_normalized_flatload
+            normalized_profile = np.array(self.custom_normalized_flatload)
         else:
             normalized_profile = self.normalized_profile
-        
-        for load in normalized_profile:
-            month = datetime_current.month
-            # Monthly total based on annual_energy (sum of monthly_energy) and the normalized profile, later used to scale actual monthly energy
-            month_total += self.annual_energy * load
-
-            # add an hour
-            datetime_current = datetime_current + timedelta(0, 0, 0, 0, 0, 1, 0)
-
-            if month != datetime_current.month:
-                if month_total == 0:
-                    month_scale_factor.append(0)
-                else:
-                    month_scale_factor.append(float(self.monthly_energy[month - 1] / month_total * self.heating_fraction[month - 1]))
-                month_total = 0
+        month_index = get_month_index(self.year, len(normalized_profile))
+        heating_fraction = self.heating_fraction
+        # Monthly totals based on annual_energy (sum of monthly_energy) and the normalized profile, used to scale actual monthly energy
+        annual_energy_profile = self.annual_energy * normalized_profile
+        month_totals = np.bincount(month_index, weights=annual_energy_profile, minlength=12).tolist()
+        month_scale_factor = np.array([0 if month_total == 0 else
+                                       float(self.monthly_energy[m] / month_total * heating_fraction[m])
+                                       for m, month_total in enumerate(month_totals)])
 
-        datetime_current = datetime(self.year, 1, 1, 0)
-
-        for load in normalized_profile:
-            month = datetime_current.month
-
-            load_profile.append(self.annual_energy * load * month_scale_factor[month - 1])
-
-            # add an hour
-            datetime_current = datetime_current + timedelta(0, 0, 0, 0, 0, 1, 0)
-
-        return load_profile
+        return (annual_energy_profile * month_scale_factor[month_index]).tolist()
 
     @property
     def normalized_profile(self):
-        profile_path = os.path.join(self.library_path,
-                                    self.builtin_profile_prefix + self.city + "_" + self.building_type + ".dat")
-        normalized_profile = list()
-        f = open(profile_path, 'r')
-        for line in f:
-            normalized_profile.append(float(line.strip('\n')))
-
-        return normalized_profile
+        return get_normalized_profile(self.library_path, self.builtin_profile_prefix,
+                                      self.city + "_" + self.building_type)
 
     @property
     def heating_fraction(self):
         if self.load_type == "SpaceHeating":
-            space_heating_fraction_flat_load = json.load(open(os.path.join(library_path_base, 'space_heating_fraction_flat_load.json'), 'rb'))
             if self.user_entered_space_heating_fraction in [None, []]:
                 heating_fraction = [space_heating_fraction_flat_load[self.city] for _ in range(12)]
             elif len(self.user_entered_space_heating_fraction) == 1:
@@ -576,7 +547,6 @@ class BuiltInProfile(object):
             else:
                 heating_fraction = self.user_entered_space_heating_fraction
         elif self.load_type == "DHW":
-            space_heating_fraction_flat_load = json.load(open(os.path.join(library_path_base, 'space_heating_fraction_flat_load.json'), 'rb'))
             if self.user_entered_space_heating_fraction in [None, []]:
                 heating_fraction = [1.0 - space_heating_fraction_flat_load[self.city] for _ in range(12)]
             elif len(self.user_entered_space_heating_fraction) == 1:
@@ -1,11 +1,52 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
-import requests
+import hashlib
 import json
+import os
+import re
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.core.cache import caches
 import keys
 import logging
 from reo.exceptions import PVWattsDownloadError
 log = logging.getLogger(__name__)
 
+CONNECT_TIMEOUT_SECONDS = 10
+READ_TIMEOUT_SECONDS = float(os.environ.get('PVWATTS_READ_TIMEOUT_SECONDS', 60))
+RETRIES = 3
+
+_session = None
+_session_pid = None
+
+
+def get_pvwatts_session():
+    """
+    One requests.Session per process, with a connection pool and bounded retries with backoff for failed connections,
+    rate limiting and server errors
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        _session = requests.Session()
+        _session.mount("https://", HTTPAdapter(
+            pool_maxsize=10,
+            max_retries=Retry(total=RETRIES, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                              allowed_methods=["GET"], raise_on_status=False)
+        ))
+        _session.mount("http://", _session.get_adapter("https://"))
+        _session_pid = os.getpid()
+    return _session
+
+
+def pvwatts_cache_key(url):
+    """
+    :param url: str, PVWatts query
+    :return: str, key of the query without the api_key, so that every user shares the cached responses
+    """
+    query = re.sub(r"api_key=[^&]*", "", url)
+    return "pvwatts_" + hashlib.sha256(query.encode("utf-8")).hexdigest()
+
 
 def check_pvwatts_response_data(resp):
     """
@@ -122,9 +163,19 @@ class PVWatts:
                     if self.longitude < 67.0 or self.longitude > 81.5 or self.latitude < -43.8 or self.latitude > 38.0: 
                         self.dataset = 'intl'
                         self.radius = self.radius *2
-            resp = requests.get(self.url, verify=self.verify)
-            log.info("PVWatts API query successful.")
-            data = check_pvwatts_response_data(resp)
+            # hourly responses are cached by query (see the 'pvwatts' cache in the settings)
+            key = pvwatts_cache_key(self.url)
+            data = caches['pvwatts'].get(key)
+            if data is None:
+                try:
+                    resp = get_pvwatts_session().get(self.url, verify=self.verify,
+                                                     timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS))
+                except requests.exceptions.RequestException as e:
+                    raise_pvwatts_exception("PVWatts API query failed: {}".format(e))
+                log.info("PVWatts API query successful.")
+                data = check_pvwatts_response_data(resp)
+                if resp.status_code == 200 and not data.get("errors") and "outputs" in data:
+                    caches['pvwatts'].set(key, data)
             self.response = data
         return self.response
 
@@ -140,33 +191,22 @@ class PVWatts:
                 ac_hourly = [0] * 8760
 
             dc_nameplate = self.system_capacity * 1000  # W
-            prod_factor = []
+            # degradation (levelization factor) applied in mosel model
+            prod_factor_hourly = np.array([round(ac / dc_nameplate, 4) for ac in ac_hourly[:8760]])
 
             # subhourly (i.e 15 minute data)
             if self.time_steps_per_hour >= 1:
-                timesteps = []
-                timesteps_base = range(0, 8760)
-                for ts_b in timesteps_base:
-                    for step in range(0, self.time_steps_per_hour):
-                       timesteps.append(ts_b)
+                prod_factor = np.repeat(prod_factor_hourly, self.time_steps_per_hour).tolist()
 
             # downscaled run (i.e 288 steps per year)
             else:
-                timesteps = range(0, 8760, int(1 / self.time_steps_per_hour))
-
-            for hour in timesteps:
-                # degradation (levelization factor) applied in mosel model
-                prod_factor.append(round(ac_hourly[hour]/ dc_nameplate, 4))
+                prod_factor = prod_factor_hourly[::int(1 / self.time_steps_per_hour)].tolist()
 
         else:
-            prod_factor_original = list()
-            import os
-            with open(os.path.join('reo', 'tests', 'offline_pv_prod_factor.txt'), 'r') as f:
-                for line in f:
-                    prod_factor_original.append(float(line.strip('\n')))
+            prod_factor_original = np.loadtxt(os.path.join('reo', 'tests', 'offline_pv_prod_factor.txt'))
 
             # offline_pv_prod_factor.txt has 8760 rows, thus modifying prod_factor list
             # to have 8760 * time_steps_per_hour values
-            prod_factor = [val for val in prod_factor_original for _ in range(self.time_steps_per_hour)]
+            prod_factor = np.repeat(prod_factor_original, self.time_steps_per_hour).tolist()
 
         return prod_factor
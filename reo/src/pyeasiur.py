@@ -8,6 +8,7 @@ import h5py
 import numpy as np
 import pyproj
 import os
+from functools import lru_cache
 
 # print(f"This module uses the following packages")
 # print(f"deepdish: {deepdish.__version__}")
@@ -109,6 +110,8 @@ DATUM_WGS84 = pyproj.Proj("epsg:4326 +proj=longlat +ellps=WGS84 +datum=WGS84 +no
 def get_EASIUR2005(stack, pop_year=2005, income_year=2005, dollar_year=2010):
     """Returns EASIUR for a given `stack` height in a dict.
 
+    The adjusted maps are cached per process, so the arrays are read-only.
+
     Args:
         stack: area, p150, p300
         pop_year: population year
@@ -120,39 +123,85 @@ def get_EASIUR2005(stack, pop_year=2005, income_year=2005, dollar_year=2010):
         print("stack should be one of 'area', 'p150', 'p300'")
         return False
 
-    file_2005 = "sc_8.6MVSL_" + stack + "_pop2005.hdf5"
+    if income_year != 2005 and income_year not in MorIncomeGrowthAdj:
+        print("income year must be between 1990 to 2024")
+        return False
+
+    if dollar_year != 2010 and dollar_year not in GDP_deflator:
+        print("Dollar year must be between 1980 to 2010")
+        return False
+
+    return dict(get_adjusted_EASIUR2005(stack, pop_year, income_year, dollar_year))
+
+
+@lru_cache(maxsize=None)
+def load_EASIUR_map(filename):
+    """Returns the maps in an EASIUR_Data HDF5 file as read-only arrays, loaded once per process"""
+
+    ret_map = deepdish.io.load(os.path.join(library_path, 'EASIUR_Data', filename))
+    for v in ret_map.values():
+        v.setflags(write=False)
+    return ret_map
+
 
-    #ret_map = deepdish.io.load("data/EASIUR_Data/" + file_2005)
-    ret_map = deepdish.io.load(os.path.join(library_path, 'EASIUR_Data', file_2005))
+@lru_cache(maxsize=32)
+def get_adjusted_EASIUR2005(stack, pop_year, income_year, dollar_year):
+    """Returns EASIUR for a given `stack` height adjusted to the population, income and dollar years"""
+
+    ret_map = dict(load_EASIUR_map("sc_8.6MVSL_" + stack + "_pop2005.hdf5"))
 
     if pop_year != 2005:
-        filename = "sc_growth_rate_pop2005_pop2040_" + stack + ".hdf5"
-        map_rate = deepdish.io.load(os.path.join(library_path, 'EASIUR_Data', filename))
+        map_rate = load_EASIUR_map("sc_growth_rate_pop2005_pop2040_" + stack + ".hdf5")
 
         for k, v in map_rate.items():
             ret_map[k] = ret_map[k] * (v ** (pop_year - 2005))
 
     if income_year != 2005:
-        try:
-            adj = MorIncomeGrowthAdj[income_year] / MorIncomeGrowthAdj[2005]
-            for k, v in ret_map.items():
-                ret_map[k] = v * adj
-        except KeyError:
-            print("income year must be between 1990 to 2024")
-            return False
+        adj = MorIncomeGrowthAdj[income_year] / MorIncomeGrowthAdj[2005]
+        for k, v in ret_map.items():
+            ret_map[k] = v * adj
 
     if dollar_year != 2010:
-        try:
-            adj = GDP_deflator[dollar_year] / GDP_deflator[2010]
-            for k, v in ret_map.items():
-                ret_map[k] = v * adj
-        except KeyError:
-            print("Dollar year must be between 1980 to 2010")
-            return False
+        adj = GDP_deflator[dollar_year] / GDP_deflator[2010]
+        for k, v in ret_map.items():
+            ret_map[k] = v * adj
 
+    for v in ret_map.values():
+        v.setflags(write=False)
     return ret_map
 
 
+def get_EASIUR2005_at(lons, lats, stack, pop_year=2005, income_year=2005, dollar_year=2010, datum="NAD83"):
+    """Returns EASIUR at each (lon, lat) in a dict of arrays, which are nan where a location is outside the CAMx grid.
+
+    Args:
+        lons, lats: sequences of longitudes and latitudes
+        stack, pop_year, income_year, dollar_year: see get_EASIUR2005
+        datum: NAD83 or WGS84
+    """
+
+    easiur = get_EASIUR2005(stack, pop_year=pop_year, income_year=income_year, dollar_year=dollar_year)
+    if easiur is False:
+        return False
+
+    # same as g2l, which only broadcasts for a single location; x and y start from 1 in the CAMx grid convention
+    x, y = get_transformer(datum, True).transform(np.atleast_1d(np.asarray(lons, dtype=float)),
+                                                  np.atleast_1d(np.asarray(lats, dtype=float)))
+    x, y = np.asarray(x) / 36000.0 + 1, np.asarray(y) / 36000.0 + 1
+    inside = np.isfinite(x) & np.isfinite(y)
+    x[inside], y[inside] = np.round(x[inside]) - 1, np.round(y[inside]) - 1
+    shape = next(iter(easiur.values())).shape
+    inside &= (x >= 0) & (x < shape[0]) & (y >= 0) & (y < shape[1])
+    x, y = x[inside].astype(int), y[inside].astype(int)
+
+    ret = dict()
+    for k, v in easiur.items():
+        values = np.full(len(inside), np.nan)
+        values[inside] = v[x, y]
+        ret[k] = values
+    return ret
+
+
 def get_pop_inc(year, min_age=30):
     """Returns population and incidence (or mortality) rate of `min_age` or older for a given `year`."""
 
@@ -174,33 +223,38 @@ def get_pop_inc_raw(year, min_age=30):
     Raw data (CSV files) were derived from BenMAP
     """
 
-#    with open("data/EASIUR_Data/PopInc/popinc" + str(year) + ".CSV", newline="") as f:
+    pop, inc = load_pop_inc_raw(year, min_age)
+    return pop.copy(), inc.copy()
+
+
+@lru_cache(maxsize=32)
+def load_pop_inc_raw(year, min_age):
+    """Parses the BenMAP population and incidence CSV for `year` into 148x112 arrays, once per process"""
+
     with open(os.path.join(library_path, 'EASIUR_Data/PopInc/popinc{}.CSV'.format(str(year))), newline="") as f:
-        
-        pop = np.zeros((148, 112))
-        inc = np.zeros((148, 112))
         popinc_csv = csv.reader(f)
         header = next(popinc_csv)
 
         if "Col" in header[0]:  # Col has a strange char
             header[0] = "Col"
 
-        xys = set()
-        for row in popinc_csv:
-            row_d = dict(zip(header, row))
-            if int(row_d["Start Age"]) == min_age:
-                x = int(row_d["Col"]) - 1
-                y = int(row_d["Row"]) - 1
-                if (x, y) in xys:
-                    # just to check
-                    print("Duplicate?", x, y)
-                xys.add((x, y))
-                p = float(row_d["Population"])
-                i = float(row_d["Baseline"])
-                # print float(row_d['Point Estimate'])/i, row_d['Percent of Baseline']
-                pop[x, y] = p
-                inc[x, y] = i / p
-        return pop, inc
+        columns = [header.index(c) for c in ["Start Age", "Col", "Row", "Population", "Baseline"]]
+        rows = np.array([[row[c] for c in columns] for row in popinc_csv], dtype=float).reshape(-1, len(columns))
+
+    rows = rows[rows[:, 0] == min_age]
+    x = rows[:, 1].astype(int) - 1
+    y = rows[:, 2].astype(int) - 1
+    xy = x * 112 + y
+    unique_xy, counts = np.unique(xy, return_counts=True)
+    for d in unique_xy[counts > 1]:
+        # just to check
+        print("Duplicate?", d // 112, d % 112)
+
+    pop = np.zeros((148, 112))
+    inc = np.zeros((148, 112))
+    pop[x, y] = rows[:, 3]
+    inc[x, y] = rows[:, 4] / rows[:, 3]
+    return pop, inc
 
 
 def get_avg_plume(x, y, spec, stack="area", season="Q0"):
@@ -216,11 +270,16 @@ def get_avg_plume(x, y, spec, stack="area", season="Q0"):
         an average plume in a 148x112 array
     """
 
-    h5f = "".join(
-        ["data/EASIUR_Data/AveragePlumes_181x181/avgplumes_", season, "_", str(stack) + ".hdf5"]
-    )
-    with h5py.File(h5f) as f:
-        return f[spec][x, y]
+    return get_avg_plume_file(stack, season, os.getpid())[spec][x, y]
+
+
+@lru_cache(maxsize=None)
+def get_avg_plume_file(stack, season, pid):
+    """Returns the open Average Plume HDF5 file for `stack` and `season`, opened once per process `pid`"""
+
+    h5f = os.path.join(library_path, 'EASIUR_Data', 'AveragePlumes_181x181',
+                       "".join(["avgplumes_", season, "_", str(stack) + ".hdf5"]))
+    return h5py.File(h5f, "r")
 
 
 def get_avg_plume_stack(x, y, stkht, spec, season="Q0"):
@@ -245,17 +304,26 @@ def get_avg_plume_stack(x, y, stkht, spec, season="Q0"):
 def l2g(x, y, inverse=False, datum="NAD83"):
     """Convert LCP (x, y) in CAMx 148x112 grid to Geodetic (lon, lat)"""
 
+    if inverse:
+        return np.array(get_transformer(datum, True).transform(x, y)) / 36000.0 + np.array(
+            [1, 1]
+        )
+    else:
+        return get_transformer(datum, False).transform((x - 1) * 36e3, (y - 1) * 36e3)
+
+
+@lru_cache(maxsize=None)
+def get_transformer(datum, inverse):
+    """Returns the pyproj Transformer between the `datum` (NAD83 or WGS84) and the CAMx LCP, created once"""
+
     if datum == "NAD83":
         datum = DATUM_NAD83
     elif datum == "WGS84":
         datum = DATUM_WGS84
 
     if inverse:
-        return np.array(pyproj.transform(datum, LCP_US, x, y)) / 36000.0 + np.array(
-            [1, 1]
-        )
-    else:
-        return pyproj.transform(LCP_US, datum, (x - 1) * 36e3, (y - 1) * 36e3)
+        return pyproj.Transformer.from_proj(datum, LCP_US)
+    return pyproj.Transformer.from_proj(LCP_US, datum)
 
 
 def g2l(lon, lat, datum="NAD83"):
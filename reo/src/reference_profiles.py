@@ -0,0 +1,138 @@
+# REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+"""
+Read-only store of the built-in (DOE commercial reference building) normalized load profiles.
+
+The first process that needs a load type parses all of its .dat profiles into one float64 .npy array in
+LOAD_PROFILE_STORE_DIR, next to a JSON index with the row of each "<city>_<building>" profile. Every process then
+memory maps the array read-only, so each profile is parsed once and its pages are shared by all workers on a host.
+The store file names include a hash of the library path and of the .dat files' signature, so changed .dat files (or
+another checkout on the same host) get their own store instead of replacing one that other processes are reading.
+Building a store removes the older stores of the same library and prefix; processes that already memory map one keep
+reading it until they exit.
+"""
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+import numpy as np
+import logging
+log = logging.getLogger(__name__)
+
+LOAD_PROFILE_STORE_DIR = os.environ.get('REOPT_LOAD_PROFILE_STORE_DIR',
+                                        os.path.join(tempfile.gettempdir(), 'reopt_load_profiles'))
+PROFILE_LENGTH = 8760
+
+
+def read_dat(path):
+    with open(path, 'r') as f:
+        return [float(line.strip('\n')) for line in f]
+
+
+def source_signature(library_path, files):
+    """
+    :return: list, number of profiles and latest modification time, which changes whenever a .dat file is replaced
+    """
+    return [len(files), max([os.path.getmtime(os.path.join(library_path, f)) for f in files] or [0])]
+
+
+def write_atomic(path, write):
+    """
+    Write to a temporary file in the same directory and rename it, so that other processes never see a partial file
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates the file readable by its owner only
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def build_store(library_path, prefix, files, store_path, index_path, signature):
+    names, profiles = [], []
+    for filename in files:
+        profile = read_dat(os.path.join(library_path, filename))
+        if len(profile) != PROFILE_LENGTH:
+            log.warning("Not storing {} with {} values.".format(filename, len(profile)))
+            continue
+        names.append(filename[len(prefix):-len(".dat")])
+        profiles.append(profile)
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    write_atomic(store_path, lambda f: np.save(f, np.array(profiles, dtype=np.float64).reshape(-1, PROFILE_LENGTH)))
+    index = {"signature": signature, "rows": {name: row for row, name in enumerate(names)}}
+    write_atomic(index_path, lambda f: f.write(json.dumps(index).encode("utf-8")))
+    log.info("Stored {} {} load profiles in {}.".format(len(names), prefix, store_path))
+    remove_old_stores(store_path, index_path)
+
+
+def remove_old_stores(store_path, index_path):
+    """
+    Remove the stores built from earlier versions of the same library, i.e. the files that only differ from store_path
+    and index_path by the signature hash
+    """
+    library_stem = store_path[:store_path.rindex("_") + 1]
+    for path in glob.glob(glob.escape(library_stem) + "*.npy") + glob.glob(glob.escape(library_stem) + "*.json"):
+        if path not in (store_path, index_path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                log.warning("Could not remove old load profile store {}: {}".format(path, e))
+
+
+@lru_cache(maxsize=None)
+def get_profile_store(library_path, prefix):
+    """
+    :param library_path: str, directory of the .dat profiles, e.g. input_files/LoadProfiles/Electric
+    :param prefix: str, file name prefix of the normalized profiles, e.g. "Load8760_norm_"
+    :return: tuple, (read-only memory mapped array of profiles, dict of row by "<city>_<building>"), or None if the
+        store cannot be written
+    """
+    files = sorted(f for f in os.listdir(library_path) if f.startswith(prefix) and f.endswith(".dat"))
+    signature = source_signature(library_path, files)
+    library_id = hashlib.sha256(os.path.abspath(library_path).encode("utf-8")).hexdigest()[:16]
+    signature_id = hashlib.sha256(json.dumps(signature).encode("utf-8")).hexdigest()[:16]
+    store_name = "{}profiles_{}_{}".format(prefix, library_id, signature_id)
+    store_path = os.path.join(LOAD_PROFILE_STORE_DIR, store_name + ".npy")
+    index_path = os.path.join(LOAD_PROFILE_STORE_DIR, store_name + ".json")
+    try:
+        # the array is renamed into place before the index, so an index means the array is complete
+        if not os.path.exists(index_path) or not os.path.exists(store_path):
+            build_store(library_path, prefix, files, store_path, index_path, signature)
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        profiles = np.load(store_path, mmap_mode='r')
+        if index["signature"] != signature or profiles.shape[0] != len(index["rows"]):
+            raise ValueError("index does not match the stored profiles")
+    except (OSError, ValueError) as e:
+        log.warning("Could not use load profile store {}, reading .dat files instead: {}".format(store_path, e))
+        return None
+    return profiles, index["rows"]
+
+
+def get_normalized_profile(library_path, prefix, name):
+    """
+    :param name: str, "<city>_<building>"
+    :return: numpy array of the hourly fractions of annual energy, read-only when it comes from the store
+    """
+    store = get_profile_store(library_path, prefix)
+    if store is not None:
+        profiles, rows = store
+        if name in rows:
+            return profiles[rows[name]]
+    return np.array(read_dat(os.path.join(library_path, prefix + name + ".dat")))
+
+
+@lru_cache(maxsize=None)
+def get_month_index(year, length):
+    """
+    :return: read-only numpy array of the month (0 to 11) of each of length hours starting on Jan 1 of year
+    """
+    hours = np.datetime64(str(year), 'h') + np.arange(length).astype('timedelta64[h]')
+    month_index = hours.astype('datetime64[M]').astype(int) % 12
+    month_index.setflags(write=False)
+    return month_index
@@ -0,0 +1,80 @@
+# REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+"""
+Process wide spatial indexes of the shapefiles in reo/src/data.
+
+Each shapefile is read once per process into a shapely STRtree, and point lookups are cached on latitude and longitude
+rounded to COORDINATE_DECIMALS (6 decimals is ~0.1 m).
+"""
+import os
+from functools import lru_cache
+import geopandas as gpd
+from shapely import STRtree
+from shapely import geometry as g
+
+library_path = os.path.join('reo', 'src', 'data')
+COORDINATE_DECIMALS = 6
+LOOKUP_CACHE_SIZE = 4096
+
+
+class ShapefileIndex(object):
+    """
+    Geometries and attributes of a shapefile with an STRtree for intersection and nearest neighbor queries. Results
+    are in the same order as the rows of the shapefile, so ties resolve to the first row like a scan of the GeoDataFrame.
+    """
+
+    def __init__(self, path):
+        gdf = gpd.read_file(path)
+        self.geometries = gdf.geometry.values
+        self.attributes = gdf.drop(columns=gdf.geometry.name).reset_index(drop=True)
+        self.tree = STRtree(self.geometries)
+
+    def intersecting(self, point):
+        """
+        :param point: shapely Point in the coordinates of the shapefile
+        :return: list of int, rows whose geometry intersects point
+        """
+        return sorted(self.tree.query(point, predicate="intersects").tolist())
+
+    def nearest(self, point):
+        """
+        :param point: shapely Point in the coordinates of the shapefile
+        :return: tuple, (first row with the smallest distance to point, distance)
+        """
+        rows, distances = self.tree.query_nearest(point, return_distance=True, all_matches=True)
+        if len(rows) == 0:  # e.g. point has infinite coordinates
+            return None, float("inf")
+        return int(rows.min()), float(distances[0])
+
+    def value(self, row, column):
+        return self.attributes.at[row, column]
+
+
+@lru_cache(maxsize=None)
+def get_shapefile_index(filename):
+    """
+    :param filename: str, shapefile in reo/src/data
+    :return: ShapefileIndex, loaded once per process
+    """
+    return ShapefileIndex(os.path.join(library_path, filename))
+
+
+def round_coordinates(latitude, longitude):
+    return round(float(latitude), COORDINATE_DECIMALS), round(float(longitude), COORDINATE_DECIMALS)
+
+
+@lru_cache(maxsize=LOOKUP_CACHE_SIZE)
+def _intersecting_value(filename, column, latitude, longitude):
+    index = get_shapefile_index(filename)
+    rows = index.intersecting(g.Point(longitude, latitude))
+    if not rows:
+        return None
+    return index.value(rows[0], column)
+
+
+def intersecting_value(filename, column, latitude, longitude):
+    """
+    :param filename: str, shapefile in reo/src/data with EPSG:4326 coordinates
+    :param column: str, attribute to return
+    :return: value of column for the first geometry containing (latitude, longitude), or None
+    """
+    return _intersecting_value(filename, column, *round_coordinates(latitude, longitude))
@@ -1,5 +1,10 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
 import time
+import fcntl
+import shutil
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
 import h5pyd
 from pyproj import Proj
 import numpy as np
@@ -35,7 +40,19 @@ We use t values for 2012, since it is the closest year to the AMY data from AWS
     January 1st, 2012, 00:00:00 = 43824
     December 31st, 2012, 23:00:00 = 52608
 However, since 2012 was a leap year, we only take the values through December 30th to get 8,760 values (52,584)
+
+Downloaded .srw files are cached in WIND_RESOURCE_CACHE_DIR by Wind Toolkit grid cell (see get_conic_coords), year and
+hub height, so sites within the same 2 km cell share one download. Each cache file is downloaded once per host (other
+processes wait on its lock file), and the least recently used files are removed when the cache grows past
+WIND_RESOURCE_CACHE_MAX_BYTES.
 """
+WIND_TOOLKIT_URL = "https://developer.nrel.gov/api/wind-toolkit/v2/wind/wtk-srw-download"
+WIND_RESOURCE_CACHE_DIR = os.environ.get('WIND_RESOURCE_CACHE_DIR',
+                                         os.path.join(tempfile.gettempdir(), 'reopt_wind_resource'))
+WIND_RESOURCE_CACHE_MAX_BYTES = int(os.environ.get('WIND_RESOURCE_CACHE_MAX_BYTES', 2 * 1024**3))  # 0 to disable
+CONNECT_TIMEOUT_SECONDS = 10
+READ_TIMEOUT_SECONDS = int(os.environ.get('WIND_TOOLKIT_READ_TIMEOUT_SECONDS', 120))
+N_MAX_TRIES = 5
 
 hub_height_strings = {  # unused values included for potential future use
     10: "_10m",  # residential? - yes it is currently being used for residential
@@ -57,6 +74,16 @@ frequency_map = {  # time_steps_per_hour to pandas sampling frequency string
 WTK_ORIGIN = (19.624062, -123.30661)
 WTK_SHAPE = (1602, 2976)
 
+
+@lru_cache(maxsize=None)
+def get_wtk_projection():
+    projstring = """+proj=lcc +lat_1=30 +lat_2=60 
+                    +lat_0=38.47240422490422 +lon_0=-96.0 
+                    +x_0=0 +y_0=0 +ellps=sphere 
+                    +units=m +no_defs """
+    return Proj(projstring)
+
+
 def get_conic_coords(lat, lng):
     """
     Convert latitude, longitude into integer values for wind tool kit database.
@@ -68,11 +95,7 @@ def get_conic_coords(lat, lng):
     :return: (y, x) values to index into db_conn
     """
     #dset = h5pyd.File("/nrel/wtk-us.h5", 'r')['coordinates']
-    projstring = """+proj=lcc +lat_1=30 +lat_2=60 
-                    +lat_0=38.47240422490422 +lon_0=-96.0 
-                    +x_0=0 +y_0=0 +ellps=sphere 
-                    +units=m +no_defs """
-    projectLcc = Proj(projstring)
+    projectLcc = get_wtk_projection()
     origin_ll = reversed(WTK_ORIGIN)  # origin_ll = reversed(dset[0][0])  to grab origin directly from database
     origin = projectLcc(*origin_ll)
     point = projectLcc(lng, lat)
@@ -84,6 +107,26 @@ def get_conic_coords(lat, lng):
     return y,x
 
 
+_session = None
+_session_pid = None
+
+
+def get_wind_toolkit_session():
+    """
+    :return: requests.Session with retries, shared by all Wind Toolkit downloads in this process
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        retries = Retry(total=N_MAX_TRIES,
+                        backoff_factor=0.1,
+                        status_forcelist=[500, 502, 503, 504])
+        _session = requests.Session()
+        _session.mount('https://', HTTPAdapter(max_retries=retries))
+        _session.mount('http://', HTTPAdapter(max_retries=retries))
+        _session_pid = os.getpid()
+    return _session
+
+
 def get_data(url, filename):
     """
     Parameters
@@ -91,37 +134,105 @@ def get_data(url, filename):
     url: string
         The API endpoint to return data from
     filename: string
-        The filename where data should be written
+        The filename where data should be written. The download is written to a temporary file that is renamed to
+        filename, so that filename is never partially written.
     """
-    s = requests.Session()
-    n_max_tries = 5
-    retries = Retry(total=n_max_tries,
-                backoff_factor=0.1,
-                status_forcelist=[ 500, 502, 503, 504 ])
+    try:
+        r = get_wind_toolkit_session().get(url, timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS))
+    except requests.exceptions.RequestException:
+        log.error("Wind data download timed out " + str(N_MAX_TRIES) + "times")
+        raise ValueError('Wind Dataset Timed Out')
 
-    s.mount('https://', HTTPAdapter(max_retries=retries))
+    if r.status_code != requests.codes.ok:
+        log.error("Wind Toolkit returned invalid data, HTTP " + str(r.status_code))
+        raise ValueError('Wind Toolkit returned invalid data, HTTP ' + str(r.status_code))
 
+    fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
     try:
-        r = s.get(url)
-    
-        if r and r.status_code != requests.codes.ok:
-            log.error("Wind Toolkit returned invalid data, HTTP " + str(r.status_code))
-            raise ValueError('Wind Toolkit returned invalid data, HTTP ' + str(r.status_code))
-        elif r and r.status_code == requests.codes.ok:
-            localfile = open(filename, mode='w+')
-            localfile.write(r.text)
-        if os.path.isfile(filename):
-            return True
-    
-    except:
-        log.error("Wind data download timed out " + str(n_max_tries) + "times")
-        raise ValueError('Wind Dataset Timed Out')
+        with os.fdopen(fd, 'wb') as localfile:
+            localfile.write(r.content)
+        os.chmod(tmp_filename, 0o644)  # mkstemp creates the file readable by its owner only
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    return os.path.isfile(filename)
+
+
+def get_wind_resource_cache_path(year, latitude, longitude, hub_height_meters):
+    """
+    :return: str, path of the cached .srw file for the Wind Toolkit cell containing latitude, longitude, or None if
+        the site is outside of the Wind Toolkit or the cache is disabled
+    """
+    if WIND_RESOURCE_CACHE_MAX_BYTES <= 0:
+        return None
+    try:
+        y, x = get_conic_coords(latitude, longitude)
+    except ValueError:
+        return None
+    return os.path.join(WIND_RESOURCE_CACHE_DIR, "wtk_{}_{}_{}_{}m.srw".format(y, x, year, hub_height_meters))
 
 
-def get_wind_resource_developer_api(filename, year, latitude, longitude, hub_height_meters):
+@contextmanager
+def wind_resource_lock(path, blocking=True):
+    """
+    Exclusive lock on path across processes. Raises BlockingIOError if blocking is False and the lock is held.
+    """
+    with open(path + ".lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
-    url = 'https://developer.nrel.gov/api/wind-toolkit/v2/wind/wtk-srw-download?year={year}&lat={lat}&lon={lon}&hubheight={hubheight}&api_key={api_key}'.format(
-        year=year, lat=latitude, lon=longitude, hubheight=hub_height_meters, api_key=developer_nrel_gov_key)
 
-    success = get_data(url, filename=filename)
-    return success
+def evict_wind_resources(keep=None):
+    """
+    Remove the least recently used .srw files until the cache is no larger than WIND_RESOURCE_CACHE_MAX_BYTES. Files
+    that are locked (being downloaded or copied) and keep are not removed.
+    """
+    entries = []
+    for name in os.listdir(WIND_RESOURCE_CACHE_DIR):
+        if not name.endswith(".srw"):
+            continue
+        path = os.path.join(WIND_RESOURCE_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:  # removed by another process
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= WIND_RESOURCE_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            with wind_resource_lock(path, blocking=False):
+                os.remove(path)
+        except OSError:  # locked, or removed by another process
+            continue
+        total_bytes -= size
+
+
+def get_wind_resource_developer_api(filename, year, latitude, longitude, hub_height_meters, url_base=WIND_TOOLKIT_URL):
+
+    url = '{url_base}?year={year}&lat={lat}&lon={lon}&hubheight={hubheight}&api_key={api_key}'.format(
+        url_base=url_base, year=year, lat=latitude, lon=longitude, hubheight=hub_height_meters,
+        api_key=developer_nrel_gov_key)
+
+    cache_path = get_wind_resource_cache_path(year, latitude, longitude, hub_height_meters)
+    if cache_path is None:
+        return get_data(url, filename=filename)
+
+    os.makedirs(WIND_RESOURCE_CACHE_DIR, exist_ok=True)
+    with wind_resource_lock(cache_path):  # other processes wait for the download instead of repeating it
+        if os.path.isfile(cache_path):
+            os.utime(cache_path)  # mark as most recently used
+        else:
+            get_data(url, filename=cache_path)
+        shutil.copyfile(cache_path, filename)
+    evict_wind_resources(keep=cache_path)
+    return os.path.isfile(filename)
@@ -1,6 +1,12 @@
 import json
+import os
+import numpy as np
+import geopandas as gpd
+from shapely import geometry as g
 from django.test import TestCase
 from tastypie.test import ResourceTestCaseMixin
+from reo.src.emissions_calculator import EmissionsCalculator, get_avert_region, transformer_4326_to_102008
+from reo.src.pyeasiur import get_EASIUR2005, get_EASIUR2005_at, g2l
 
 
 class ClassAttributes:
@@ -41,12 +47,46 @@ class TestEmissions(ResourceTestCaseMixin, TestCase):
         test = self.api_client.get('/v1/emissions_profile/',data={"latitude":1,"longitude":1})
         self.assertTrue("Your site location (1.0,1.0) is more than 5 miles from the nearest emission region." in str(test.content))
 
+    def test_region_lookup_matches_shapefile_scan(self):
+        """
+        The STRtree lookups give the same region and distance as scanning the shapefiles
+        """
+        gdf_4326 = gpd.read_file(os.path.join('reo', 'src', 'data', 'avert_4326.shp'))
+        gdf_102008 = gpd.read_file(os.path.join('reo', 'src', 'data', 'avert_102008.shp'))
+        for latitude, longitude in [(60.27641, -144.81502), (21.55329, -158.014155), (45, -110), (40.7, -74.0),
+                                    (41.88, -87.62), (25.76, -80.19), (33.7, -118.35)]:
+            gdf_query = gdf_4326[gdf_4326.geometry.intersects(g.Point(longitude, latitude))]
+            if not gdf_query.empty:
+                expected = (gdf_query.AVERT.values[0], 0)
+            else:
+                point = g.Point(*transformer_4326_to_102008.transform(latitude, longitude))
+                distances_meter = list(gdf_102008.geometry.apply(lambda x: x.distance(point)).values)
+                min_idx = distances_meter.index(min(distances_meter))
+                expected = (gdf_102008.loc[min_idx, 'AVERT'], min(distances_meter))
+            self.assertEqual(get_avert_region(latitude, longitude), expected)
+
+    def test_sub_hourly_emissions_series(self):
+        hourly = EmissionsCalculator(latitude=45, longitude=-110, pollutant='NOx').emissions_series
+        quarter_hourly = EmissionsCalculator(latitude=45, longitude=-110, pollutant='NOx',
+                                             time_steps_per_hour=4).emissions_series
+        self.assertEqual(len(hourly), 8760)
+        self.assertEqual(quarter_hourly, [v for v in hourly for _ in range(4)])
+
     def test_easiur_and_fuel_urls(self):
         test = self.api_client.get('/v1/easiur_costs/',data={"latitude":30.2672,"longitude":-97.7431,"inflation":0.025})
         self.assertEqual(round(json.loads(test.content)['nox_cost_us_dollars_per_tonne_grid'],3), round(4534.03247048984,3))
 
         test = self.api_client.get('/v1/fuel_emissions_rates/',data={})
 
+    def test_batched_easiur_lookup(self):
+        lons, lats = [-97.7431, -105.2, -74.0, 0], [30.2672, 39.7, 40.7, 0]
+        easiur = get_EASIUR2005('p150', pop_year=2020, income_year=2020, dollar_year=2010)
+        easiur_at = get_EASIUR2005_at(lons, lats, 'p150', pop_year=2020, income_year=2020, dollar_year=2010)
+        for i in range(3):
+            x, y = g2l(lons[i], lats[i], datum='NAD83')
+            self.assertEqual(easiur_at['NOX_Annual'][i], easiur['NOX_Annual'][int(round(x)) - 1, int(round(y)) - 1])
+        self.assertTrue(np.isnan(easiur_at['NOX_Annual'][3]))  # outside the CAMx grid
+
     def test_bad_grid_emissions_profile(self):
         """
         Tests that a poorly formatted utility emissions factor profile does not validate 
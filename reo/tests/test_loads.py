@@ -1,6 +1,12 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+import os
+import tempfile
+from unittest import mock
+import numpy as np
 from django.test import TestCase
-from reo.src.load_profile import BuiltInProfile
+from reo.src.load_profile import BuiltInProfile, library_path_base, load_type_file_map
+from reo.src import reference_profiles
+from reo.src.reference_profiles import get_normalized_profile, get_month_index, get_profile_store, read_dat
 
 # Dummy commit to force master branch to redeploy fully 7/18/2025
 
@@ -8,7 +14,15 @@ class LoadsTestCase(TestCase):
 
     # mimic user passing in info
     def setUp(self):
-        pass
+        # build the load profile stores in a temporary directory instead of the one shared by the workers on this host
+        store_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(store_dir.cleanup)
+        patcher = mock.patch.object(reference_profiles, 'LOAD_PROFILE_STORE_DIR', store_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        get_profile_store.cache_clear()
+        self.addCleanup(get_profile_store.cache_clear)
+        self.store_dir = store_dir.name
 
     def test_ashrae_zones(self):
 
@@ -30,3 +44,50 @@ class LoadsTestCase(TestCase):
             self.assertEqual(profile.city, expected_ashrae_city[i], {r"reopt": {"Error": "Incorrect ASHRAE city returned for test city: " + test_cities[i] + " Expected: " + expected_ashrae_city[i] + " Actual: " + profile.city}})
 
 
+
+    def test_reference_profile_store(self):
+        """
+        Profiles from the memory mapped store are the same as the .dat files, and monthly scaling matches monthly energy
+        """
+        for load_type, prefix in load_type_file_map.items():
+            library_path = os.path.join(library_path_base, load_type)
+            profile = get_normalized_profile(library_path, prefix, "Boulder_Hospital")
+            self.assertFalse(profile.flags.writeable)
+            self.assertEqual(profile.tolist(), read_dat(os.path.join(library_path, prefix + "Boulder_Hospital.dat")))
+
+        monthly_totals_energy = [1000 + 37 * i for i in range(12)]
+        profile = BuiltInProfile(latitude=40.014986, longitude=-105.270546, doe_reference_name="Hospital",
+                                 monthly_totals_energy=monthly_totals_energy)
+        month_index = get_month_index(profile.year, 8760)
+        built_in_profile = np.array(profile.built_in_profile)
+        for m in range(12):
+            self.assertAlmostEqual(built_in_profile[month_index == m].sum(), monthly_totals_energy[m], places=6)
+
+    def test_reference_profile_store_per_library(self):
+        """
+        Libraries with the same file prefix (e.g. two checkouts on one host) get separate stores
+        """
+        with tempfile.TemporaryDirectory() as library_a, tempfile.TemporaryDirectory() as library_b:
+            for library_path, value in ((library_a, 1.0), (library_b, 2.0)):
+                with open(os.path.join(library_path, "Test8760_norm_Boulder_Hospital.dat"), 'w') as f:
+                    f.write("\n".join([str(value)] * 8760))
+            self.assertEqual(get_normalized_profile(library_a, "Test8760_norm_", "Boulder_Hospital")[0], 1.0)
+            self.assertEqual(get_normalized_profile(library_b, "Test8760_norm_", "Boulder_Hospital")[0], 2.0)
+            store_a = get_profile_store(library_a, "Test8760_norm_")[0]
+            store_b = get_profile_store(library_b, "Test8760_norm_")[0]
+            self.assertNotEqual(store_a.filename, store_b.filename)
+
+            # replacing a .dat file builds a new store, which removes the old one of the same library only
+            dat_path = os.path.join(library_a, "Test8760_norm_Boulder_Hospital.dat")
+            with open(dat_path, 'w') as f:
+                f.write("\n".join(["3.0"] * 8760))
+            os.utime(dat_path, (os.path.getmtime(dat_path) + 10,) * 2)
+            get_profile_store.cache_clear()
+            self.assertEqual(get_normalized_profile(library_a, "Test8760_norm_", "Boulder_Hospital")[0], 3.0)
+            new_store_a = get_profile_store(library_a, "Test8760_norm_")[0]
+            self.assertNotEqual(new_store_a.filename, store_a.filename)
+            self.assertFalse(os.path.exists(store_a.filename))
+            self.assertTrue(os.path.exists(store_b.filename))
+            self.assertEqual(sorted(os.listdir(self.store_dir)),
+                             sorted(os.path.basename(os.path.splitext(store.filename)[0]) + ext
+                                    for store in (new_store_a, store_b) for ext in (".npy", ".json")))
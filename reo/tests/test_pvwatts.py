@@ -0,0 +1,71 @@
+# REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.cache import caches
+from django.test import TestCase
+from reo.src.pvwatts import PVWatts
+
+
+class PVWattsStub(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the PVWatts API. Responds with each status code in fail_with before returning ac.
+    """
+    fail_with = []
+    ac = [0] * 8760
+    queries = []
+
+    def do_GET(self):
+        type(self).queries.append(self.path)
+        status = type(self).fail_with.pop(0) if type(self).fail_with else 200
+        body = {"errors": [], "outputs": {"ac": type(self).ac}, "station_info": {"lat": 39.7, "lon": -105.2,
+                                                                                "distance": 1000}}
+        if status != 200:
+            body = {"errors": ["Service unavailable"]}
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPVWatts(TestCase):
+
+    def setUp(self):
+        PVWattsStub.fail_with = []
+        PVWattsStub.queries = []
+        PVWattsStub.ac = [(h % 24) * 37.5 for h in range(8760)]
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PVWattsStub)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url_base = "http://127.0.0.1:{}/api/pvwatts/v6.json".format(self.server.server_address[1])
+        caches['pvwatts'].clear()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        caches['pvwatts'].clear()
+
+    def test_retries_and_cache(self):
+        PVWattsStub.fail_with = [503]
+        pvwatts = PVWatts(url_base=self.url_base, key="key1", latitude=39.7, longitude=-105.2, tilt=20,
+                          time_steps_per_hour=4)
+        self.assertEqual(len(PVWattsStub.queries), 2)  # retried after the 503
+        expected = [round(ac / 1000, 4) for ac in PVWattsStub.ac for _ in range(4)]
+        self.assertEqual(pvwatts.pv_prod_factor, expected)
+
+        # same query with another api_key comes from the cache
+        pvwatts = PVWatts(url_base=self.url_base, key="key2", latitude=39.7, longitude=-105.2, tilt=20)
+        self.assertEqual(len(PVWattsStub.queries), 2)
+        self.assertEqual(pvwatts.pv_prod_factor, expected[::4])
+
+        PVWatts(url_base=self.url_base, key="key1", latitude=39.7, longitude=-105.2, tilt=25)
+        self.assertEqual(len(PVWattsStub.queries), 3)
+
+    def test_errors_are_not_cached(self):
+        PVWattsStub.fail_with = [500] * 4
+        pvwatts = PVWatts(url_base=self.url_base, key="key1", latitude=39.7, longitude=-105.2, tilt=20)
+        self.assertEqual(pvwatts.response["errors"], ["Service unavailable"])
+        PVWatts(url_base=self.url_base, key="key1", latitude=39.7, longitude=-105.2, tilt=20)
+        self.assertEqual(len(PVWattsStub.queries), 5)
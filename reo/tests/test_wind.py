@@ -2,6 +2,10 @@
 import json
 import copy
 import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import pandas as pd
 from tastypie.test import ResourceTestCaseMixin
 from reo.nested_to_flat_output import nested_to_flat
@@ -10,6 +14,7 @@ from reo.models import ModelManager
 from reo.utilities import check_common_outputs
 from reo.validators import ValidateNestedInput
 from reo.src.wind import WindSAMSDK, combine_wind_files
+from reo.src import wind_resource
 import logging
 logging.disable(logging.CRITICAL)
 
@@ -35,6 +40,22 @@ wind_post = {"Scenario":
              }
 
 
+class WindToolkitStub(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the Wind Toolkit .srw download
+    """
+    queries = []
+
+    def do_GET(self):
+        type(self).queries.append(self.path)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(("srw for " + self.path.split("&api_key")[0] + "\n").encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
 class WindTests(ResourceTestCaseMixin, TestCase):
     REopt_tol = 1e-2
 
@@ -177,3 +198,45 @@ class WindTests(ResourceTestCaseMixin, TestCase):
         validator = ValidateNestedInput(bad_post)
         assert(any("Latitude/Longitude is outside of wind resource dataset bounds"
                    in e for e in validator.errors['input_errors']))
+
+    def test_wind_resource_cache(self):
+        WindToolkitStub.queries = []
+        server = ThreadingHTTPServer(("127.0.0.1", 0), WindToolkitStub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url_base = "http://127.0.0.1:{}/wtk-srw-download".format(server.server_address[1])
+        cache_dir, max_bytes = wind_resource.WIND_RESOURCE_CACHE_DIR, wind_resource.WIND_RESOURCE_CACHE_MAX_BYTES
+        wind_resource.WIND_RESOURCE_CACHE_DIR = tempfile.mkdtemp()
+        path_inputs = tempfile.mkdtemp()
+        try:
+            def download(latitude, longitude, hub_height_meters, filename):
+                filename = os.path.join(path_inputs, filename)
+                self.assertTrue(wind_resource.get_wind_resource_developer_api(
+                    filename=filename, year=2012, latitude=latitude, longitude=longitude,
+                    hub_height_meters=hub_height_meters, url_base=url_base))
+                with open(filename) as f:
+                    return f.read()
+
+            first = download(39.91065, -105.2348, 40, "a.srw")
+            # sites in the same 2 km Wind Toolkit cell share the download
+            self.assertEqual(wind_resource.get_conic_coords(39.91065, -105.2348),
+                             wind_resource.get_conic_coords(39.9110, -105.2350))
+            self.assertEqual(download(39.9110, -105.2350, 40, "b.srw"), first)
+            self.assertEqual(len(WindToolkitStub.queries), 1)
+
+            download(39.91065, -105.2348, 60, "c.srw")
+            download(39.7555, -105.2211, 40, "d.srw")
+            self.assertEqual(len(WindToolkitStub.queries), 3)
+
+            # only the most recently used file fits in the cache
+            wind_resource.WIND_RESOURCE_CACHE_MAX_BYTES = len(first) + 1
+            download(39.91065, -105.2348, 40, "e.srw")
+            cached = [f for f in os.listdir(wind_resource.WIND_RESOURCE_CACHE_DIR) if f.endswith(".srw")]
+            self.assertEqual(cached, [os.path.basename(wind_resource.get_wind_resource_cache_path(
+                2012, 39.91065, -105.2348, 40))])
+            self.assertEqual(len(WindToolkitStub.queries), 3)
+        finally:
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(wind_resource.WIND_RESOURCE_CACHE_DIR)
+            shutil.rmtree(path_inputs)
+            wind_resource.WIND_RESOURCE_CACHE_DIR, wind_resource.WIND_RESOURCE_CACHE_MAX_BYTES = cache_dir, max_bytes
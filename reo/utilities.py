@@ -7,10 +7,7 @@ import numpy as np
 import calendar
 import datetime
 import math
-import geopandas as gpd
-from shapely import geometry as g
-# shapely does not work with Python >= 3.9
-# https://github.com/shapely/shapely/issues/1040
+from reo.src.spatial_index import intersecting_value
 
 def slope(x1, y1, x2, y2):
     return (y2 - y1) / (x2 - x1)
@@ -378,10 +375,9 @@ def convert_gal_to_kwh(delta_T_degF, rho_kg_per_m3, cp_kj_per_kgK):
 def get_climate_zone_and_nearest_city(latitude, longitude, default_cities):
     nearest_city = None
     geometric_flag = False
-    gdf = gpd.read_file('reo/src/data/climate_cities.shp')
-    gdf = gdf[gdf.geometry.intersects(g.Point(longitude, latitude))]
-    if not gdf.empty:
-        nearest_city = gdf.city.values[0].replace(' ', '')
+    city = intersecting_value('climate_cities.shp', 'city', latitude, longitude)
+    if city is not None:
+        nearest_city = city.replace(' ', '')
     if nearest_city is None:
         cities_to_search = default_cities
     else:
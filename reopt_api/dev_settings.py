@@ -1,7 +1,9 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
 from keys import *
+from reopt_api.celery import redis_host
 import sys
 import os
+import tempfile
 import django
 import rollbar
 """
@@ -144,7 +146,8 @@ CELERY_IMPORTS = (
     'futurecosts.api',
     'futurecosts.tasks',
     'reoptjl.api',
-    'reoptjl.src.run_jump_model'
+    'reoptjl.src.run_jump_model',
+    'load_builder.tasks'
 )
 
 if 'test' in sys.argv:
@@ -153,6 +156,31 @@ if 'test' in sys.argv:
 
 CELERY_WORKER_MAX_MEMORY_PER_CHILD = 4000000 # 4 GB
 
+# Cache shared by the web and celery workers, e.g. for Julia host load balancing
+if 'test' in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'pvwatts': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'pvwatts',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://' + redis_host + ':6379/1',
+        },
+        'pvwatts': {  # PVWatts responses, on disk so that they outlive worker restarts
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('PVWATTS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'reopt_pvwatts_cache')),
+            'TIMEOUT': int(os.environ.get('PVWATTS_CACHE_TTL_SECONDS', 30 * 24 * 3600)),
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('PVWATTS_CACHE_MAX_ENTRIES', 2000))},
+        },
+    }
+
 # Static files (used for Proforma xlsx)
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 STATIC_URL = '/static/'
@@ -1,6 +1,8 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
 from keys import *
+from reopt_api.celery import redis_host
 import os
+import tempfile
 import django
 import rollbar
 
@@ -135,9 +137,24 @@ CELERY_IMPORTS = (
     'django_extensions',
     'reoptjl.api',
     'reoptjl.src.run_jump_model',
-    'ghpghx'
+    'ghpghx',
+    'load_builder.tasks'
 )
 
+# Cache shared by the web and celery workers, e.g. for Julia host load balancing
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://' + redis_host + ':6379/1',
+    },
+    'pvwatts': {  # PVWatts responses, on disk so that they outlive worker restarts
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PVWATTS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'reopt_pvwatts_cache')),
+        'TIMEOUT': int(os.environ.get('PVWATTS_CACHE_TTL_SECONDS', 30 * 24 * 3600)),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('PVWATTS_CACHE_MAX_ENTRIES', 2000))},
+    },
+}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
@@ -13,6 +13,7 @@ from tastypie.validation import Validation
 from reoptjl.validators import InputValidator
 # from reo.src.profiler import Profiler  # TODO use Profiler?
 from reoptjl.src.run_jump_model import run_jump_model
+from reoptjl.src.result_cache import find_cached_result, clone_results
 from reo.exceptions import UnexpectedError, REoptError
 from ghpghx.models import GHPGHXInputs
 from django.core.exceptions import ValidationError
@@ -195,6 +196,18 @@ class Job(ModelResource):
                                                      content_type='application/json',
                                                      status=500))  # internal server error
 
+        # Reuse the results of an identical scenario that has already been optimized
+        try:
+            cached_meta = find_cached_result(run_uuid)
+            if cached_meta is not None:
+                clone_results(cached_meta, run_uuid)
+                raise ImmediateHttpResponse(HttpResponse(json.dumps({'run_uuid': run_uuid}),
+                                            content_type='application/json', status=201))
+        except ImmediateHttpResponse as e:
+            raise e
+        except Exception:
+            log.warning("Could not reuse cached results for run_uuid: {}".format(run_uuid), exc_info=True)
+
         APIMeta.objects.filter(run_uuid=run_uuid).update(status='Optimizing...')
         try:
             run_jump_model.s(run_uuid).apply_async()
@@ -1,72 +1,54 @@
 # custom_timeseries_table_helpers.py
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
-import calendar
+import numpy as np
 
-def generate_datetime_column(year: int, time_steps_per_hour: int) -> List[str]:
+def generate_datetime_index(year: int, time_steps_per_hour: int) -> np.ndarray:
     """
-    Generate datetime strings for the first column based on year and time_steps_per_hour.
+    Generate the datetimes for the first column based on year and time_steps_per_hour, as a numpy datetime64[m] array.
     
     Args:
         year: The year for the datetime series
         time_steps_per_hour: Number of time steps per hour (1, 2, or 4)
     
     Returns:
-        List of datetime strings formatted as "M/D/YYYY H:MM"
+        Array of 365 * 24 * time_steps_per_hour datetimes
     """
-    # Check if leap year and adjust days accordingly
-    is_leap = calendar.isleap(year)
-    total_days = 365  # Always use 365 days, even for leap years
-    
-    # Calculate time step increment in minutes
+    total_steps = 365 * 24 * time_steps_per_hour  # Always use 365 days, even for leap years
     minutes_per_step = 60 // time_steps_per_hour
+    return np.datetime64(f"{year:04d}-01-01T00:00", "m") + np.arange(total_steps) * np.timedelta64(minutes_per_step, "m")
+
+
+def datetime_index_to_excel(datetime_index: np.ndarray) -> np.ndarray:
+    """
+    Convert datetimes to Excel serial dates, exactly as xlsxwriter's write_datetime does, so that they can be written
+    as numbers with a date num_format.
     
-    datetime_list = []
-    start_date = datetime(year, 1, 1, 0, 0)
-    
-    # Calculate total number of time steps
-    total_steps = total_days * 24 * time_steps_per_hour
-    
-    for step in range(total_steps):
-        current_time = start_date + timedelta(minutes=step * minutes_per_step)
-        # Format: M/D/YYYY H:MM (Windows-compatible formatting)
-        month = current_time.month
-        day = current_time.day
-        year = current_time.year
-        hour = current_time.hour
-        minute = current_time.minute
-        formatted_time = f"{month}/{day}/{year} {hour}:{minute:02d}"
-        datetime_list.append(formatted_time)
+    Args:
+        datetime_index: numpy datetime64[m] array, e.g. from generate_datetime_index
     
-    return datetime_list
+    Returns:
+        Array of Excel serial dates (days since 1899-12-31, with Excel's 1900 leap year)
+    """
+    minutes = (datetime_index - np.datetime64("1899-12-31T00:00", "m")).astype(np.int64)
+    excel_time = minutes // 1440 + (minutes % 1440 * 60).astype(float) / (60 * 60 * 24)
+    excel_time[excel_time > 59] += 1  # Excel erroneously treats 1900 as a leap year
+    return excel_time
 
 
-def get_monthly_peak_for_timestep(timestep_index: int, monthly_peaks: List[float], time_steps_per_hour: int) -> float:
+def expand_monthly_values(monthly_values: List[float], time_steps_per_hour: int) -> List[float]:
     """
-    Get the monthly peak value for a given timestep index.
+    Repeat monthly values (e.g. monthly peaks) for every time step of each month.
     
     Args:
-        timestep_index: The index of the current timestep
-        monthly_peaks: List of 12 monthly peak values
+        monthly_values: List of 12 monthly values (missing months are 0)
         time_steps_per_hour: Number of time steps per hour
     
     Returns:
-        The monthly peak value for the month containing this timestep
+        List of 365 * 24 * time_steps_per_hour values
     """
-    # Calculate which month this timestep belongs to
-    # Approximate days per month
     days_in_months = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    
-    steps_per_day = 24 * time_steps_per_hour
-    cumulative_steps = 0
-    
-    for month_idx, days in enumerate(days_in_months):
-        cumulative_steps += days * steps_per_day
-        if timestep_index < cumulative_steps:
-            return monthly_peaks[month_idx] if month_idx < len(monthly_peaks) else 0
-    
-    # Default to last month if we're beyond December
-    return monthly_peaks[-1] if monthly_peaks else 0
+    values = list(monthly_values[:12]) + [0] * (12 - len(monthly_values[:12]))
+    return np.repeat(np.array(values, dtype=object), np.array(days_in_months) * 24 * time_steps_per_hour).tolist()
 
 
 def safe_get_list(data: Dict[str, Any], key: str, default: List = None) -> List:
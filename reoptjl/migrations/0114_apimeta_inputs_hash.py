@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reoptjl', '0113_merge_20251209_2338'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apimeta',
+            name='inputs_hash',
+            field=models.TextField(blank=True, db_index=True, default='', help_text='Hash of the inputs (excluding user_uuid and api_key), used to reuse results of identical scenarios.'),
+        ),
+    ]
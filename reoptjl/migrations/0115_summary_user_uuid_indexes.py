@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reoptjl', '0114_apimeta_inputs_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apimeta',
+            name='user_uuid',
+            field=models.TextField(blank=True, db_index=True, default='', help_text='The assigned unique ID of a signed in REopt user.'),
+        ),
+        migrations.AlterField(
+            model_name='portfoliounlinkedruns',
+            name='user_uuid',
+            field=models.UUIDField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='userunlinkedruns',
+            name='user_uuid',
+            field=models.UUIDField(db_index=True),
+        ),
+    ]
@@ -98,6 +98,10 @@ def at_least_one_set(model, possible_sets):
     return case
 
 
+# Django Model.__dict__ keys that are not fields returned by the API
+DICT_KEYS_TO_SKIP = ["_state", "_prefetched_objects_cache", "id", "basemodel_ptr_id", "meta_id"]
+
+
 class BaseModel(object):
 
     @property
@@ -107,12 +111,16 @@ class BaseModel(object):
         NOTE: to get correct field types you must run self.clean_fields() first (eg. convert int to float)
         :return: dict
         """
-        d = copy.deepcopy(self.__dict__)
-        d.pop("_state", None)
-        d.pop("id", None)
-        d.pop("basemodel_ptr_id", None)
-        d.pop("meta_id", None)
-        return d
+        return copy.deepcopy(self.shallow_dict)
+
+    @property
+    def shallow_dict(self):
+        """
+        Serialize Django Model.__dict__ without copying the values (e.g. 8760 time series), for read only use such as
+        building a JsonResponse. Use dict if the values will be modified.
+        :return: dict
+        """
+        return {k: v for (k, v) in self.__dict__.items() if k not in DICT_KEYS_TO_SKIP}
 
     @classmethod
     def create(cls, **kwargs):
@@ -160,6 +168,7 @@ class APIMeta(BaseModel, models.Model):
     user_uuid = models.TextField(
         blank=True,
         default="",
+        db_index=True,
         help_text="The assigned unique ID of a signed in REopt user."
     )
     webtool_uuid = models.TextField(
@@ -191,10 +200,26 @@ class APIMeta(BaseModel, models.Model):
         help_text=("The unique ID of a portfolio (set of associated runs) created by the REopt Webtool. Note that this ID can be shared by "
                    "several REopt API Scenarios and one user can have one-to-many portfolio_uuid tied to them.")
     )
+    inputs_hash = models.TextField(
+        blank=True,
+        default="",
+        db_index=True,
+        help_text="Hash of the inputs (excluding user_uuid and api_key), used to reuse results of identical scenarios."
+    )
+
+    @property
+    def shallow_dict(self):
+        """
+        Serialize Django Model.__dict__, custom implementation for APIMeta
+        :return: dict without the internal inputs_hash
+        """
+        d = super().shallow_dict
+        d.pop("inputs_hash", None)
+        return d
 
 class UserUnlinkedRuns(models.Model):
     run_uuid = models.UUIDField(unique=True)
-    user_uuid = models.UUIDField(unique=False)
+    user_uuid = models.UUIDField(unique=False, db_index=True)
 
     @classmethod
     def create(cls, **kwargs):
@@ -204,7 +229,7 @@ class UserUnlinkedRuns(models.Model):
 
 class PortfolioUnlinkedRuns(models.Model):
     portfolio_uuid = models.UUIDField(unique=False)
-    user_uuid = models.UUIDField(unique=False)
+    user_uuid = models.UUIDField(unique=False, db_index=True)
     run_uuid = models.UUIDField(unique=True)
 
     @classmethod
@@ -1512,7 +1537,7 @@ class ElectricLoadInputs(BaseModel, models.Model):
         error_messages = {}
 
         # possible sets for defining load profile
-        if not at_least_one_set(self.dict, self.possible_sets):
+        if not at_least_one_set(self.shallow_dict, self.possible_sets):
             error_messages["required inputs"] = \
                 "Must provide at least one set of valid inputs from {}.".format(self.possible_sets)
 
@@ -1761,7 +1786,7 @@ class ElectricTariffInputs(BaseModel, models.Model):
         error_messages = {}
 
         # possible sets for defining tariff
-        if not at_least_one_set(self.dict, self.possible_sets):
+        if not at_least_one_set(self.shallow_dict, self.possible_sets):
             error_messages["required inputs"] = \
                 f"Must provide at least one set of valid inputs from {self.possible_sets}. If this is an off-grid analysis, ElectricTariff inputs will not be used in REopt, and can be removed from input JSON."
 
@@ -1813,21 +1838,17 @@ class ElectricTariffInputs(BaseModel, models.Model):
         super(ElectricTariffInputs, self).save(*args, **kwargs)
 
     @property
-    def dict(self):
+    def shallow_dict(self):
         """
         Serialize Django Model.__dict__, custom implementation for ElectricTariffInputs
         NOTE: to get correct field types you must run self.clean_fields() first (eg. convert int to float)
         :return: dict
         """
-        d = copy.deepcopy(self.__dict__)
-        if "coincident_peak_load_active_time_steps" in d.keys():
+        d = super().shallow_dict
+        if d.get("coincident_peak_load_active_time_steps") is not None:
             # filter out repeated values created to make the inner arrays have equal length
             d["coincident_peak_load_active_time_steps"] = \
                 [list(set(l)) for l in d["coincident_peak_load_active_time_steps"]]
-        d.pop("_state", None)
-        d.pop("id", None)
-        d.pop("basemodel_ptr_id", None)
-        d.pop("meta_id", None)
         return d
 
 
@@ -4858,7 +4879,7 @@ class CHPInputs(BaseModel, models.Model):
     
     def clean(self):
         error_messages = {}
-        if not self.dict.get("fuel_cost_per_mmbtu"):
+        if not self.shallow_dict.get("fuel_cost_per_mmbtu"):
             error_messages["required inputs"] = "Must provide fuel_cost_per_mmbtu to model {}".format(self.key)
 
         if error_messages:
@@ -5202,7 +5223,7 @@ class CoolingLoadInputs(BaseModel, models.Model):
         error_messages = {}
 
         # possible sets for defining load profile
-        if not at_least_one_set(self.dict, self.possible_sets):
+        if not at_least_one_set(self.shallow_dict, self.possible_sets):
             error_messages["required inputs"] = \
                 "Must provide at least one set of valid inputs from {}.".format(self.possible_sets)
 
@@ -5564,7 +5585,7 @@ class ExistingBoilerInputs(BaseModel, models.Model):
     # For custom validations within model.
     def clean(self):
         error_messages = {}
-        if not self.dict.get("fuel_cost_per_mmbtu"):
+        if not self.shallow_dict.get("fuel_cost_per_mmbtu"):
             error_messages["required inputs"] = "Must provide fuel_cost_per_mmbtu to model {}".format(self.key)
 
         if error_messages:
@@ -6572,7 +6593,7 @@ class BoilerInputs(BaseModel, models.Model):
     # For custom validations within model.
     def clean(self):
         error_messages = {}
-        if not self.dict.get("fuel_cost_per_mmbtu"):
+        if not self.shallow_dict.get("fuel_cost_per_mmbtu"):
             error_messages["required inputs"] = "Must provide fuel_cost_per_mmbtu to model {}".format(self.key)
 
         if error_messages:
@@ -7763,7 +7784,7 @@ class SpaceHeatingLoadInputs(BaseModel, models.Model):
         error_messages = {}
 
         # possible sets for defining load profile
-        if not at_least_one_set(self.dict, self.possible_sets):
+        if not at_least_one_set(self.shallow_dict, self.possible_sets):
             error_messages["required inputs"] = \
                 "Must provide at least one set of valid inputs from {}.".format(self.possible_sets)
 
@@ -7938,7 +7959,7 @@ class DomesticHotWaterLoadInputs(BaseModel, models.Model):
         error_messages = {}
 
         # possible sets for defining load profile
-        if not at_least_one_set(self.dict, self.possible_sets):
+        if not at_least_one_set(self.shallow_dict, self.possible_sets):
             error_messages["required inputs"] = \
                 "Must provide at least one set of valid inputs from {}.".format(self.possible_sets)
 
@@ -8088,7 +8109,7 @@ class ProcessHeatLoadInputs(BaseModel, models.Model):
         error_messages = {}
 
         # possible sets for defining load profile
-        if not at_least_one_set(self.dict, self.possible_sets):
+        if not at_least_one_set(self.shallow_dict, self.possible_sets):
             error_messages["required inputs"] = \
                 "Must provide at least one set of valid inputs from {}.".format(self.possible_sets)
 
@@ -8103,7 +8124,7 @@ class ProcessHeatLoadInputs(BaseModel, models.Model):
             self.addressable_load_fraction = list([1.0]) # should not convert to timeseries, in case it is to be used with monthly_mmbtu or annual_mmbtu
 
         # possible sets for defining load profile
-        if not at_least_one_set(self.dict, self.possible_sets):
+        if not at_least_one_set(self.shallow_dict, self.possible_sets):
             error_messages["required inputs"] = \
                 "Must provide at least one set of valid inputs from {}.".format(self.possible_sets)
 
@@ -0,0 +1,154 @@
+# REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+"""
+Shared cache of the Julia defaults endpoints (chp_defaults, sector_defaults, avert_emissions_profile, etc.) and
+simulated_load.
+
+These endpoints are pure functions of their inputs and the REopt.jl version, so successful responses are kept in the
+Django cache for ENDPOINT_TTL_SECONDS (or REOPT_DEFAULTS_CACHE_TTL_SECONDS, 0 to disable) under a key made of the
+endpoint, the current reopt_version (see result_cache.set_current_reopt_version) and the normalized inputs.
+Concurrent misses with the same key are coalesced: one worker calls Julia while the others wait for its response.
+Long series of floats in the responses (e.g. load profiles) are cached as numpy arrays.
+"""
+import hashlib
+import json
+import math
+import os
+import time
+import numpy as np
+from django.core.cache import cache
+from reoptjl.src.julia_client import get_julia_client
+from reoptjl.src.result_cache import get_current_reopt_version, record
+import logging
+log = logging.getLogger(__name__)
+
+ENDPOINTS = ("absorption_chiller_defaults", "avert_emissions_profile", "cambium_profile", "chp_defaults", "easiur_costs",
+             "get_ashp_defaults", "get_existing_chiller_default_cop", "ghp_efficiency_thermal_factors",
+             "pv_cost_defaults", "sector_defaults", "simulated_load")
+DEFAULT_TTL_SECONDS = int(os.environ.get('REOPT_DEFAULTS_CACHE_TTL_SECONDS', 24 * 3600))  # 0 to disable
+ENDPOINT_TTL_SECONDS = {  # endpoints that only read data sets shipped with REopt.jl
+    "absorption_chiller_defaults": 7 * 24 * 3600,
+    "get_ashp_defaults": 7 * 24 * 3600,
+    "get_existing_chiller_default_cop": 7 * 24 * 3600,
+    "ghp_efficiency_thermal_factors": 7 * 24 * 3600,
+    "sector_defaults": 7 * 24 * 3600,
+}
+COALESCE_WAIT_SECONDS = 60
+COALESCE_POLL_SECONDS = 0.1
+STATS = ("hits", "coalesced", "misses")
+COMPACT_SERIES_LENGTH = 8760
+
+
+def get_ttl(endpoint):
+    if DEFAULT_TTL_SECONDS <= 0:
+        return 0
+    return ENDPOINT_TTL_SECONDS.get(endpoint, DEFAULT_TTL_SECONDS)
+
+
+def normalize(value):
+    """
+    Query parameters arrive as strings, so "39.70" and "39.7" are the same input to Julia. Decimal strings are keyed
+    on their float value; integer strings are not, since Julia may parse them as integers.
+    """
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, str) and any(c in value for c in ".eE"):
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+        if math.isfinite(number):
+            return number
+    return value
+
+
+def defaults_cache_key(endpoint, inputs, reopt_version=None):
+    canonical = json.dumps(normalize(inputs), sort_keys=True, separators=(",", ":"), default=str)
+    return "reoptjl_defaults_{}_{}_{}".format(endpoint, reopt_version,
+                                              hashlib.sha256(canonical.encode("utf-8")).hexdigest())
+
+
+def stats_key(endpoint, stat):
+    return "reoptjl_defaults_cache_{}_{}".format(stat, endpoint)
+
+
+def get_defaults_cache_stats():
+    """
+    :return: dict of {"hits", "coalesced", "misses", "hit_rate"} by endpoint, where coalesced requests waited for a
+        concurrent identical request to Julia instead of making their own
+    """
+    counts = cache.get_many([stats_key(e, s) for e in ENDPOINTS for s in STATS])
+    stats = dict()
+    for endpoint in ENDPOINTS:
+        s = {stat: counts.get(stats_key(endpoint, stat), 0) for stat in STATS}
+        total = sum(s.values())
+        s["hit_rate"] = round((s["hits"] + s["coalesced"]) / total, 4) if total else 0
+        stats[endpoint] = s
+    return stats
+
+
+def pack(response_data):
+    """
+    :return: response_data with lists of at least COMPACT_SERIES_LENGTH floats as float64 arrays, which are smaller
+        and faster to (un)pickle than lists of Python floats
+    """
+    if not isinstance(response_data, dict):
+        return response_data
+    return {k: np.array(v, dtype=float) if isinstance(v, list) and len(v) >= COMPACT_SERIES_LENGTH and
+            all(type(x) is float for x in v) else v for k, v in response_data.items()}
+
+
+def unpack(response_data):
+    if not isinstance(response_data, dict):
+        return response_data
+    return {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in response_data.items()}
+
+
+def call_julia(endpoint, inputs, method="GET"):
+    if method == "POST":
+        return get_julia_client().post_json("/{}/".format(endpoint), inputs)
+    return get_julia_client().get_json("/{}/".format(endpoint), json=inputs)
+
+
+def get_julia_defaults(endpoint, inputs, method="GET"):
+    """
+    Call a Julia defaults endpoint through the cache.
+    :param endpoint: str, Julia endpoint name, e.g. "chp_defaults"
+    :param inputs: dict, sent to Julia as JSON
+    :param method: str, "GET" or "POST"
+    :return: tuple, (status_code, decoded JSON response)
+    """
+    ttl = get_ttl(endpoint)
+    if ttl <= 0:
+        return call_julia(endpoint, inputs, method)
+
+    key = defaults_cache_key(endpoint, inputs, get_current_reopt_version())
+    response_data = cache.get(key)
+    if response_data is not None:
+        record(stats_key(endpoint, "hits"))
+        return 200, unpack(response_data)
+
+    lock_key = key + "_lock"
+    if not cache.add(lock_key, 1, timeout=COALESCE_WAIT_SECONDS):
+        # another worker is calling Julia with the same inputs; if it fails or takes too long, call Julia here
+        deadline = time.time() + COALESCE_WAIT_SECONDS
+        while time.time() < deadline:
+            time.sleep(COALESCE_POLL_SECONDS)
+            response_data = cache.get(key)
+            if response_data is not None:
+                record(stats_key(endpoint, "coalesced"))
+                return 200, unpack(response_data)
+            if cache.get(lock_key) is None:
+                break
+        record(stats_key(endpoint, "misses"))
+        return call_julia(endpoint, inputs, method)
+
+    record(stats_key(endpoint, "misses"))
+    try:
+        status_code, response_data = call_julia(endpoint, inputs, method)
+        if status_code == 200:
+            cache.set(key, pack(response_data), timeout=ttl)
+    finally:
+        cache.delete(lock_key)
+    return status_code, response_data
@@ -0,0 +1,174 @@
+# REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+"""
+Pooled, keep-alive HTTP client for the Julia servers (julia_src/http.jl).
+
+Julia hosts are set with the JULIA_HOSTS environment variable (comma separated), falling back to JULIA_HOST. Requests
+are dispatched to the healthy hosts either round robin or to the host with the fewest requests in flight
+(JULIA_DISPATCH = "round_robin" or "least_loaded"). In flight counts are kept in the Django cache so that they are
+shared across web and celery workers.
+"""
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.core.cache import cache
+import logging
+log = logging.getLogger(__name__)
+
+JULIA_PORT = 8081
+DISPATCH_METHODS = ("round_robin", "least_loaded")
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get('JULIA_CONNECT_TIMEOUT_SECONDS', 10))
+READ_TIMEOUT_SECONDS = float(os.environ.get('JULIA_READ_TIMEOUT_SECONDS', 600))
+# time allowed for Julia to build the model and return results on top of Settings.timeout_seconds
+READ_TIMEOUT_BUFFER_SECONDS = float(os.environ.get('JULIA_READ_TIMEOUT_BUFFER_SECONDS', 600))
+HEALTH_CHECK_INTERVAL_SECONDS = 30
+HEALTH_CHECK_TIMEOUT_SECONDS = 2
+CONNECT_RETRIES = 3
+
+
+def get_julia_hosts():
+    hosts = os.environ.get('JULIA_HOSTS')
+    if hosts:
+        return [h.strip() for h in hosts.split(',') if h.strip()]
+    return [os.environ.get('JULIA_HOST', "julia")]
+
+
+class JuliaClient(object):
+    """
+    Holds one requests.Session with a connection pool per Julia host. Only failed connections are retried, so a
+    POST is never sent twice to a Julia server that received it.
+    """
+
+    def __init__(self, hosts=None, dispatch=None, pool_maxsize=10):
+        self.hosts = hosts or get_julia_hosts()
+        self.dispatch = dispatch or os.environ.get('JULIA_DISPATCH', "round_robin")
+        if self.dispatch not in DISPATCH_METHODS:
+            raise ValueError("JULIA_DISPATCH must be one of {}, got {}.".format(DISPATCH_METHODS, self.dispatch))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=len(self.hosts),
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(total=CONNECT_RETRIES, connect=CONNECT_RETRIES, read=0, status=0, other=0,
+                              backoff_factor=0.5, raise_on_status=False)
+        )
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._next_host = random.randrange(len(self.hosts))  # so that workers don't all start on the same host
+        self._health = dict()  # host: (healthy, time checked)
+
+    def url(self, host, path):
+        return "http://{}:{}/{}".format(host, JULIA_PORT, path.lstrip("/"))
+
+    def is_healthy(self, host):
+        healthy, checked = self._health.get(host, (True, 0))
+        if time.time() - checked > HEALTH_CHECK_INTERVAL_SECONDS:
+            try:
+                response = self.session.get(self.url(host, "health"), timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+                healthy = response.status_code == 200
+            except requests.exceptions.RequestException:
+                healthy = False
+            self._health[host] = (healthy, time.time())
+            if not healthy:
+                log.warning("Julia host {} failed its health check.".format(host))
+        return healthy
+
+    def mark_unhealthy(self, host):
+        self._health[host] = (False, time.time())
+
+    def healthy_hosts(self):
+        if len(self.hosts) == 1:
+            return self.hosts
+        return [h for h in self.hosts if self.is_healthy(h)] or self.hosts
+
+    def choose_host(self, exclude=()):
+        hosts = [h for h in self.healthy_hosts() if h not in exclude] or list(self.hosts)
+        if self.dispatch == "least_loaded":
+            in_flight = cache.get_many([in_flight_key(h) for h in hosts])
+            return min(hosts, key=lambda h: in_flight.get(in_flight_key(h), 0))
+        with self._lock:
+            self._next_host = (self._next_host + 1) % len(self.hosts)
+            start = self._next_host
+        for i in range(len(self.hosts)):
+            host = self.hosts[(start + i) % len(self.hosts)]
+            if host in hosts:
+                return host
+        return hosts[0]
+
+    @contextmanager
+    def request(self, method, path, read_timeout=READ_TIMEOUT_SECONDS, **kwargs):
+        """
+        Send a request to one of the Julia hosts, failing over to the next host if the connection fails. The host
+        counts as loaded until the streamed response has been read and closed.
+        :param method: str, "GET" or "POST"
+        :param path: str, Julia endpoint, e.g. "/reopt/"
+        :param read_timeout: float, seconds to wait for the Julia server to respond
+        :param kwargs: passed on to requests.Session.request, e.g. json or params
+        :return: context manager yielding the streamed requests.Response
+        """
+        tried = []
+        while True:
+            host = self.choose_host(exclude=tried)
+            tried.append(host)
+            key = in_flight_key(host)
+            cache.add(key, 0, timeout=None)
+            try:
+                cache.incr(key)
+            except ValueError:  # key evicted between add and incr
+                cache.set(key, 1, timeout=None)
+            try:
+                try:
+                    response = self.session.request(method, self.url(host, path), stream=True,
+                                                    timeout=(CONNECT_TIMEOUT_SECONDS, read_timeout), **kwargs)
+                except requests.exceptions.ConnectionError:
+                    if len(tried) == len(self.hosts):
+                        raise
+                    log.warning("Could not connect to Julia host {}, trying another host.".format(host))
+                    self.mark_unhealthy(host)
+                    continue
+                with response:
+                    yield response
+                return
+            finally:
+                try:
+                    cache.decr(key)
+                except ValueError:
+                    pass
+
+    def post_json(self, path, data, read_timeout=READ_TIMEOUT_SECONDS):
+        """
+        POST data as JSON and decode the response body straight from the socket, without holding a second copy of
+        the (possibly multi-megabyte) response as text.
+        :return: tuple, (status_code, decoded JSON response)
+        """
+        with self.request("POST", path, read_timeout=read_timeout, json=data) as response:
+            response.raw.decode_content = True
+            return response.status_code, json.load(response.raw)
+
+    def get_json(self, path, read_timeout=READ_TIMEOUT_SECONDS, **kwargs):
+        with self.request("GET", path, read_timeout=read_timeout, **kwargs) as response:
+            response.raw.decode_content = True
+            return response.status_code, json.load(response.raw)
+
+
+def in_flight_key(host):
+    return "julia_in_flight_{}".format(host)
+
+
+_client = None
+_client_pid = None
+
+
+def get_julia_client():
+    """
+    One JuliaClient per process, so that the connection pool is shared by every job run in a (forked) celery worker
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = JuliaClient()
+        _client_pid = os.getpid()
+    return _client
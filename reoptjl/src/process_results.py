@@ -10,15 +10,60 @@ from reoptjl.models import FinancialOutputs, APIMeta, PVOutputs, ElectricStorage
                         ElectricHeaterOutputs, ASHPSpaceHeaterOutputs, ASHPWaterHeaterOutputs, \
                         SiteInputs, ASHPSpaceHeaterInputs, ASHPWaterHeaterInputs, CSTInputs, CSTOutputs, PVInputs, \
                         HighTempThermalStorageInputs, HighTempThermalStorageOutputs, ElectricTariffInputs
-import numpy as np
+from django.db import transaction
 import sys
 import traceback as tb
 import logging
 log = logging.getLogger(__name__)
 
+# results key: output model, for the outputs that are saved as returned by REopt.jl
+OUTPUT_MODELS = {
+    "Financial": FinancialOutputs,
+    "ElectricTariff": ElectricTariffOutputs,
+    "ElectricUtility": ElectricUtilityOutputs,
+    "ElectricLoad": ElectricLoadOutputs,
+    "Site": SiteOutputs,
+    "PV": PVOutputs,
+    "ElectricStorage": ElectricStorageOutputs,
+    "Generator": GeneratorOutputs,
+    "Wind": WindOutputs,
+    "Boiler": BoilerOutputs,
+    "ExistingBoiler": ExistingBoilerOutputs,
+    "ExistingChiller": ExistingChillerOutputs,
+    "HotThermalStorage": HotThermalStorageOutputs,
+    "ColdThermalStorage": ColdThermalStorageOutputs,
+    "HeatingLoad": HeatingLoadOutputs,
+    "CoolingLoad": CoolingLoadOutputs,
+    "CHP": CHPOutputs,
+    "AbsorptionChiller": AbsorptionChillerOutputs,
+    "Outages": OutageOutputs,
+    "SteamTurbine": SteamTurbineOutputs,
+    "GHP": GHPOutputs,
+    "ElectricHeater": ElectricHeaterOutputs,
+    "ASHPSpaceHeater": ASHPSpaceHeaterOutputs,
+    "ASHPWaterHeater": ASHPWaterHeaterOutputs,
+    "CST": CSTOutputs,
+    "HighTempThermalStorage": HighTempThermalStorageOutputs,
+}
+REQUIRED_OUTPUTS = ["Financial", "ElectricTariff", "ElectricUtility", "ElectricLoad", "Site"]
+OUTAGES_MULTI_DIM_ARRAY_NAMES = ["unserved_load_series_kw", "unserved_load_per_outage_kwh", 
+                                "storage_discharge_series_kw", "pv_to_storage_series_kw", 
+                                "pv_curtailed_series_kw", "pv_to_load_series_kw", 
+                                "wind_to_storage_series_kw", 
+                                "wind_curtailed_series_kw", "wind_to_load_series_kw", 
+                                "generator_to_storage_series_kw", "generator_curtailed_series_kw", 
+                                "generator_to_load_series_kw", "generator_fuel_used_per_outage_gal",
+                                "chp_to_storage_series_kw", "chp_curtailed_series_kw", 
+                                "chp_to_load_series_kw", "chp_fuel_used_per_outage_mmbtu",
+                                "critical_loads_per_outage_series_kw", "soc_series_fraction"]
+GHP_KEYS_TO_SKIP = ["solve_time_min", "number_of_boreholes_nonhybrid", 
+                    "number_of_boreholes_auto_guess", "number_of_boreholes_flipped_guess",
+                    "iterations_nonhybrid", "iterations_auto_guess", "iterations_flipped_guess"]
+
 def process_results(results: dict, run_uuid: str) -> None:
     """
     Saves the results returned from the Julia API in the backend database.
+    The status and all of the outputs are saved in one transaction, with one INSERT per output model.
     Called in reoptjl/run_jump_model (a celery task)
     """
     try:
@@ -27,79 +72,34 @@ def process_results(results: dict, run_uuid: str) -> None:
 
         meta = APIMeta.objects.get(run_uuid=run_uuid)
         meta.status = results.get("status")
-        meta.save(update_fields=["status"])
 
+        outputs = []
         if "Messages" in results.keys():
-            REoptjlMessageOutputs.create(meta=meta, **results["Messages"]).save()
+            outputs.append(REoptjlMessageOutputs.create(meta=meta, **results["Messages"]))
         if results.get("status") != "error":
-            FinancialOutputs.create(meta=meta, **results["Financial"]).save()
-            ElectricTariffOutputs.create(meta=meta, **results["ElectricTariff"]).save()
-            ElectricUtilityOutputs.create(meta=meta, **results["ElectricUtility"]).save()
-            ElectricLoadOutputs.create(meta=meta, **results["ElectricLoad"]).save()
-            SiteOutputs.create(meta=meta, **results["Site"]).save()
-            if "PV" in results.keys():
-                if isinstance(results["PV"], dict):
-                    PVOutputs.create(meta=meta, **results["PV"]).save()
-                elif isinstance(results["PV"], list):
-                    for pvdict in results["PV"]:
-                        PVOutputs.create(meta=meta, **pvdict).save()
-            if "ElectricStorage" in results.keys():
-                ElectricStorageOutputs.create(meta=meta, **results["ElectricStorage"]).save()
-            if "Generator" in results.keys():
-                GeneratorOutputs.create(meta=meta, **results["Generator"]).save()
-            if "Wind" in results.keys():
-                WindOutputs.create(meta=meta, **results["Wind"]).save()
-            if "Boiler" in results.keys():
-                BoilerOutputs.create(meta=meta, **results["Boiler"]).save()
-            if "ExistingBoiler" in results.keys():
-                ExistingBoilerOutputs.create(meta=meta, **results["ExistingBoiler"]).save()
-            if "ExistingChiller" in results.keys():
-                ExistingChillerOutputs.create(meta=meta, **results["ExistingChiller"]).save()
-            if "HotThermalStorage" in results.keys():
-                HotThermalStorageOutputs.create(meta=meta, **results["HotThermalStorage"]).save()
-            if "ColdThermalStorage" in results.keys():
-                ColdThermalStorageOutputs.create(meta=meta, **results["ColdThermalStorage"]).save()
-            if "HeatingLoad" in results.keys():
-                HeatingLoadOutputs.create(meta=meta, **results["HeatingLoad"]).save()
-            if "CoolingLoad" in results.keys():
-                CoolingLoadOutputs.create(meta=meta, **results["CoolingLoad"]).save()
-            if "CHP" in results.keys():
-                CHPOutputs.create(meta=meta, **results["CHP"]).save()
-            if "AbsorptionChiller" in results.keys():
-                AbsorptionChillerOutputs.create(meta=meta, **results["AbsorptionChiller"]).save()
+            for key in REQUIRED_OUTPUTS:
+                outputs.append(OUTPUT_MODELS[key].create(meta=meta, **results[key]))
             if "Outages" in results.keys():
-                for multi_dim_array_name in ["unserved_load_series_kw", "unserved_load_per_outage_kwh", 
-                                            "storage_discharge_series_kw", "pv_to_storage_series_kw", 
-                                            "pv_curtailed_series_kw", "pv_to_load_series_kw", 
-                                            "wind_to_storage_series_kw", 
-                                            "wind_curtailed_series_kw", "wind_to_load_series_kw", 
-                                            "generator_to_storage_series_kw", "generator_curtailed_series_kw", 
-                                            "generator_to_load_series_kw", "generator_fuel_used_per_outage_gal",
-                                            "chp_to_storage_series_kw", "chp_curtailed_series_kw", 
-                                            "chp_to_load_series_kw", "chp_fuel_used_per_outage_mmbtu",
-                                            "critical_loads_per_outage_series_kw", "soc_series_fraction"]:
+                for multi_dim_array_name in OUTAGES_MULTI_DIM_ARRAY_NAMES:
                     if multi_dim_array_name in results["Outages"]:
-                        results["Outages"][multi_dim_array_name] = np.transpose(results["Outages"][multi_dim_array_name]).tolist()
-                OutageOutputs.create(meta=meta, **results["Outages"]).save()
-            if "SteamTurbine" in results.keys():
-                SteamTurbineOutputs.create(meta=meta, **results["SteamTurbine"]).save()
+                        results["Outages"][multi_dim_array_name] = transpose(results["Outages"][multi_dim_array_name])
             if "GHP" in results.keys():
-                for pop_key in ["solve_time_min", "number_of_boreholes_nonhybrid", 
-                                "number_of_boreholes_auto_guess", "number_of_boreholes_flipped_guess",
-                                "iterations_nonhybrid", "iterations_auto_guess", "iterations_flipped_guess"]:
+                for pop_key in GHP_KEYS_TO_SKIP:
                     results["GHP"].pop(pop_key, None)
-                GHPOutputs.create(meta=meta, **results["GHP"]).save() 
-            if "ElectricHeater" in results.keys():
-                ElectricHeaterOutputs.create(meta=meta, **results["ElectricHeater"]).save()
-            if "ASHPSpaceHeater" in results.keys():
-                ASHPSpaceHeaterOutputs.create(meta=meta, **results["ASHPSpaceHeater"]).save()
-            if "ASHPWaterHeater" in results.keys():
-                ASHPWaterHeaterOutputs.create(meta=meta, **results["ASHPWaterHeater"]).save()
-            if "CST" in results.keys():
-                CSTOutputs.create(meta=meta, **results["CST"]).save()
-            if "HighTempThermalStorage" in results.keys():
-                HighTempThermalStorageOutputs.create(meta=meta, **results["HighTempThermalStorage"]).save()               
+            for key, model in OUTPUT_MODELS.items():
+                if key in REQUIRED_OUTPUTS or key not in results.keys():
+                    continue
+                if isinstance(results[key], list):  # e.g. multiple PVs
+                    for d in results[key]:
+                        outputs.append(model.create(meta=meta, **d))
+                elif isinstance(results[key], dict):
+                    outputs.append(model.create(meta=meta, **results[key]))
             # TODO process rest of results
+
+        # savepoint=False: when called within run_jump_model's transaction any error rolls back the whole job
+        with transaction.atomic(savepoint=False):
+            meta.save(update_fields=["status"])
+            bulk_save(outputs)
     except Exception as e:
         exc_type, exc_value, exc_traceback = sys.exc_info()
         debug_msg = "exc_type: {}; exc_value: {}; exc_traceback: {}".format(
@@ -110,6 +110,28 @@ def process_results(results: dict, run_uuid: str) -> None:
         log.debug(debug_msg)
         raise e
 
+def bulk_save(objs: list) -> None:
+    """
+    Insert unsaved model objects with one bulk_create per model.
+    bulk_create does not call Model.save, so any work done in an overridden save must be done here.
+    """
+    objs_by_model = dict()
+    for obj in objs:
+        if isinstance(obj, ElectricUtilityOutputs):
+            obj.calculate_peak_demand()
+        objs_by_model.setdefault(type(obj), []).append(obj)
+    for model, model_objs in objs_by_model.items():
+        model.objects.bulk_create(model_objs)
+
+def transpose(matrix: list) -> list:
+    """
+    Transpose a list of lists without converting to a numpy array and back, which copies every value twice.
+    Lists that are not 2-D are returned as is (as np.transpose would).
+    """
+    if not matrix or not isinstance(matrix[0], list):
+        return matrix
+    return [list(row) for row in zip(*matrix)]
+
 def pop_result_keys(r:dict, keys_to_skip:list):
     for k in r.keys():
         if (type(r[k])) == dict:
@@ -127,61 +149,61 @@ def update_inputs_in_database(inputs_to_update: dict, run_uuid: str) -> None:
     """
 
     try:
-        # get input models that need updating
-        FinancialInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["Financial"])
-        ElectricUtilityInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ElectricUtility"])
+        # one savepoint for all of the updates, so that a failed update does not break run_jump_model's transaction;
+        # optional keys use .get so that a key missing from older versions of REopt.jl does not roll back the rest
+        with transaction.atomic():
+            # get input models that need updating
+            FinancialInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["Financial"])
+            ElectricUtilityInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ElectricUtility"])
         
-        if inputs_to_update["Site"]:
-            SiteInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["Site"])
+            if inputs_to_update.get("Site"):
+                SiteInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["Site"])
 
-        if inputs_to_update["CHP"]:  # Will be an empty dictionary if CHP is not considered
-            if inputs_to_update["CHP"].get("installed_cost_per_kw") and type(inputs_to_update["CHP"].get("installed_cost_per_kw")) == float:
-                inputs_to_update["CHP"]["installed_cost_per_kw"] = [inputs_to_update["CHP"]["installed_cost_per_kw"]]
-            CHPInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["CHP"])
-        if inputs_to_update["SteamTurbine"]:  # Will be an empty dictionary if SteamTurbine is not considered
-            SteamTurbineInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["SteamTurbine"])
-        if inputs_to_update["GHP"]:
-            GHPInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["GHP"])
-        if inputs_to_update["ExistingChiller"]:
-            if not ExistingChillerInputs.objects.filter(meta__run_uuid=run_uuid):
-                meta = APIMeta.objects.get(run_uuid=run_uuid)
-                ExistingChillerInputs.create(meta=meta, **inputs_to_update["ExistingChiller"]).save()
-            else:
-                ExistingChillerInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ExistingChiller"])
-        if inputs_to_update["ASHPSpaceHeater"]:
-            prune_update_fields(ASHPSpaceHeaterInputs, inputs_to_update["ASHPSpaceHeater"])
-            ASHPSpaceHeaterInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ASHPSpaceHeater"])
-        if inputs_to_update["ASHPWaterHeater"]:
-            prune_update_fields(ASHPWaterHeaterInputs, inputs_to_update["ASHPWaterHeater"])
-            ASHPWaterHeaterInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ASHPWaterHeater"])
-        if inputs_to_update["PV"]:
-            prune_update_fields(PVInputs, inputs_to_update["PV"])
-            PVInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["PV"])  
-        if inputs_to_update["Wind"]:
-            prune_update_fields(WindInputs, inputs_to_update["Wind"])
-            WindInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["Wind"])  
-        if inputs_to_update["ElectricStorage"]:
-            prune_update_fields(ElectricStorageInputs, inputs_to_update["ElectricStorage"])
-            ElectricStorageInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ElectricStorage"])  
-        if inputs_to_update["ColdThermalStorage"]:
-            prune_update_fields(ColdThermalStorageInputs, inputs_to_update["ColdThermalStorage"])
-            ColdThermalStorageInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ColdThermalStorage"])  
-        if inputs_to_update["HotThermalStorage"]:
-            prune_update_fields(HotThermalStorageInputs, inputs_to_update["HotThermalStorage"])
-            HotThermalStorageInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["HotThermalStorage"])  
-        if inputs_to_update["HighTempThermalStorage"]:
-            prune_update_fields(HighTempThermalStorageInputs, inputs_to_update["HighTempThermalStorage"])
-            HighTempThermalStorageInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["HighTempThermalStorage"])  
-        # TODO CST is not added to this inputs_with_defaults_set_in_julia dictionary in http.jl, IF we need to update any CST inputs
-        if inputs_to_update.get("CST") is not None:
-            prune_update_fields(CSTInputs, inputs_to_update["CST"])
-            CSTInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["CST"])
-        if inputs_to_update.get("HighTempThermalStorage") is not None:
-            prune_update_fields(HighTempThermalStorageInputs, inputs_to_update["HighTempThermalStorage"])
-            HighTempThermalStorageInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["HighTempThermalStorage"])
-        if inputs_to_update.get("ElectricTariff"):
-            prune_update_fields(ElectricTariffInputs, inputs_to_update["ElectricTariff"])
-            ElectricTariffInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ElectricTariff"])            
+            if inputs_to_update.get("CHP"):  # Will be an empty dictionary if CHP is not considered
+                if inputs_to_update["CHP"].get("installed_cost_per_kw") and type(inputs_to_update["CHP"].get("installed_cost_per_kw")) == float:
+                    inputs_to_update["CHP"]["installed_cost_per_kw"] = [inputs_to_update["CHP"]["installed_cost_per_kw"]]
+                CHPInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["CHP"])
+            if inputs_to_update.get("SteamTurbine"):  # Will be an empty dictionary if SteamTurbine is not considered
+                SteamTurbineInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["SteamTurbine"])
+            if inputs_to_update.get("GHP"):
+                GHPInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["GHP"])
+            if inputs_to_update.get("ExistingChiller"):
+                if not ExistingChillerInputs.objects.filter(meta__run_uuid=run_uuid):
+                    meta = APIMeta.objects.get(run_uuid=run_uuid)
+                    ExistingChillerInputs.create(meta=meta, **inputs_to_update["ExistingChiller"]).save()
+                else:
+                    ExistingChillerInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ExistingChiller"])
+            if inputs_to_update.get("ASHPSpaceHeater"):
+                prune_update_fields(ASHPSpaceHeaterInputs, inputs_to_update["ASHPSpaceHeater"])
+                ASHPSpaceHeaterInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ASHPSpaceHeater"])
+            if inputs_to_update.get("ASHPWaterHeater"):
+                prune_update_fields(ASHPWaterHeaterInputs, inputs_to_update["ASHPWaterHeater"])
+                ASHPWaterHeaterInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ASHPWaterHeater"])
+            if inputs_to_update.get("PV"):
+                prune_update_fields(PVInputs, inputs_to_update["PV"])
+                PVInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["PV"])  
+            if inputs_to_update.get("Wind"):
+                prune_update_fields(WindInputs, inputs_to_update["Wind"])
+                WindInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["Wind"])  
+            if inputs_to_update.get("ElectricStorage"):
+                prune_update_fields(ElectricStorageInputs, inputs_to_update["ElectricStorage"])
+                ElectricStorageInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ElectricStorage"])  
+            if inputs_to_update.get("ColdThermalStorage"):
+                prune_update_fields(ColdThermalStorageInputs, inputs_to_update["ColdThermalStorage"])
+                ColdThermalStorageInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ColdThermalStorage"])  
+            if inputs_to_update.get("HotThermalStorage"):
+                prune_update_fields(HotThermalStorageInputs, inputs_to_update["HotThermalStorage"])
+                HotThermalStorageInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["HotThermalStorage"])  
+            if inputs_to_update.get("HighTempThermalStorage"):
+                prune_update_fields(HighTempThermalStorageInputs, inputs_to_update["HighTempThermalStorage"])
+                HighTempThermalStorageInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["HighTempThermalStorage"])  
+            # TODO CST is not added to this inputs_with_defaults_set_in_julia dictionary in http.jl, IF we need to update any CST inputs
+            if inputs_to_update.get("CST") is not None:
+                prune_update_fields(CSTInputs, inputs_to_update["CST"])
+                CSTInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["CST"])
+            if inputs_to_update.get("ElectricTariff"):
+                prune_update_fields(ElectricTariffInputs, inputs_to_update["ElectricTariff"])
+                ElectricTariffInputs.objects.filter(meta__run_uuid=run_uuid).update(**inputs_to_update["ElectricTariff"])            
     except Exception as e:
         exc_type, exc_value, exc_traceback = sys.exc_info()
         debug_msg = "exc_type: {}; exc_value: {}; exc_traceback: {}".format(
@@ -0,0 +1,117 @@
+# REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+"""
+Content-addressed cache of REopt.jl results.
+
+Each job's inputs (after API defaults, without user_uuid and api_key) are hashed and stored on APIMeta.inputs_hash.
+When a new job has the same hash as an optimal job that was solved within REOPT_RESULT_CACHE_TTL_SECONDS with the
+current version of REopt.jl, the outputs of that job are cloned to the new run_uuid instead of calling Julia.
+Results are invalidated whenever run_jump_model sees a new reopt_version.
+"""
+import hashlib
+import json
+import os
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from reoptjl.models import APIMeta, get_input_dict_from_run_uuid
+import logging
+log = logging.getLogger(__name__)
+
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get('REOPT_RESULT_CACHE_TTL_SECONDS', 7 * 24 * 3600))  # 0 to disable
+REOPT_VERSION_KEY = "reoptjl_current_reopt_version"
+HITS_KEY = "reoptjl_result_cache_hits"
+MISSES_KEY = "reoptjl_result_cache_misses"
+INPUT_KEYS_TO_IGNORE = ["user_uuid", "api_key"]
+
+
+def get_inputs_hash(run_uuid):
+    """
+    :return: str, sha256 of the canonical JSON of the inputs for run_uuid
+    """
+    d = get_input_dict_from_run_uuid(run_uuid)
+    for key in INPUT_KEYS_TO_IGNORE:
+        d.pop(key, None)
+    canonical = json.dumps(d, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def get_current_reopt_version():
+    version = cache.get(REOPT_VERSION_KEY)
+    if version is None:
+        latest = APIMeta.objects.exclude(reopt_version__in=["", None]).order_by("-created").only("reopt_version").first()
+        if latest is None:
+            return None
+        version = latest.reopt_version
+        cache.set(REOPT_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def set_current_reopt_version(reopt_version):
+    """
+    Invalidation hook called by run_jump_model with the reopt_version returned by Julia. Cached results are only
+    reused when they were solved with the current reopt_version.
+    """
+    if reopt_version and cache.get(REOPT_VERSION_KEY) != reopt_version:
+        log.info("REopt.jl version is now {}, invalidating cached results.".format(reopt_version))
+        cache.set(REOPT_VERSION_KEY, reopt_version, timeout=None)
+
+
+def record(key):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def get_result_cache_stats():
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = stats.get(HITS_KEY, 0), stats.get(MISSES_KEY, 0)
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0}
+
+
+def find_cached_result(run_uuid):
+    """
+    Save the inputs hash for run_uuid and find an optimal run with the same inputs to reuse.
+    :return: APIMeta of the cached run, or None
+    """
+    inputs_hash = get_inputs_hash(run_uuid)
+    APIMeta.objects.filter(run_uuid=run_uuid).update(inputs_hash=inputs_hash)
+    if RESULT_CACHE_TTL_SECONDS <= 0:
+        return None
+
+    reopt_version = get_current_reopt_version()
+    cached = None
+    if reopt_version is not None:
+        cached = APIMeta.objects.filter(
+            inputs_hash=inputs_hash,
+            status="optimal",
+            reopt_version=reopt_version,
+            created__gte=timezone.now() - timedelta(seconds=RESULT_CACHE_TTL_SECONDS)
+        ).exclude(run_uuid=run_uuid).order_by("-created").first()
+    record(HITS_KEY if cached is not None else MISSES_KEY)
+    return cached
+
+
+def clone_results(cached_meta, run_uuid):
+    """
+    Copy the inputs (including defaults set in Julia) and outputs of cached_meta to run_uuid and mark it optimal
+    """
+    meta = APIMeta.objects.get(run_uuid=run_uuid)
+    with transaction.atomic():
+        for relation in APIMeta._meta.related_objects:
+            model = relation.related_model
+            if model.__name__.endswith("Inputs"):
+                model.objects.filter(meta=meta).delete()
+            elif not model.__name__.endswith("Outputs"):
+                continue  # e.g. UserProvidedMeta and Message belong to each run
+            rows = list(model.objects.filter(meta=cached_meta))
+            for row in rows:
+                row.pk = None
+                row.meta = meta
+                row._state.adding = True
+            model.objects.bulk_create(rows)
+        APIMeta.objects.filter(run_uuid=run_uuid).update(status=cached_meta.status,
+                                                         reopt_version=cached_meta.reopt_version)
+    log.info("Reused results of {} for {}.".format(cached_meta.run_uuid, run_uuid))
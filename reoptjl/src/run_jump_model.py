@@ -1,14 +1,16 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
 import sys
 import traceback
-import os
 import time
 import requests
 from celery import shared_task, Task
+from django.db import transaction
 from reo.exceptions import REoptError, OptimizationTimeout, UnexpectedError, NotOptimal, REoptFailedToStartError
 from reoptjl.models import APIMeta, Message, get_input_dict_from_run_uuid
 from reo.src.profiler import Profiler
 from reoptjl.src.process_results import process_results, update_inputs_in_database
+from reoptjl.src.julia_client import get_julia_client, READ_TIMEOUT_BUFFER_SECONDS
+from reoptjl.src.result_cache import set_current_reopt_version
 from celery.utils.log import get_task_logger
 logger = get_task_logger(__name__)
 
@@ -63,10 +65,10 @@ def run_jump_model(run_uuid):
     logger.info("Running JuMP model ...")
     try:
         t_start = time.time()
-        julia_host = os.environ.get('JULIA_HOST', "julia")
-        response = requests.post("http://" + julia_host + ":8081/reopt/", json=data)
-        response_json = response.json()
-        if response.status_code == 500:
+        status_code, response_json = get_julia_client().post_json(
+            "/reopt/", data, read_timeout=data["Settings"]["timeout_seconds"] + READ_TIMEOUT_BUFFER_SECONDS
+        )
+        if status_code == 500:
             raise REoptFailedToStartError(task=name, message=response_json["error"], run_uuid=run_uuid, user_uuid=user_uuid)
         results = response_json["results"]
         reopt_version = response_json["reopt_version"]
@@ -82,6 +84,11 @@ def run_jump_model(run_uuid):
         if isinstance(e, requests.exceptions.ConnectionError):  # Julia server down
             raise REoptFailedToStartError(task=name, message="Julia server is down.", run_uuid=run_uuid, user_uuid=user_uuid)
 
+        if isinstance(e, requests.exceptions.ReadTimeout):  # Julia server did not respond in time
+            msg = "Optimization exceeded timeout: {} seconds.".format(data["Settings"]["timeout_seconds"])
+            logger.info(msg)
+            raise OptimizationTimeout(task=name, message=msg, run_uuid=run_uuid, user_uuid=user_uuid)
+
         if "DimensionMismatch" in e.args[0]:  # JuMP may mishandle a timeout when no feasible solution is returned
             msg = "Optimization exceeded timeout: {} seconds.".format(data["Settings"]["timeout_seconds"])
             logger.info(msg)
@@ -108,8 +115,10 @@ def run_jump_model(run_uuid):
 
     profiler.profileEnd()
     # TODO save profile times
-    APIMeta.objects.filter(run_uuid=run_uuid).update(reopt_version=reopt_version)
-    if status.strip().lower() != 'error':
-        update_inputs_in_database(inputs_with_defaults_set_in_julia, run_uuid)
-    process_results(results, run_uuid)
+    set_current_reopt_version(reopt_version)
+    with transaction.atomic():  # results are only visible once all of them are saved
+        APIMeta.objects.filter(run_uuid=run_uuid).update(reopt_version=reopt_version)
+        if status.strip().lower() != 'error':
+            update_inputs_in_database(inputs_with_defaults_set_in_julia, run_uuid)
+        process_results(results, run_uuid)
     return True
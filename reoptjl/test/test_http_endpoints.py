@@ -5,6 +5,8 @@ from django.test import TestCase  # have to use unittest.TestCase to get tests t
 import logging
 import os
 import requests
+from reoptjl.src.julia_client import JuliaClient, get_julia_client
+from reoptjl.src.defaults_cache import get_defaults_cache_stats, defaults_cache_key
 logging.disable(logging.CRITICAL)
 
 class TestHTTPEndpoints(ResourceTestCaseMixin, TestCase):
@@ -540,3 +542,65 @@ class TestHTTPEndpoints(ResourceTestCaseMixin, TestCase):
         self.assertEqual(view_response["size_class"], 3)   
 
 
+
+    def test_julia_client(self):
+        client = get_julia_client()
+        self.assertIs(client, get_julia_client())  # one pooled client per process
+
+        status_code, response = client.get_json("/health")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(response["Julia-api"], "healthy!")
+
+        # unreachable hosts are skipped once they fail their health check
+        client = JuliaClient(hosts=client.hosts + ["unreachable.invalid"], dispatch="least_loaded")
+        self.assertNotEqual(client.choose_host(), "unreachable.invalid")
+        self.assertIn("unreachable.invalid", client.hosts)
+
+    def test_defaults_cache(self):
+        inputs = {
+            "sector": "federal",
+            "federal_procurement_type": "fedowned_dirpurch",
+            "federal_sector_state": "CA"
+        }
+        resp = self.api_client.get(f'/v3/sector_defaults', data=inputs)
+        self.assertHttpOK(resp)
+        stats = get_defaults_cache_stats()["sector_defaults"]
+
+        # the same query in another order is served from the cache
+        resp2 = self.api_client.get(f'/v3/sector_defaults', data=dict(reversed(list(inputs.items()))))
+        self.assertHttpOK(resp2)
+        self.assertEqual(json.loads(resp.content), json.loads(resp2.content))
+        self.assertEqual(get_defaults_cache_stats()["sector_defaults"]["hits"], stats["hits"] + 1)
+        self.assertEqual(get_defaults_cache_stats()["sector_defaults"]["misses"], stats["misses"])
+
+        # errors are not cached
+        inputs["sector"] = "badsector"
+        for _ in range(2):
+            self.assertHttpBadRequest(self.api_client.get(f'/v3/sector_defaults', data=inputs))
+        self.assertEqual(get_defaults_cache_stats()["sector_defaults"]["misses"], stats["misses"] + 2)
+
+        self.assertEqual(defaults_cache_key("easiur_costs", {"latitude": "39.70", "longitude": "-105.2"}),
+                         defaults_cache_key("easiur_costs", {"longitude": "-105.20", "latitude": "39.7"}))
+        self.assertNotEqual(defaults_cache_key("easiur_costs", {"latitude": "39.7"}, "0.50.0"),
+                            defaults_cache_key("easiur_costs", {"latitude": "39.7"}, "0.51.0"))
+
+    def test_simulated_load_batch(self):
+        mixes = [{"doe_reference_name": ["LargeOffice", "FlatLoad"], "percent_share": [share, 1.0 - share],
+                  "latitude": 36.12, "longitude": -115.5, "annual_kwh": 1.5e7, "year": 2021} for share in [0.4, 0.6]]
+        resp = self.api_client.post(f'/stable/simulated_load', format='json',
+                                    data={"batch": mixes + [{"latitude": 36.12, "longitude": -115.5}]})
+        self.assertHttpOK(resp)
+        batch = json.loads(resp.content)["batch"]
+        self.assertEqual(len(batch), 3)
+        for r in batch[:2]:
+            self.assertEqual(len(r["loads_kw"]), 8760)
+            self.assertAlmostEqual(r["annual_kwh"], 1.5e7, delta=1.0)
+        self.assertNotEqual(batch[0]["loads_kw"], batch[1]["loads_kw"])
+        self.assertIn("Missing either of", batch[2]["Error"])
+
+        # the same building mix is served from the cache
+        hits = get_defaults_cache_stats()["simulated_load"]["hits"]
+        resp = self.api_client.post(f'/stable/simulated_load', format='json', data=mixes[1])
+        self.assertHttpOK(resp)
+        self.assertEqual(json.loads(resp.content), batch[1])
+        self.assertEqual(get_defaults_cache_stats()["simulated_load"]["hits"], hits + 1)
@@ -1,6 +1,9 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
 import numpy as np
 from cProfile import run
+import csv
+import datetime
+import io
 import json
 from tastypie.test import ResourceTestCaseMixin
 from django.test import TransactionTestCase 
@@ -11,6 +14,16 @@ import logging
 import requests
 logging.disable(logging.CRITICAL)
 import os
+import uuid
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import openpyxl
+from reoptjl.models import APIMeta, UserUnlinkedRuns, Settings, ElectricLoadInputs, ElectricLoadOutputs, \
+    ElectricTariffInputs, ElectricTariffOutputs
+from reoptjl.src.result_cache import get_result_cache_stats
+import reoptjl.custom_table_config as table_config_module
+from reoptjl.custom_table_helpers import flatten_dict, sum_vectors
+from reoptjl.views import summarize_vector_data_for_table
 
 
 class TestJobEndpoint(ResourceTestCaseMixin, TransactionTestCase):
@@ -23,7 +36,9 @@ class TestJobEndpoint(ResourceTestCaseMixin, TransactionTestCase):
         self.assertHttpCreated(resp)
         r = json.loads(resp.content)
         run_uuid = r.get('run_uuid')
-        resp = self.api_client.get(f'/v3/job/{run_uuid}/results')
+        # inputs, outputs and their prefetched PVInputs, Message and PVOutputs
+        with self.assertNumQueries(5):
+            resp = self.api_client.get(f'/v3/job/{run_uuid}/results')
         r = json.loads(resp.content)
         self.assertIn("reopt_version", r.keys())
         results = r["outputs"]
@@ -36,6 +51,23 @@ class TestJobEndpoint(ResourceTestCaseMixin, TransactionTestCase):
         self.assertAlmostEqual(results["Outages"]["microgrid_upgrade_capital_cost"], 1974429.4, delta=5000.0)
         self.assertAlmostEqual(results["Financial"]["lcc"], 59865240.0, delta=0.01*results["Financial"]["lcc"])
 
+        # status endpoint returns the same status without inputs or outputs, and 304 when it has not changed
+        resp = self.api_client.get(f'/v3/job/{run_uuid}/status')
+        self.assertHttpOK(resp)
+        status = json.loads(resp.content)
+        self.assertEqual(status["status"], r["status"])
+        self.assertNotIn("outputs", status.keys())
+        resp = self.client.get(f'/v3/job/{run_uuid}/status', HTTP_IF_NONE_MATCH=resp["ETag"])
+        self.assertEqual(resp.status_code, 304)
+        resp = self.client.get(f'/v3/job/{run_uuid}/status?wait=10', HTTP_IF_NONE_MATCH=resp["ETag"])
+        self.assertEqual(resp.status_code, 304)  # the status is final, so no waiting
+        etag = resp["ETag"]
+        for wait in ("nan", "inf", "abc"):
+            resp = self.client.get(f'/v3/job/{run_uuid}/status?wait={wait}', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resp.status_code, 400)
+        resp = self.client.get(f'/v3/job/{run_uuid}/status?wait=-1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)  # negative wait is no wait
+
     def test_pv_battery_and_emissions_defaults_from_julia(self):
         """
         Same test post as "Solar and ElectricStorage w/BAU" in the Julia package. Used in development of v3.
@@ -381,4 +413,133 @@ class TestJobEndpoint(ResourceTestCaseMixin, TransactionTestCase):
         r = json.loads(resp.content)
         
         self.assertEqual(r["inputs"]["PV"]["size_class"], 2)
-        self.assertAlmostEqual(r["inputs"]["PV"]["installed_cost_per_kw"], 2914.6, delta=0.05 * 2914.6)
\ No newline at end of file
+        self.assertAlmostEqual(r["inputs"]["PV"]["installed_cost_per_kw"], 2914.6, delta=0.05 * 2914.6)
+
+    def test_result_cache(self):
+        """
+        Posting the same scenario twice should reuse the results of the first (optimal) run for the second run.
+        """
+        post_file = os.path.join('reoptjl', 'test', 'posts', 'pv_batt_emissions.json')
+        post = json.load(open(post_file, 'r'))
+
+        resp = self.api_client.post('/v3/job/', format='json', data=post)
+        self.assertHttpCreated(resp)
+        run_uuid = json.loads(resp.content).get('run_uuid')
+        r = json.loads(self.api_client.get(f'/v3/job/{run_uuid}/results').content)
+        self.assertNotIn("inputs_hash", r)
+
+        hits = get_result_cache_stats()["hits"]
+        resp = self.api_client.post('/v3/job/', format='json', data=post)
+        self.assertHttpCreated(resp)
+        cached_run_uuid = json.loads(resp.content).get('run_uuid')
+        self.assertNotEqual(run_uuid, cached_run_uuid)
+        self.assertEqual(get_result_cache_stats()["hits"], hits + 1)
+        self.assertEqual(APIMeta.objects.get(run_uuid=run_uuid).inputs_hash,
+                         APIMeta.objects.get(run_uuid=cached_run_uuid).inputs_hash)
+
+        cached_r = json.loads(self.api_client.get(f'/v3/job/{cached_run_uuid}/results').content)
+        self.assertEqual(cached_r["status"], "optimal")
+        self.assertEqual(cached_r["reopt_version"], r["reopt_version"])
+        self.assertDictEqual(cached_r["outputs"], r["outputs"])
+        self.assertDictEqual(cached_r["inputs"], r["inputs"])
+
+    def test_summary_query_count(self):
+        """
+        The number and size of the queries made by the summary endpoints should not depend on the number of runs
+        """
+        user_uuid = str(uuid.uuid4())
+
+        def query_counts():
+            counts = []
+            for url in [f'/v3/user/{user_uuid}/summary', f'/v3/user/{user_uuid}/summary_by_chunk/1?chunk_size=5']:
+                with CaptureQueriesContext(connection) as ctx:
+                    resp = self.api_client.get(url)
+                self.assertHttpOK(resp)
+                counts.append((len(ctx.captured_queries), sum(len(q["sql"]) for q in ctx.captured_queries)))
+            return counts
+
+        for _ in range(2):
+            APIMeta.objects.create(run_uuid=uuid.uuid4(), user_uuid=user_uuid, status="optimal")
+        few_runs_counts = query_counts()
+        for _ in range(20):
+            APIMeta.objects.create(run_uuid=uuid.uuid4(), user_uuid=user_uuid, status="optimal")
+        unlinked = APIMeta.objects.filter(user_uuid=user_uuid).first()
+        UserUnlinkedRuns.create(run_uuid=unlinked.run_uuid, user_uuid=user_uuid)
+        self.assertEqual(query_counts(), few_runs_counts)
+
+        r = json.loads(self.api_client.get(f'/v3/user/{user_uuid}/summary').content)
+        self.assertEqual(len(r["scenarios"]), 21)
+        self.assertNotIn(str(unlinked.run_uuid), [scenario["run_uuid"] for scenario in r["scenarios"]])
+        r = json.loads(self.api_client.get(f'/v3/user/{user_uuid}/summary_by_chunk/5?chunk_size=5').content)
+        self.assertEqual(len(r["scenarios"]), 1)
+
+    def test_timeseries_table(self):
+        """
+        get_timeseries_table responds with the same rows as an xlsx workbook or a csv file
+        """
+        run_uuid = str(uuid.uuid4())
+        meta = APIMeta.objects.create(run_uuid=run_uuid, user_uuid=str(uuid.uuid4()), status="optimal")
+        Settings.objects.create(meta=meta, time_steps_per_hour=1)
+        ElectricLoadInputs.objects.create(meta=meta, year=2017)
+        ElectricLoadOutputs.objects.create(meta=meta, load_series_kw=[float(h % 24) for h in range(8760)],
+                                           monthly_peaks_kw=[100.0 + m for m in range(12)])
+        ElectricTariffInputs.objects.create(meta=meta, urdb_metadata={"rate_name": "Test Rate"})
+        ElectricTariffOutputs.objects.create(meta=meta, energy_rate_average_series=[0.1] * 8760,
+                                             demand_rate_average_series=[5.0] * 8760)
+        url = '/v3/job/get_timeseries_table'
+        headers = ["Date Timestep", "Load (kW)", "Peak Monthly Load (kW)", "Energy Charge: \nTest Rate ($/kWh)",
+                   "Demand Charge: \nTest Rate ($/kW)"]
+
+        resp = self.client.get(url, {'run_uuid[0]': run_uuid, 'format': 'csv'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b"".join(resp.streaming_content).decode("utf-8"))))
+        self.assertEqual(rows[0], [h.replace(": \n", ": ") for h in headers])
+        self.assertEqual(len(rows), 8761)
+        self.assertEqual(rows[1][0], "2017-01-01T00:00")
+        self.assertEqual(rows[-1][0], "2017-12-31T23:00")
+        self.assertEqual([float(v) for v in rows[2][1:]], [1.0, 100.0, 0.1, 5.0])
+        self.assertEqual(float(rows[31 * 24 + 1][2]), 101.0)  # February peak
+
+        resp = self.client.get(url, {'run_uuid[0]': run_uuid})
+        self.assertEqual(resp.status_code, 200)
+        ws = openpyxl.load_workbook(io.BytesIO(b"".join(resp.streaming_content)))["Timeseries Data"]
+        self.assertEqual([cell.value for cell in ws[1]], headers)
+        self.assertEqual(ws.max_row, 8761)
+        self.assertEqual(ws["A3"].value, datetime.datetime(2017, 1, 1, 1, 0))
+        self.assertEqual(ws["A3"].number_format, "m/d/yyyy h:mm")
+        self.assertEqual([cell.value for cell in ws[3]][1:], [1, 100, 0.1, 5])
+        self.assertEqual(ws.cell(row=31 * 24 + 2, column=3).value, 101)
+
+        resp = self.client.get(url, {'run_uuid[0]': run_uuid, 'format': 'pdf'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_results_table_fields(self):
+        """
+        The results tables only query the fields found in custom_table_config (see get_table_fields), so every table
+        value should be the same as from the full results response
+        """
+        post_file = os.path.join('reoptjl', 'test', 'posts', 'pv_batt_emissions.json')
+        post = json.load(open(post_file, 'r'))
+        resp = self.api_client.post('/v3/job/', format='json', data=post)
+        self.assertHttpCreated(resp)
+        run_uuid = json.loads(resp.content).get('run_uuid')
+        results = json.loads(self.api_client.get(f'/v3/job/{run_uuid}/results').content)
+        full_data = flatten_dict(sum_vectors(results, preserve_monthly=True))
+
+        def table_values(table, df):
+            values = []
+            for entry in table:
+                for value_key in ("scenario_value", "bau_value"):
+                    try:
+                        values.append(entry[value_key](df) if value_key in entry else None)
+                    except Exception:
+                        values.append("error")  # get_bau_values and generate_data_dict fail the same way
+            return values
+
+        tables = {name: table for name, table in vars(table_config_module).items()
+                  if isinstance(table, list) and table and all(isinstance(e, dict) and "scenario_value" in e for e in table)}
+        self.assertIn("custom_table_webtool", tables)
+        for name, table in tables.items():
+            table_data = flatten_dict(summarize_vector_data_for_table([run_uuid], name)[run_uuid])
+            self.assertEqual(table_values(table, table_data), table_values(table, full_data), name)
@@ -4,7 +4,9 @@ import os
 import copy
 import uuid
 from django.test import TestCase
-from reoptjl.validators import InputValidator
+import numpy as np
+import pandas as pd
+from reoptjl.validators import InputValidator, validate_time_series
 
 
 class InputValidatorTests(TestCase):
@@ -63,6 +65,28 @@ class InputValidatorTests(TestCase):
             self.assertEqual(len(validator.models["ElectricLoad"].loads_kw), time_steps_per_hour*8760)
             self.assertEqual(len(validator.models["ElectricLoad"].critical_loads_kw), time_steps_per_hour*8760)
 
+    def test_time_series_resampling_values(self):
+        """
+        Down-sampled averages match pandas' resample().mean() exactly, up-sampling repeats values, and series with
+        NaN or infinite values are invalid.
+        """
+        series = (np.random.default_rng(42).random(35040) * 1000).tolist()
+        for time_steps_per_hour in [1, 2]:
+            expected = pd.Series(series, index=pd.date_range('1/1/2000', periods=35040, freq='15min')).resample(
+                f'{int(60/time_steps_per_hour)}min').mean().tolist()
+            resampled, resampling_msg, err_msg = validate_time_series(series, time_steps_per_hour)
+            self.assertListEqual(resampled, expected)
+            self.assertIn("Downsampled", resampling_msg)
+            self.assertEqual(err_msg, "")
+
+        resampled, resampling_msg, err_msg = validate_time_series(series[:8760], 4)
+        self.assertListEqual(resampled, [x for x in series[:8760] for _ in range(4)])
+        self.assertIn("Upsampled", resampling_msg)
+
+        for bad_value in [float("nan"), float("inf")]:
+            _, _, err_msg = validate_time_series(series[:8759] + [bad_value], 1)
+            self.assertIn("finite", err_msg)
+
     def test_bad_blended_profile_inputs(self):
         post = copy.deepcopy(self.post)
         del(post["ElectricLoad"]["doe_reference_name"])
@@ -5,6 +5,7 @@ from django.urls import re_path
 
 urlpatterns = [
     re_path(r'^job/(?P<run_uuid>[0-9a-f-]+)/results/?$', views.results),
+    re_path(r'^job/(?P<run_uuid>[0-9a-f-]+)/status/?$', views.status),
     re_path(r'^help/?$', views.help),
     re_path(r'^job/inputs/?$', views.inputs),
     re_path(r'^job/outputs/?$', views.outputs),
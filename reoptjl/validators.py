@@ -1,6 +1,6 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
 import logging
-import pandas as pd
+import numpy as np
 from reoptjl.models import MAX_BIG_NUMBER, APIMeta, ExistingBoilerInputs, UserProvidedMeta, SiteInputs, Settings, ElectricLoadInputs, ElectricTariffInputs, \
     FinancialInputs, BaseModel, Message, ElectricUtilityInputs, PVInputs, CSTInputs, ElectricStorageInputs, GeneratorInputs, WindInputs, SpaceHeatingLoadInputs, \
     DomesticHotWaterLoadInputs, CHPInputs, CoolingLoadInputs, ExistingChillerInputs, HotThermalStorageInputs, ColdThermalStorageInputs, \
@@ -12,6 +12,8 @@ from typing import Tuple
 
 log = logging.getLogger(__name__)
 
+TIME_SERIES_LENGTHS = [8760, 17520, 35040]
+
 
 def scrub_fields(obj: BaseModel, raw_fields: dict):
     """
@@ -329,7 +331,7 @@ class InputValidator(object):
             max_ts = 8760 * self.models["Settings"].time_steps_per_hour
             if len(cp_ts_arrays) > 0:
                 if len(cp_ts_arrays[0]) > 0:
-                    if any(ts > max_ts for a in cp_ts_arrays for ts in a):
+                    if max(max(a) for a in cp_ts_arrays if a) > max_ts:
                         self.add_validation_error("ElectricTariff", "coincident_peak_load_active_time_steps",
                                                 f"At least one time step is greater than the max allowable ({max_ts})")
 
@@ -635,33 +637,55 @@ def validate_time_series(series: list, time_steps_per_hour: int) -> Tuple[list,
     :return: (list, str, str) for the resampled series (if necessary) and the resampling message and exception
         respectively. Either message can be empty, i.e. "". For example, "" if no exception, o.w. an error message to
         append to the InputValidator.validation_errors.
+    Values are checked and resampled as one numpy array: down-sampling averages each group of consecutive time
+    steps with a compensated (Kahan) sum, see average_time_steps, and up-sampling repeats each value.
     TODO: add resampling messages to messages returned to user
     TODO: does the resampling here match what is done in each of the time-series objects in v1?
     """
     n = len(series)
-    length_list = [8760, 17520, 35040]
-    if n not in length_list:
+    if n not in TIME_SERIES_LENGTHS:
         return (series, "",
             (f"Invalid length. Samples must be hourly (8,760 samples), 30 minute (17,520 samples), "
              "or 15 minute (35,040 samples)"))
-    
-    time_steps_per_hour_in_series = n / 8760
+
+    try:
+        values = np.fromiter(series, dtype=float, count=n)
+    except (TypeError, ValueError):  # non-numeric values are reported by clean_fields
+        return series, "", ""
+    if not np.isfinite(values).all():
+        return series, "", "Values must be finite numbers (no NaN or infinity)."
+
+    time_steps_per_hour_in_series = n // 8760
     if time_steps_per_hour_in_series == time_steps_per_hour:
         return series, "", ""
 
     if time_steps_per_hour < time_steps_per_hour_in_series:
         resampling_msg = f"Downsampled to match time_steps_per_hour via average."
-        index = pd.date_range('1/1/2000', periods=n, freq=f'{int(60/time_steps_per_hour_in_series)}min')
-        s = pd.Series(series, index=index)
-        s = s.resample(f'{int(60/time_steps_per_hour)}min').mean()
-        return s.tolist(), resampling_msg, ""
+        steps_per_average = time_steps_per_hour_in_series // time_steps_per_hour
+        return average_time_steps(values, steps_per_average).tolist(), resampling_msg, ""
     
     # time_steps_per_hour > time_steps_per_hour_in_series
     resampling_msg = f"Upsampled to match time_steps_per_hour via forward-fill."
-    resampled_val = [x for x in series for _ in range(int(time_steps_per_hour/time_steps_per_hour_in_series))]
+    resampled_val = np.repeat(values, time_steps_per_hour // time_steps_per_hour_in_series).tolist()
     return resampled_val, resampling_msg, ""
 
 
+def average_time_steps(values: np.ndarray, steps_per_average: int) -> np.ndarray:
+    """
+    Average each group of steps_per_average consecutive values. Each group is summed with Kahan (compensated)
+    summation like pandas' resample().mean(), so that the averages do not depend on which implementation was used.
+    """
+    groups = values.reshape(-1, steps_per_average)
+    total = np.zeros(groups.shape[0])
+    compensation = np.zeros(groups.shape[0])
+    for step in range(steps_per_average):
+        y = groups[:, step] - compensation
+        t = total + y
+        compensation = (t - total) - y
+        total = t
+    return total / steps_per_average
+
+
 def lat_lon_in_windtoolkit(lat, lon):
     """
     Convert latitude, longitude into integer values for wind tool kit database.
@@ -1,12 +1,13 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
 from django.db import models
-from django.db.models import Q
+from django.db.models import Q, ExpressionWrapper, BooleanField
 import uuid
 from typing import List, Dict, Any
 import sys
 import traceback as tb
 import re
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse, FileResponse
+from django.utils.http import parse_etags, quote_etag
 from reo.exceptions import UnexpectedError
 from reoptjl.models import Settings, PVInputs, ElectricStorageInputs, WindInputs, GeneratorInputs, ElectricLoadInputs,\
     ElectricTariffInputs, ElectricUtilityInputs, SpaceHeatingLoadInputs, PVOutputs, ElectricStorageOutputs,\
@@ -18,18 +19,27 @@ from reoptjl.models import Settings, PVInputs, ElectricStorageInputs, WindInputs
     FinancialInputs, FinancialOutputs, UserUnlinkedRuns, BoilerInputs, BoilerOutputs, SteamTurbineInputs, \
     SteamTurbineOutputs, GHPInputs, GHPOutputs, ProcessHeatLoadInputs, ElectricHeaterInputs, ElectricHeaterOutputs, \
     ASHPSpaceHeaterInputs, ASHPSpaceHeaterOutputs, ASHPWaterHeaterInputs, ASHPWaterHeaterOutputs, PortfolioUnlinkedRuns, \
-    CSTInputs, CSTOutputs, HighTempThermalStorageInputs, HighTempThermalStorageOutputs
+    CSTInputs, CSTOutputs, HighTempThermalStorageInputs, HighTempThermalStorageOutputs, Message
 
 import os
 import requests
 import numpy as np
 import pandas as pd
 import json
+import csv
+import tempfile
+import ast
+import inspect
+import hashlib
+import math
+import time
 import logging
-from datetime import datetime
+from functools import lru_cache
 
 from reoptjl.custom_table_helpers import flatten_dict, clean_data_dict, sum_vectors, colnum_string
 from reoptjl.custom_table_config import *
+import reoptjl.custom_table_config as table_config_module
+from reoptjl.src.defaults_cache import get_julia_defaults
 
 import xlsxwriter
 from collections import defaultdict
@@ -145,6 +155,86 @@ def outputs(request):
     except Exception as e:
         return JsonResponse({"Error": "Unexpected error in help endpoint: {}".format(e.args[0])}, status=500)
 
+# results key: APIMeta related_name, for the models returned by the results endpoint (in the order returned)
+RESULTS_INPUTS = {
+    "Financial": "FinancialInputs",
+    "ElectricLoad": "ElectricLoadInputs",
+    "Site": "SiteInputs",
+    "Settings": "Settings",
+    "PV": "PVInputs",
+    "Meta": "UserProvidedMeta",
+    "ElectricTariff": "ElectricTariffInputs",
+    "ElectricUtility": "ElectricUtilityInputs",
+    "ElectricStorage": "ElectricStorageInputs",
+    "Generator": "GeneratorInputs",
+    "Wind": "WindInputs",
+    "CoolingLoad": "CoolingLoadInputs",
+    "ExistingChiller": "ExistingChillerInputs",
+    "ExistingBoiler": "ExistingBoilerInputs",
+    "Boiler": "BoilerInputs",
+    "HotThermalStorage": "HotThermalStorageInputs",
+    "HighTempThermalStorage": "HighTempThermalStorageInputs",
+    "ColdThermalStorage": "ColdThermalStorageInputs",
+    "SpaceHeatingLoad": "SpaceHeatingLoadInputs",
+    "DomesticHotWaterLoad": "DomesticHotWaterLoadInputs",
+    "ProcessHeatLoad": "ProcessHeatLoadInputs",
+    "CHP": "CHPInputs",
+    "AbsorptionChiller": "AbsorptionChillerInputs",
+    "SteamTurbine": "SteamTurbineInputs",
+    "GHP": "GHPInputs",
+    "ElectricHeater": "ElectricHeaterInputs",
+    "ASHPSpaceHeater": "ASHPSpaceHeaterInputs",
+    "ASHPWaterHeater": "ASHPWaterHeaterInputs",
+    "CST": "CSTInputs",
+}
+RESULTS_OUTPUTS = {
+    "Financial": "FinancialOutputs",
+    "ElectricTariff": "ElectricTariffOutputs",
+    "ElectricUtility": "ElectricUtilityOutputs",
+    "ElectricLoad": "ElectricLoadOutputs",
+    "Site": "SiteOutputs",
+    "PV": "PVOutputs",
+    "ElectricStorage": "ElectricStorageOutputs",
+    "Generator": "GeneratorOutputs",
+    "Wind": "WindOutputs",
+    "ExistingChiller": "ExistingChillerOutputs",
+    "ExistingBoiler": "ExistingBoilerOutputs",
+    "Boiler": "BoilerOutputs",
+    "Outages": "OutageOutputs",
+    "HotThermalStorage": "HotThermalStorageOutputs",
+    "HighTempThermalStorage": "HighTempThermalStorageOutputs",
+    "ColdThermalStorage": "ColdThermalStorageOutputs",
+    "CHP": "CHPOutputs",
+    "AbsorptionChiller": "AbsorptionChillerOutputs",
+    "HeatingLoad": "HeatingLoadOutputs",
+    "CoolingLoad": "CoolingLoadOutputs",
+    "SteamTurbine": "SteamTurbineOutputs",
+    "GHP": "GHPOutputs",
+    "ElectricHeater": "ElectricHeaterOutputs",
+    "ASHPSpaceHeater": "ASHPSpaceHeaterOutputs",
+    "ASHPWaterHeater": "ASHPWaterHeaterOutputs",
+    "CST": "CSTOutputs",
+}
+# ForeignKey relations, which must be prefetched rather than selected
+RESULTS_MANY_RELATIONS = ["PVInputs", "PVOutputs"]
+
+def related_shallow_dict(meta, related_name):
+    """
+    :param meta: APIMeta with related_name selected or prefetched, so that no query is made here
+    :return: shallow_dict of the related model, a list of them if there is more than one, or None if there are none
+    """
+    if related_name in RESULTS_MANY_RELATIONS:
+        objs = getattr(meta, related_name).all()
+        if len(objs) == 0:
+            return None
+        if len(objs) == 1:
+            return objs[0].shallow_dict
+        return [obj.shallow_dict for obj in objs]
+    try:
+        return getattr(meta, related_name).shallow_dict
+    except models.ObjectDoesNotExist:
+        return None
+
 def results(request, run_uuid):
     """
     results endpoint for reoptjl jobs
@@ -165,12 +255,8 @@ def results(request, run_uuid):
     try:
         # get all required inputs/outputs
         meta = APIMeta.objects.select_related(
-            'Settings',
-            'FinancialInputs', 'FinancialOutputs',
-            'SiteInputs', 'SiteOutputs',
-            'ElectricLoadInputs',
-            'ElectricUtilityOutputs'
-        ).get(run_uuid=run_uuid)
+            *[name for name in RESULTS_INPUTS.values() if name not in RESULTS_MANY_RELATIONS]
+        ).prefetch_related("PVInputs", "Message").get(run_uuid=run_uuid)
     except Exception as e:
         if isinstance(e, models.ObjectDoesNotExist):
             resp = {"messages": {}}
@@ -188,99 +274,21 @@ def results(request, run_uuid):
             resp = make_error_resp(err.message)
             return JsonResponse(resp, status=500)
 
-    r = meta.dict
+    r = meta.shallow_dict
     r["inputs"] = dict()
-    r["inputs"]["Financial"] = meta.FinancialInputs.dict
-    r["inputs"]["ElectricLoad"] = meta.ElectricLoadInputs.dict
-    r["inputs"]["Site"] = meta.SiteInputs.dict
-    r["inputs"]["Settings"] = meta.Settings.dict
-
-    # We have to try for the following objects because they may or may not be defined
-    try:
-        pvs = meta.PVInputs.all()
-        if len(pvs) == 1:
-            r["inputs"]["PV"] = pvs[0].dict
-        elif len(pvs) > 1:
-            r["inputs"]["PV"] = []
-            for pv in pvs:
-                r["inputs"]["PV"].append(pv.dict)
-    except: pass
-
-    try: r["inputs"]["Meta"] = meta.UserProvidedMeta.dict
-    except: pass
-
-    try: r["inputs"]["ElectricTariff"] = meta.ElectricTariffInputs.dict
-    except: pass
-
-    try: r["inputs"]["ElectricUtility"] = meta.ElectricUtilityInputs.dict
-    except: pass
-
-    try: r["inputs"]["ElectricStorage"] = meta.ElectricStorageInputs.dict
-    except: pass
-
-    try: r["inputs"]["Generator"] = meta.GeneratorInputs.dict
-    except: pass
-
-    try: r["inputs"]["Wind"] = meta.WindInputs.dict
-    except: pass
-
-    try: r["inputs"]["CoolingLoad"] = meta.CoolingLoadInputs.dict
-    except: pass
-
-    try: r["inputs"]["ExistingChiller"] = meta.ExistingChillerInputs.dict
-    except: pass
-    
-    try: r["inputs"]["ExistingBoiler"] = meta.ExistingBoilerInputs.dict
-    except: pass
-
-    try: r["inputs"]["Boiler"] = meta.BoilerInputs.dict
-    except: pass
-
-    try: r["inputs"]["HotThermalStorage"] = meta.HotThermalStorageInputs.dict
-    except: pass
-
-    try: r["inputs"]["HighTempThermalStorage"] = meta.HighTempThermalStorageInputs.dict
-    except: pass
-
-    try: r["inputs"]["ColdThermalStorage"] = meta.ColdThermalStorageInputs.dict
-    except: pass
-
-    try: r["inputs"]["SpaceHeatingLoad"] = meta.SpaceHeatingLoadInputs.dict
-    except: pass
-
-    try: r["inputs"]["DomesticHotWaterLoad"] = meta.DomesticHotWaterLoadInputs.dict
-    except: pass
-
-    try: r["inputs"]["ProcessHeatLoad"] = meta.ProcessHeatLoadInputs.dict
-    except: pass
-
-    try: r["inputs"]["CHP"] = meta.CHPInputs.dict
-    except: pass
-
-    try: r["inputs"]["AbsorptionChiller"] = meta.AbsorptionChillerInputs.dict
-    except: pass
-
-    try: r["inputs"]["SteamTurbine"] = meta.SteamTurbineInputs.dict
-    except: pass
-
-    try: r["inputs"]["GHP"] = meta.GHPInputs.dict
-    except: pass    
-
-    try: r["inputs"]["ElectricHeater"] = meta.ElectricHeaterInputs.dict
-    except: pass    
-
-    try: r["inputs"]["ASHPSpaceHeater"] = meta.ASHPSpaceHeaterInputs.dict
-    except: pass    
-
-    try: r["inputs"]["ASHPWaterHeater"] = meta.ASHPWaterHeaterInputs.dict
-    except: pass  
-
-    try: r["inputs"]["CST"] = meta.CSTInputs.dict
-    except: pass
+    for key, related_name in RESULTS_INPUTS.items():
+        d = related_shallow_dict(meta, related_name)
+        if d is not None:
+            r["inputs"][key] = d
 
     try:
         r["outputs"] = dict()
         r["messages"] = dict()
+        # the outputs are selected in a second query to stay well below the Postgres limit on columns per query
+        outputs_meta = APIMeta.objects.select_related(
+            "REoptjlMessageOutputs",
+            *[name for name in RESULTS_OUTPUTS.values() if name not in RESULTS_MANY_RELATIONS]
+        ).prefetch_related("PVOutputs").get(id=meta.id)
         try:
             msgs = meta.Message.all()
             for msg in msgs:
@@ -290,7 +298,7 @@ def results(request, run_uuid):
             # key = location of warning, error, or uncaught error
             # value = vector of text from REopt
             #   In case of uncaught error, vector length > 1
-            reopt_messages = meta.REoptjlMessageOutputs.dict
+            reopt_messages = outputs_meta.REoptjlMessageOutputs.shallow_dict
             for msg_type in ["errors","warnings"]:
                 r["messages"][msg_type] = dict()
                 for m in range(0,len(reopt_messages[msg_type])):
@@ -302,71 +310,10 @@ def results(request, run_uuid):
             r["messages"]["has_stacktrace"] = reopt_messages["has_stacktrace"]            
         except: pass
 
-        try:
-            r["outputs"]["Financial"] = meta.FinancialOutputs.dict
-            r["outputs"]["ElectricTariff"] = meta.ElectricTariffOutputs.dict
-            r["outputs"]["ElectricUtility"] = meta.ElectricUtilityOutputs.dict
-            r["outputs"]["ElectricLoad"] = meta.ElectricLoadOutputs.dict
-            r["outputs"]["Site"] = meta.SiteOutputs.dict
-        except: pass
-
-        try:
-            pvs = meta.PVOutputs.all()
-            if len(pvs) == 1:
-                r["outputs"]["PV"] = pvs[0].dict
-            elif len(pvs) > 1:
-                r["outputs"]["PV"] = []
-                for pv in pvs:
-                    r["outputs"]["PV"].append(pv.dict)
-        except: pass
-        try: r["outputs"]["ElectricStorage"] = meta.ElectricStorageOutputs.dict
-        except: pass
-        try: r["outputs"]["Generator"] = meta.GeneratorOutputs.dict
-        except: pass
-        try: r["outputs"]["Wind"] = meta.WindOutputs.dict
-        except: pass
-        try: r["outputs"]["ExistingChiller"] = meta.ExistingChillerOutputs.dict
-        except: pass
-        try: r["outputs"]["ExistingBoiler"] = meta.ExistingBoilerOutputs.dict
-        except: pass
-        try: r["outputs"]["Boiler"] = meta.BoilerOutputs.dict
-        except: pass
-        try: r["outputs"]["Outages"] = meta.OutageOutputs.dict
-        except: pass
-
-        try: r["outputs"]["HotThermalStorage"] = meta.HotThermalStorageOutputs.dict
-        except: pass
-        try: r["outputs"]["HighTempThermalStorage"] = meta.HighTempThermalStorageOutputs.dict
-        except: pass
-        try: r["outputs"]["ColdThermalStorage"] = meta.ColdThermalStorageOutputs.dict
-        except: pass
-        try: r["outputs"]["CHP"] = meta.CHPOutputs.dict
-        except: pass
-        try: r["outputs"]["AbsorptionChiller"] = meta.AbsorptionChillerOutputs.dict
-        except: pass
-        try: r["outputs"]["HeatingLoad"] = meta.HeatingLoadOutputs.dict
-        except: pass
-        try: r["outputs"]["CoolingLoad"] = meta.CoolingLoadOutputs.dict
-        except: pass
-        try: r["outputs"]["SteamTurbine"] = meta.SteamTurbineOutputs.dict
-        except: pass
-        try: r["outputs"]["GHP"] = meta.GHPOutputs.dict
-        except: pass
-        try: r["outputs"]["ElectricHeater"] = meta.ElectricHeaterOutputs.dict
-        except: pass    
-        try: r["outputs"]["ASHPSpaceHeater"] = meta.ASHPSpaceHeaterOutputs.dict
-        except: pass  
-        try: r["outputs"]["ASHPWaterHeater"] = meta.ASHPWaterHeaterOutputs.dict
-        except: pass
-        try: r["outputs"]["CST"] = meta.CSTOutputs.dict
-        except: pass
-
-        for d in r["outputs"].values():
-            if isinstance(d, dict):
-                d.pop("meta_id", None)
-            elif isinstance(d, list):
-                for subd in d:
-                    subd.pop("meta_id", None)
+        for key, related_name in RESULTS_OUTPUTS.items():
+            d = related_shallow_dict(outputs_meta, related_name)
+            if d is not None:
+                r["outputs"][key] = d
         # TODO fill out rest of out/inputs as they are added to REoptLite.jl
     except Exception as e:
         if 'RelatedObjectDoesNotExist' in str(type(e)):
@@ -384,6 +331,79 @@ def results(request, run_uuid):
 
     return JsonResponse(r)
 
+# a long-poll only waits for jobs with these statuses, any other status is final
+IN_PROGRESS_STATUSES = ["", "Optimizing..."]
+STATUS_LONG_POLL_MAX_SECONDS = 30
+STATUS_LONG_POLL_INTERVAL_SECONDS = 1.0
+
+def job_status(meta_id, run_uuid):
+    """
+    :return: dict with the status, timestamp and messages of a job, without any inputs or outputs
+    """
+    meta = APIMeta.objects.only("status", "created", "reopt_version").get(id=meta_id)
+    return {
+        "run_uuid": run_uuid,
+        "status": meta.status,
+        "created": meta.created.isoformat(),
+        "reopt_version": meta.reopt_version,
+        "messages": dict(Message.objects.filter(meta_id=meta_id).values_list("message_type", "message")),
+    }
+
+def status(request, run_uuid):
+    """
+    Lightweight alternative to the results endpoint for polling a job: returns only the status, created timestamp
+    and messages of a job. The response has an ETag; if the request's If-None-Match header matches it (the status
+    has not changed) the response is 304 Not Modified with no body.
+    Optional long-poll: with ?wait=<seconds> (at most STATUS_LONG_POLL_MAX_SECONDS) and If-None-Match, the request
+    is held until the status changes or wait seconds have passed.
+    """
+    try:
+        uuid.UUID(run_uuid)  # raises ValueError if not valid uuid
+    except ValueError as e:
+        return JsonResponse(make_error_resp(e.args[0]), status=400)
+
+    try:
+        wait = float(request.GET.get("wait", 0))
+    except ValueError:
+        wait = None
+    if wait is None or not math.isfinite(wait):
+        return JsonResponse(make_error_resp("wait must be a number of seconds."), status=400)
+    wait = min(max(wait, 0), STATUS_LONG_POLL_MAX_SECONDS)
+
+    try:
+        meta_id = APIMeta.objects.values_list("id", flat=True).get(run_uuid=run_uuid)
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        t_end = time.time() + wait
+        while True:
+            resp = job_status(meta_id, run_uuid)
+            etag = quote_etag(hashlib.md5(json.dumps(resp, sort_keys=True).encode("utf-8")).hexdigest())
+            if etag not in if_none_match and "*" not in if_none_match:
+                break
+            if resp["status"] not in IN_PROGRESS_STATUSES or time.time() + STATUS_LONG_POLL_INTERVAL_SECONDS > t_end:
+                response = HttpResponseNotModified()
+                response["ETag"] = etag
+                return response
+            time.sleep(STATUS_LONG_POLL_INTERVAL_SECONDS)
+    except APIMeta.DoesNotExist:
+        resp = {"messages": {}}
+        resp['messages']['error'] = (
+            "run_uuid {} not in database. "
+            "You may have hit the status endpoint too quickly after POST'ing scenario, "
+            "have a typo in your run_uuid, or the scenario was deleted.").format(run_uuid)
+        resp['status'] = 'error'
+        return JsonResponse(resp, status=404)
+    except Exception:
+        exc_type, exc_value, exc_traceback = sys.exc_info()
+        err = UnexpectedError(exc_type, exc_value.args[0], tb.format_tb(exc_traceback), task='reoptjl.views.status',
+            run_uuid=run_uuid)
+        err.save_to_db()
+        return JsonResponse(make_error_resp(err.message), status=500)
+
+    response = JsonResponse(resp)
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"  # clients must revalidate with If-None-Match
+    return response
+
 def peak_load_outage_times(request):
     try:
         post_body = json.loads(request.body)
@@ -451,11 +471,10 @@ def chp_defaults(request):
         inputs["thermal_efficiency"] = request.GET.get("thermal_efficiency")  # Conversion to correct type happens in http.jl
 
     try:
-        julia_host = os.environ.get('JULIA_HOST', "julia")
-        http_jl_response = requests.get("http://" + julia_host + ":8081/chp_defaults/", json=inputs)
+        status_code, response_data = get_julia_defaults("chp_defaults", inputs)
         response = JsonResponse(
-            http_jl_response.json(),
-            status=http_jl_response.status_code
+            response_data,
+            status=status_code
         )
         return response
 
@@ -480,10 +499,9 @@ def absorption_chiller_defaults(request):
         "load_max_tons": request.GET.get("load_max_tons")
     }
     try:
-        julia_host = os.environ.get('JULIA_HOST', "julia")
-        http_jl_response = requests.get("http://" + julia_host + ":8081/absorption_chiller_defaults/", json=inputs)
+        _, response_data = get_julia_defaults("absorption_chiller_defaults", inputs)
         response = JsonResponse(
-            http_jl_response.json()
+            response_data
         )
         return response
 
@@ -511,11 +529,10 @@ def get_ashp_defaults(request):
     else: 
         return JsonResponse({"Error: Missing input force_into_system in get_ashp_defaults endpoint."}, status=400)
     try:
-        julia_host = os.environ.get('JULIA_HOST', "julia")
-        http_jl_response = requests.get("http://" + julia_host + ":8081/get_ashp_defaults/", json=inputs)
+        status_code, response_data = get_julia_defaults("get_ashp_defaults", inputs)
         response = JsonResponse(
-            http_jl_response.json(),
-            status=http_jl_response.status_code
+            response_data,
+            status=status_code
         )
         return response
 
@@ -555,10 +572,9 @@ def pv_cost_defaults(request):
     inputs = {k: v for k, v in inputs.items() if v is not None}
 
     try:
-        julia_host = os.environ.get('JULIA_HOST', "julia")
-        http_jl_response = requests.get("http://" + julia_host + ":8081/pv_cost_defaults/", json=inputs)
+        _, response_data = get_julia_defaults("pv_cost_defaults", inputs)
         response = JsonResponse(
-            http_jl_response.json()
+            response_data
         )
         return response
 
@@ -575,6 +591,55 @@ def pv_cost_defaults(request):
         log.debug(debug_msg)
         return JsonResponse({"Error": "Unexpected error in pv_cost_defaults endpoint. Check log for more."}, status=500)
 
+def simulated_load_post_error(inputs):
+    """
+    :param inputs: dict, POSTed simulated_load inputs
+    :return: str, error message for missing or conflicting inputs, or None
+    """
+    if not isinstance(inputs, dict):
+        return "simulated_load inputs must be a JSON object."
+    either_required = ["normalize_and_scale_load_profile_input", "doe_reference_name", "industrial_reference_name"]
+    either_check = 0
+    for either in either_required:
+        if either in inputs:
+            either_check += 1
+    if either_check == 0:
+        return "Missing either of normalize_and_scale_load_profile_input or [doe or industrial]_reference_name."
+    elif either_check == 2:
+        return "Both normalize_and_scale_load_profile_input and [doe or industrial]_reference_name were input; only input one of these."
+
+    # If normalize_and_scale_load_profile_input is true, year and load_profile are required
+    if inputs.get("normalize_and_scale_load_profile_input") is True:
+        if "year" not in inputs:
+            return "year is required when normalize_and_scale_load_profile_input is true."
+        if "load_profile" not in inputs:
+            return "load_profile is required when normalize_and_scale_load_profile_input is provided."
+        if len(inputs["load_profile"]) != 8760:
+            if "time_steps_per_hour" not in inputs:
+                return "time_steps_per_hour is required when load_profile length is not 8760 (hourly)."
+
+    # If doe_reference_name is provided, latitude and longitude are required, year is optional
+    if "doe_reference_name" in inputs or "industrial_reference_name" in inputs:
+        if "latitude" not in inputs or "longitude" not in inputs:
+            return "latitude and longitude are required when [doe or industrial]_reference_name is provided."
+    return None
+
+def get_simulated_load(inputs):
+    """
+    Call the http.jl /simulated_load endpoint through the defaults cache, so that repeated inputs (after
+    normalization) do not rebuild the profile in Julia.
+    :return: tuple, (status_code, response with scalar/monthly outputs rounded to 2 decimal places)
+    """
+    status_code, response_data = get_julia_defaults("simulated_load", inputs, method="POST")
+    load_profile_key = next((k for k in response_data if "loads_" in k), None)
+    if load_profile_key is None:  # error from Julia
+        return status_code, response_data
+    # Round all scalar/monthly outputs to 2 decimal places
+    load_profile = response_data.pop(load_profile_key)
+    rounded_response_data = round_values(response_data)
+    rounded_response_data[load_profile_key] = load_profile
+    return status_code, rounded_response_data
+
 def simulated_load(request):
     try:      
         # Build inputs dictionary to send to http.jl /simulated_load endpoint
@@ -654,46 +719,30 @@ def simulated_load(request):
                             inputs[key] = float(request.GET.get(key))            
         elif request.method == "POST":
             inputs = json.loads(request.body)
-            either_required = ["normalize_and_scale_load_profile_input", "doe_reference_name", "industrial_reference_name"]
-            either_check = 0
-            for either in either_required:
-                if either in inputs:
-                    either_check += 1
-            if either_check == 0:
-                return JsonResponse({"Error": "Missing either of normalize_and_scale_load_profile_input or [doe or industrial]_reference_name."}, status=400)
-            elif either_check == 2:
-                return JsonResponse({"Error": "Both normalize_and_scale_load_profile_input and [doe or industrial]_reference_name were input; only input one of these."}, status=400)
-            
-            # If normalize_and_scale_load_profile_input is true, year and load_profile are required
-            if inputs.get("normalize_and_scale_load_profile_input") is True:
-                if "year" not in inputs:
-                    return JsonResponse({"Error": "year is required when normalize_and_scale_load_profile_input is true."}, status=400)
-                if "load_profile" not in inputs:
-                    return JsonResponse({"Error": "load_profile is required when normalize_and_scale_load_profile_input is provided."}, status=400)
-                if len(inputs["load_profile"]) != 8760:
-                    if "time_steps_per_hour" not in inputs:
-                        return JsonResponse({"Error": "time_steps_per_hour is required when load_profile length is not 8760 (hourly)."}, status=400)
-            
-            # If doe_reference_name is provided, latitude and longitude are required, year is optional
-            if "doe_reference_name" in inputs or "industrial_reference_name" in inputs:
-                if "latitude" not in inputs or "longitude" not in inputs:
-                    return JsonResponse({"Error": "latitude and longitude are required when [doe or industrial]_reference_name is provided."}, status=400)
+            if "batch" in inputs:
+                # several load profiles (e.g. building mixes) in one request, each checked and cached on its own
+                if not isinstance(inputs["batch"], list) or len(inputs["batch"]) == 0:
+                    return JsonResponse({"Error": "batch must be a non-empty list of simulated_load inputs."}, status=400)
+                batch_responses = []
+                for batch_inputs in inputs["batch"]:
+                    error = simulated_load_post_error(batch_inputs)
+                    if error:
+                        batch_responses.append({"Error": error})
+                    else:
+                        batch_responses.append(get_simulated_load(batch_inputs)[1])
+                return JsonResponse({"batch": batch_responses})
+
+            error = simulated_load_post_error(inputs)
+            if error:
+                return JsonResponse({"Error": error}, status=400)
         else:
             return JsonResponse({"Error": "Only GET and POST methods are supported for this endpoint"}, status=405)
         
         # json.dump(inputs, open("sim_load_post.json", "w"))
-        julia_host = os.environ.get('JULIA_HOST', "julia")
-        http_jl_response = requests.post("http://" + julia_host + ":8081/simulated_load/", json=inputs)
-        response_data = http_jl_response.json()
-        # Round all scalar/monthly outputs to 2 decimal places
-        load_profile_key = next((k for k in response_data if "loads_" in k), None)
-        load_profile = response_data.pop(load_profile_key)
-        rounded_response_data = round_values(response_data)
-        rounded_response_data[load_profile_key] = load_profile
-
+        status_code, response_data = get_simulated_load(inputs)
         response = JsonResponse(
-            rounded_response_data,
-            status=http_jl_response.status_code
+            response_data,
+            status=status_code
         )
         
         return response
@@ -731,10 +780,9 @@ def ghp_efficiency_thermal_factors(request):
                         "longitude": longitude,
                         "doe_reference_name": doe_reference_name}
 
-        julia_host = os.environ.get('JULIA_HOST', "julia")
-        http_jl_response = requests.get("http://" + julia_host + ":8081/ghp_efficiency_thermal_factors/", json=inputs_dict)
+        _, response_data = get_julia_defaults("ghp_efficiency_thermal_factors", inputs_dict)
         response = JsonResponse(
-            http_jl_response.json()
+            response_data
         )
         return response
     
@@ -784,10 +832,9 @@ def get_existing_chiller_default_cop(request):
             "max_load_kw_thermal": max_load_kw_thermal
         }
 
-        julia_host = os.environ.get('JULIA_HOST', "julia")
-        http_jl_response = requests.get("http://" + julia_host + ":8081/get_existing_chiller_default_cop/", json=inputs_dict)
+        _, response_data = get_julia_defaults("get_existing_chiller_default_cop", inputs_dict)
         response = JsonResponse(
-            http_jl_response.json()
+            response_data
         )
         return response
 
@@ -840,6 +887,8 @@ def summary_by_runuuids(request):
         # Create Querysets: Select all objects associate with a user_uuid, Order by `created` column
         scenarios = APIMeta.objects.filter(run_uuid__in=run_uuids).only(
             'run_uuid',
+            'user_uuid',
+            'portfolio_uuid',
             'status',
             'created'
         ).order_by("-created")
@@ -1001,21 +1050,10 @@ def summary(request, user_uuid):
 
         # Create Querysets: Select all objects associate with a user_uuid. portfolio_uuid must be "" (empty) or in unlinked portfolio runs
         # Remove any unlinked runs and finally order by `created` column
-        api_metas = APIMeta.objects.filter(
-            Q(user_uuid=user_uuid),
-            Q(portfolio_uuid = "") | Q(run_uuid__in=[i.run_uuid for i in PortfolioUnlinkedRuns.objects.filter(user_uuid=user_uuid)])
-        ).exclude(
-            run_uuid__in=[i.run_uuid for i in UserUnlinkedRuns.objects.filter(user_uuid=user_uuid)]
-        ).only(
-            'run_uuid',
-            'user_uuid',
-            'portfolio_uuid',
-            'status',
-            'created'
-        ).order_by("-created")
+        api_metas = queryset_for_user_summary(user_uuid)
+        summary_dict = queryset_for_summary(api_metas, summary_dict)
 
-        if len(api_metas) > 0:
-            summary_dict = queryset_for_summary(api_metas, summary_dict)
+        if len(summary_dict) > 0:
             response = JsonResponse(create_summary_dict(user_uuid,summary_dict), status=200, safe=False)
             return response
         else:
@@ -1070,18 +1108,9 @@ def summary_by_chunk(request, user_uuid, chunk):
             return JsonResponse({"Error": "Chunk number must be a 1-indexed integer."}, status=400)
         
         # Create Querysets: Select all objects associate with a user_uuid, portfolio_uuid="", Order by `created` column
-        api_metas = APIMeta.objects.filter(
-            Q(user_uuid=user_uuid),
-            Q(portfolio_uuid = "") | Q(run_uuid__in=[i.run_uuid for i in PortfolioUnlinkedRuns.objects.filter(user_uuid=user_uuid)])
-        ).exclude(
-            run_uuid__in=[i.run_uuid for i in UserUnlinkedRuns.objects.filter(user_uuid=user_uuid)]
-        ).only(
-            'run_uuid',
-            'status',
-            'created'
-        ).order_by("-created")
+        api_metas = queryset_for_user_summary(user_uuid)
         
-        total_scenarios = len(api_metas)
+        total_scenarios = api_metas.count()
         if total_scenarios == 0:
             response = JsonResponse({"Error": "No scenarios found for user '{}'".format(user_uuid)}, content_type='application/json', status=404)
             return response
@@ -1116,6 +1145,23 @@ def summary_by_chunk(request, user_uuid, chunk):
         err.save_to_db()
         return JsonResponse({"Error": err.message}, status=404)
 
+# Select all APIMetas associated with a user_uuid. portfolio_uuid must be "" (empty) or in unlinked portfolio runs
+# Remove any unlinked runs and finally order by `created` column
+# The unlinked runs are subqueries, so this is one query however many runs the user has
+def queryset_for_user_summary(user_uuid:str):
+    return APIMeta.objects.filter(
+        Q(user_uuid=user_uuid),
+        Q(portfolio_uuid = "") | Q(run_uuid__in=PortfolioUnlinkedRuns.objects.filter(user_uuid=user_uuid).values('run_uuid'))
+    ).exclude(
+        run_uuid__in=UserUnlinkedRuns.objects.filter(user_uuid=user_uuid).values('run_uuid')
+    ).only(
+        'run_uuid',
+        'user_uuid',
+        'portfolio_uuid',
+        'status',
+        'created'
+    ).order_by("-created")
+
 # Take summary_dict and convert it to the desired format for response. Also add any missing key/val pairs
 def create_summary_dict(user_uuid:str,summary_dict:dict):
 
@@ -1145,8 +1191,11 @@ def create_summary_dict(user_uuid:str,summary_dict:dict):
 def queryset_for_summary(api_metas,summary_dict:dict):
 
     # Loop over all the APIMetas associated with a user_uuid, do something if needed
+    # The models below are queried by meta_id (no join with APIMeta) and mapped back to run_uuid with run_uuids
+    run_uuids = dict()
     for m in api_metas:
         # print(3, meta.run_uuid) #acces Meta fields like this
+        run_uuids[m.id] = str(m.run_uuid)
         summary_dict[str(m.run_uuid)] = dict()
         summary_dict[str(m.run_uuid)]['status'] = m.status
         summary_dict[str(m.run_uuid)]['run_uuid'] = str(m.run_uuid)
@@ -1154,22 +1203,23 @@ def queryset_for_summary(api_metas,summary_dict:dict):
         summary_dict[str(m.run_uuid)]['portfolio_uuid'] = str(m.portfolio_uuid)
         summary_dict[str(m.run_uuid)]['created'] = str(m.created)
         
-    run_uuids = summary_dict.keys()
+    # subquery of the APIMeta ids, so each query below sends the filter on api_metas instead of a list of every id
+    meta_ids = api_metas.values('id')
 
     # Create query of all UserProvidedMeta objects where their run_uuid is in api_metas run_uuids.
-    usermeta = UserProvidedMeta.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    usermeta = UserProvidedMeta.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'description',
         'address'
     )
 
     if len(usermeta) > 0:
         for m in usermeta:
-            summary_dict[str(m.meta.run_uuid)]['description'] = m.description
-            summary_dict[str(m.meta.run_uuid)]['address'] = m.address
+            summary_dict[run_uuids[m.meta_id]]['description'] = m.description
+            summary_dict[run_uuids[m.meta_id]]['address'] = m.address
     
-    utility = ElectricUtilityInputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    utility = ElectricUtilityInputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'outage_start_time_step',
         'outage_end_time_step',
         'outage_durations',
@@ -1177,56 +1227,56 @@ def queryset_for_summary(api_metas,summary_dict:dict):
     )
     if len(utility) > 0:
         for m in utility:
-            if 'focus' not in summary_dict[str(m.meta.run_uuid)].keys():
-                summary_dict[str(m.meta.run_uuid)]['focus'] = ''
+            if 'focus' not in summary_dict[run_uuids[m.meta_id]].keys():
+                summary_dict[run_uuids[m.meta_id]]['focus'] = ''
             if m.outage_start_time_step is None:
                 if len(m.outage_start_time_steps) == 0:
-                    summary_dict[str(m.meta.run_uuid)]['focus'] += "Financial,"
+                    summary_dict[run_uuids[m.meta_id]]['focus'] += "Financial,"
                 else:
-                    summary_dict[str(m.meta.run_uuid)]['focus'] += "Resilience,"
-                    summary_dict[str(m.meta.run_uuid)]['outage_duration'] = m.outage_durations[0] # all durations are same.
+                    summary_dict[run_uuids[m.meta_id]]['focus'] += "Resilience,"
+                    summary_dict[run_uuids[m.meta_id]]['outage_duration'] = m.outage_durations[0] # all durations are same.
             else:
                 # outage start timestep was provided, is 1 or more
-                summary_dict[str(m.meta.run_uuid)]['outage_duration'] = m.outage_end_time_step - m.outage_start_time_step + 1
-                summary_dict[str(m.meta.run_uuid)]['focus'] += "Resilience,"
+                summary_dict[run_uuids[m.meta_id]]['outage_duration'] = m.outage_end_time_step - m.outage_start_time_step + 1
+                summary_dict[run_uuids[m.meta_id]]['focus'] += "Resilience,"
     
-    site = SiteOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    site = SiteOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'lifecycle_emissions_reduction_CO2_fraction'
     )
     if len(site) > 0:
         for m in site:
             try:
-                summary_dict[str(m.meta.run_uuid)]['emission_reduction_pct'] = m.lifecycle_emissions_reduction_CO2_fraction
+                summary_dict[run_uuids[m.meta_id]]['emission_reduction_pct'] = m.lifecycle_emissions_reduction_CO2_fraction
             except:
-                summary_dict[str(m.meta.run_uuid)]['emission_reduction_pct'] = 0.0
+                summary_dict[run_uuids[m.meta_id]]['emission_reduction_pct'] = 0.0
 
     
-    site_inputs = SiteInputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    site_inputs = SiteInputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'renewable_electricity_min_fraction',
         'renewable_electricity_max_fraction'
     )
     if len(site_inputs) > 0:
         for m in site_inputs:
             # if focus key doesnt exist, create it
-            if 'focus' not in summary_dict[str(m.meta.run_uuid)].keys():
-                summary_dict[str(m.meta.run_uuid)]['focus'] = ''
+            if 'focus' not in summary_dict[run_uuids[m.meta_id]].keys():
+                summary_dict[run_uuids[m.meta_id]]['focus'] = ''
             try: # can be NoneType
                 if m.renewable_electricity_min_fraction > 0:
-                    summary_dict[str(m.meta.run_uuid)]['focus'] += "Clean-energy,"
+                    summary_dict[run_uuids[m.meta_id]]['focus'] += "Clean-energy,"
             except:
                 pass # is NoneType
 
             try: # can be NoneType
                 if m.renewable_electricity_max_fraction > 0:
-                    summary_dict[str(m.meta.run_uuid)]['focus'] += "Clean-energy,"
+                    summary_dict[run_uuids[m.meta_id]]['focus'] += "Clean-energy,"
             except:
                 pass # is NoneType
 
     # Use settings to find out if it is an off-grid evaluation
-    settings = Settings.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    settings = Settings.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'off_grid_flag',
         'include_climate_in_objective',
         'include_health_in_objective'
@@ -1234,58 +1284,53 @@ def queryset_for_summary(api_metas,summary_dict:dict):
     if len(settings) > 0:
         for m in settings:
             # if focus key doesnt exist, create it
-            if 'focus' not in summary_dict[str(m.meta.run_uuid)].keys():
-                summary_dict[str(m.meta.run_uuid)]['focus'] = ''
+            if 'focus' not in summary_dict[run_uuids[m.meta_id]].keys():
+                summary_dict[run_uuids[m.meta_id]]['focus'] = ''
             if m.off_grid_flag:
-                summary_dict[str(m.meta.run_uuid)]['focus'] += "Off-grid,"
+                summary_dict[run_uuids[m.meta_id]]['focus'] += "Off-grid,"
             
             if m.include_climate_in_objective or m.include_health_in_objective:
-                summary_dict[str(m.meta.run_uuid)]['focus'] += "Clean-energy,"
+                summary_dict[run_uuids[m.meta_id]]['focus'] += "Clean-energy,"
 
-    tariffInputs = ElectricTariffInputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    tariffInputs = ElectricTariffInputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'urdb_rate_name'
     )
     if len(tariffInputs) > 0:
         for m in tariffInputs:
             if m.urdb_rate_name is None:
-                summary_dict[str(m.meta.run_uuid)]['urdb_rate_name'] = 'Custom'
+                summary_dict[run_uuids[m.meta_id]]['urdb_rate_name'] = 'Custom'
             else:
-                summary_dict[str(m.meta.run_uuid)]['urdb_rate_name'] = m.urdb_rate_name
+                summary_dict[run_uuids[m.meta_id]]['urdb_rate_name'] = m.urdb_rate_name
     
-    tariffOuts = ElectricTariffOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
-        'year_one_energy_cost_before_tax',
-        'year_one_demand_cost_before_tax',
-        'year_one_fixed_cost_before_tax',
-        'year_one_min_charge_adder_before_tax',
-        'year_one_energy_cost_before_tax_bau',
-        'year_one_demand_cost_before_tax_bau',
-        'year_one_fixed_cost_before_tax_bau',
-        'year_one_min_charge_adder_before_tax_bau',
+    tariffOuts = ElectricTariffOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
+        'year_one_bill_before_tax',
+        'year_one_bill_before_tax_bau',
     )
     if len(tariffOuts) > 0:
         for m in tariffOuts:
             if (m.year_one_bill_before_tax_bau is not None) and (m.year_one_bill_before_tax is not None):
-                summary_dict[str(m.meta.run_uuid)]['year_one_savings_us_dollars'] = m.year_one_bill_before_tax_bau - m.year_one_bill_before_tax
+                summary_dict[run_uuids[m.meta_id]]['year_one_savings_us_dollars'] = m.year_one_bill_before_tax_bau - m.year_one_bill_before_tax
             else:
-                summary_dict[str(m.meta.run_uuid)]['year_one_savings_us_dollars'] = None
+                summary_dict[run_uuids[m.meta_id]]['year_one_savings_us_dollars'] = None
 
-    load = ElectricLoadInputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
-        'loads_kw',
+    load = ElectricLoadInputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'doe_reference_name'
+    ).annotate(
+        loads_kw_is_none=ExpressionWrapper(Q(loads_kw__isnull=True), output_field=BooleanField())
     )
     if len(load) > 0:
         for m in load:
-            if m.loads_kw is None:
-                summary_dict[str(m.meta.run_uuid)]['doe_reference_name'] = m.doe_reference_name
+            if m.loads_kw_is_none:
+                summary_dict[run_uuids[m.meta_id]]['doe_reference_name'] = m.doe_reference_name
             else:
-                summary_dict[str(m.meta.run_uuid)]['doe_reference_name'] = 'Custom'
+                summary_dict[run_uuids[m.meta_id]]['doe_reference_name'] = 'Custom'
 
 
-    fin = FinancialOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    fin = FinancialOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'npv',
         'initial_capital_costs_after_incentives',
         'lcc',
@@ -1298,88 +1343,88 @@ def queryset_for_summary(api_metas,summary_dict:dict):
     if len(fin) > 0:
         for m in fin:
             if m.npv is not None:
-                summary_dict[str(m.meta.run_uuid)]['npv_us_dollars'] = m.npv
+                summary_dict[run_uuids[m.meta_id]]['npv_us_dollars'] = m.npv
             else:
-                summary_dict[str(m.meta.run_uuid)]['npv_us_dollars'] = None
-            summary_dict[str(m.meta.run_uuid)]['net_capital_costs'] = m.initial_capital_costs_after_incentives
-            summary_dict[str(m.meta.run_uuid)]['lcc_us_dollars'] = m.lcc
-            summary_dict[str(m.meta.run_uuid)]['replacements_present_cost_after_tax'] = m.replacements_present_cost_after_tax
-            summary_dict[str(m.meta.run_uuid)]['lifecycle_capital_costs_plus_om_after_tax'] = m.lifecycle_capital_costs_plus_om_after_tax
-            summary_dict[str(m.meta.run_uuid)]['total_capital_costs'] = m.lifecycle_generation_tech_capital_costs + m.lifecycle_storage_capital_costs - m.lifecycle_production_incentive_after_tax
-
-    batt = ElectricStorageOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+                summary_dict[run_uuids[m.meta_id]]['npv_us_dollars'] = None
+            summary_dict[run_uuids[m.meta_id]]['net_capital_costs'] = m.initial_capital_costs_after_incentives
+            summary_dict[run_uuids[m.meta_id]]['lcc_us_dollars'] = m.lcc
+            summary_dict[run_uuids[m.meta_id]]['replacements_present_cost_after_tax'] = m.replacements_present_cost_after_tax
+            summary_dict[run_uuids[m.meta_id]]['lifecycle_capital_costs_plus_om_after_tax'] = m.lifecycle_capital_costs_plus_om_after_tax
+            summary_dict[run_uuids[m.meta_id]]['total_capital_costs'] = m.lifecycle_generation_tech_capital_costs + m.lifecycle_storage_capital_costs - m.lifecycle_production_incentive_after_tax
+
+    batt = ElectricStorageOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'size_kw',
         'size_kwh'
     )
     if len(batt) > 0:
         for m in batt:
-            summary_dict[str(m.meta.run_uuid)]['batt_kw'] = m.size_kw  
-            summary_dict[str(m.meta.run_uuid)]['batt_kwh'] = m.size_kwh
+            summary_dict[run_uuids[m.meta_id]]['batt_kw'] = m.size_kw  
+            summary_dict[run_uuids[m.meta_id]]['batt_kwh'] = m.size_kwh
     
-    pv = PVOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    pv = PVOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'size_kw'
     )
     if len(pv) > 0:
         for m in pv:
-            summary_dict[str(m.meta.run_uuid)]['pv_kw'] = m.size_kw
+            summary_dict[run_uuids[m.meta_id]]['pv_kw'] = m.size_kw
     
-    wind = WindOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    wind = WindOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'size_kw'
     )
     if len(wind) > 0:
         for m in wind:
-            summary_dict[str(m.meta.run_uuid)]['wind_kw'] = m.size_kw
+            summary_dict[run_uuids[m.meta_id]]['wind_kw'] = m.size_kw
 
-    gen = GeneratorOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    gen = GeneratorOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'size_kw'
     )
     if len(gen) > 0:
         for m in gen:
-            summary_dict[str(m.meta.run_uuid)]['gen_kw'] = m.size_kw
+            summary_dict[run_uuids[m.meta_id]]['gen_kw'] = m.size_kw
 
-    cst = CSTOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    cst = CSTOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'size_kw'
     )
     if len(cst) > 0:
         for m in cst:
-            summary_dict[str(m.meta.run_uuid)]['cst_kw'] = m.size_kw
+            summary_dict[run_uuids[m.meta_id]]['cst_kw'] = m.size_kw
 
-    hightemptes = HighTempThermalStorageOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    hightemptes = HighTempThermalStorageOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'size_kwh'
     )
     if len(hightemptes) > 0:
         for m in hightemptes:
-            summary_dict[str(m.meta.run_uuid)]['hightemptes_kwh'] = m.size_kwh
+            summary_dict[run_uuids[m.meta_id]]['hightemptes_kwh'] = m.size_kwh
 
     # assumes run_uuids exist in both CHPInputs and CHPOutputs
-    chpInputs = CHPInputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-            'meta__run_uuid',
+    chpInputs = CHPInputs.objects.filter(meta_id__in=meta_ids).only(
+            'meta_id',
             'thermal_efficiency_full_load'
     )
     thermal_efficiency_full_load = dict()
     if len(chpInputs) > 0:
         for m in chpInputs:
-            thermal_efficiency_full_load[str(m.meta.run_uuid)] = m.thermal_efficiency_full_load
+            thermal_efficiency_full_load[m.meta_id] = m.thermal_efficiency_full_load
     
-    chpOutputs = CHPOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-            'meta__run_uuid',
+    chpOutputs = CHPOutputs.objects.filter(meta_id__in=meta_ids).only(
+            'meta_id',
             'size_kw'
     )
     if len(chpOutputs) > 0:
         for m in chpOutputs:
-            if thermal_efficiency_full_load[str(m.meta.run_uuid)] == 0:
-                summary_dict[str(m.meta.run_uuid)]['prime_gen_kw'] = m.size_kw
+            if thermal_efficiency_full_load[m.meta_id] == 0:
+                summary_dict[run_uuids[m.meta_id]]['prime_gen_kw'] = m.size_kw
             else:
-                summary_dict[str(m.meta.run_uuid)]['chp_kw'] = m.size_kw
+                summary_dict[run_uuids[m.meta_id]]['chp_kw'] = m.size_kw
     
-    ghpOutputs = GHPOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-            'meta__run_uuid',
+    ghpOutputs = GHPOutputs.objects.filter(meta_id__in=meta_ids).only(
+            'meta_id',
             'ghp_option_chosen',
             'ghpghx_chosen_outputs',
             'size_heat_pump_ton',
@@ -1390,59 +1435,59 @@ def queryset_for_summary(api_metas,summary_dict:dict):
         for m in ghpOutputs:
             if m.ghp_option_chosen > 0:
                 if m.size_heat_pump_ton is not None:
-                    summary_dict[str(m.meta.run_uuid)]['ghp_ton'] = m.size_heat_pump_ton
+                    summary_dict[run_uuids[m.meta_id]]['ghp_ton'] = m.size_heat_pump_ton
                 else:
-                    summary_dict[str(m.meta.run_uuid)]['ghp_cooling_ton'] = m.size_wwhp_cooling_pump_ton
-                    summary_dict[str(m.meta.run_uuid)]['ghp_heating_ton'] = m.size_wwhp_heating_pump_ton
-                summary_dict[str(m.meta.run_uuid)]['ghp_n_bores'] = m.ghpghx_chosen_outputs['number_of_boreholes']
+                    summary_dict[run_uuids[m.meta_id]]['ghp_cooling_ton'] = m.size_wwhp_cooling_pump_ton
+                    summary_dict[run_uuids[m.meta_id]]['ghp_heating_ton'] = m.size_wwhp_heating_pump_ton
+                summary_dict[run_uuids[m.meta_id]]['ghp_n_bores'] = m.ghpghx_chosen_outputs['number_of_boreholes']
     
-    elecHeater = ElectricHeaterOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-            'meta__run_uuid',
+    elecHeater = ElectricHeaterOutputs.objects.filter(meta_id__in=meta_ids).only(
+            'meta_id',
             'size_mmbtu_per_hour'
     )
     if len(elecHeater) > 0:
         for m in elecHeater:
-            summary_dict[str(m.meta.run_uuid)]['electric_heater_mmbtu_per_hour'] = m.size_mmbtu_per_hour
+            summary_dict[run_uuids[m.meta_id]]['electric_heater_mmbtu_per_hour'] = m.size_mmbtu_per_hour
 
-    ashpSpaceHeater = ASHPSpaceHeaterOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-            'meta__run_uuid',
+    ashpSpaceHeater = ASHPSpaceHeaterOutputs.objects.filter(meta_id__in=meta_ids).only(
+            'meta_id',
             'size_ton'
     )
     if len(ashpSpaceHeater) > 0:
         for m in ashpSpaceHeater:
-            summary_dict[str(m.meta.run_uuid)]['ASHPSpace_heater_ton'] = m.size_ton
+            summary_dict[run_uuids[m.meta_id]]['ASHPSpace_heater_ton'] = m.size_ton
 
-    ashpWaterHeater = ASHPWaterHeaterOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-            'meta__run_uuid',
+    ashpWaterHeater = ASHPWaterHeaterOutputs.objects.filter(meta_id__in=meta_ids).only(
+            'meta_id',
             'size_ton'
     )
     if len(ashpWaterHeater) > 0:
         for m in ashpWaterHeater:
-            summary_dict[str(m.meta.run_uuid)]['ASHPWater_heater_ton'] = m.size_ton
-    hottes = HotThermalStorageOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+            summary_dict[run_uuids[m.meta_id]]['ASHPWater_heater_ton'] = m.size_ton
+    hottes = HotThermalStorageOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'size_gal'
     )
     if len(hottes) > 0:
         for m in hottes:
-            summary_dict[str(m.meta.run_uuid)]['hottes_gal'] = m.size_gal
+            summary_dict[run_uuids[m.meta_id]]['hottes_gal'] = m.size_gal
     
-    coldtes = ColdThermalStorageOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    coldtes = ColdThermalStorageOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'size_gal'
     )
     if len(coldtes) > 0:
         for m in coldtes:
-            summary_dict[str(m.meta.run_uuid)]['coldtes_gal'] = m.size_gal
+            summary_dict[run_uuids[m.meta_id]]['coldtes_gal'] = m.size_gal
     
 
-    abschillTon = AbsorptionChillerOutputs.objects.filter(meta__run_uuid__in=run_uuids).only(
-        'meta__run_uuid',
+    abschillTon = AbsorptionChillerOutputs.objects.filter(meta_id__in=meta_ids).only(
+        'meta_id',
         'size_ton'
     )
     if len(abschillTon) > 0:
         for m in abschillTon:
-            summary_dict[str(m.meta.run_uuid)]['absorpchl_ton'] = m.size_ton
+            summary_dict[run_uuids[m.meta_id]]['absorpchl_ton'] = m.size_ton
 
     return summary_dict
 
@@ -1558,17 +1603,10 @@ def avert_emissions_profile(request):
             "longitude": request.GET['longitude'],
             "load_year": request.GET['load_year']
         }
-        julia_host = os.environ.get(
-            'JULIA_HOST', 
-            "julia"
-        )
-        http_jl_response = requests.get(
-            "http://" + julia_host + ":8081/avert_emissions_profile/", 
-            json=inputs
-        )
+        status_code, response_data = get_julia_defaults("avert_emissions_profile", inputs)
         response = JsonResponse(
-            http_jl_response.json(),
-            status=http_jl_response.status_code
+            response_data,
+            status=status_code
         )
         return response
 
@@ -1600,17 +1638,10 @@ def cambium_profile(request):
             # "time_steps_per_hour": request.GET['time_steps_per_hour'],
             "load_year": request.GET['load_year']
         }
-        julia_host = os.environ.get(
-            'JULIA_HOST', 
-            "julia"
-        )
-        http_jl_response = requests.get(
-            "http://" + julia_host + ":8081/cambium_profile/", 
-            json=inputs
-        )
+        status_code, response_data = get_julia_defaults("cambium_profile", inputs)
         response = JsonResponse(
-            http_jl_response.json(),
-            status=http_jl_response.status_code
+            response_data,
+            status=status_code
         )
         return response
 
@@ -1635,17 +1666,10 @@ def easiur_costs(request):
             "longitude": request.GET['longitude'],
             "inflation": request.GET['inflation']
         }
-        julia_host = os.environ.get(
-            'JULIA_HOST', 
-            "julia"
-        )
-        http_jl_response = requests.get(
-            "http://" + julia_host + ":8081/easiur_costs/", 
-            json=inputs
-        )
+        status_code, response_data = get_julia_defaults("easiur_costs", inputs)
         response = JsonResponse(
-            http_jl_response.json(),
-            status=http_jl_response.status_code
+            response_data,
+            status=status_code
         )
         return response
 
@@ -1727,17 +1751,10 @@ def sector_defaults(request):
             "federal_procurement_type": request.GET['federal_procurement_type'],
             "federal_sector_state": request.GET['federal_sector_state']
         }
-        julia_host = os.environ.get(
-            'JULIA_HOST', 
-            "julia"
-        )
-        http_jl_response = requests.get(
-            "http://" + julia_host + ":8081/sector_defaults/", 
-            json=inputs
-        )
+        status_code, response_data = get_julia_defaults("sector_defaults", inputs)
         response = JsonResponse(
-            http_jl_response.json(),
-            status=http_jl_response.status_code
+            response_data,
+            status=status_code
         )
         return response
 
@@ -1798,16 +1815,17 @@ def sector_defaults(request):
 ##############################################################################################################################
 ################################################# START Results Table #########################################################
 ##############################################################################################################################
-def access_raw_data(run_uuids: List[str], request: Any) -> Dict[str, List[Dict[str, Any]]]:
+def access_raw_data(run_uuids: List[str], request: Any, table_config_name: str = None) -> Dict[str, List[Dict[str, Any]]]:
     try:
-        usermeta = UserProvidedMeta.objects.filter(meta__run_uuid__in=run_uuids).only('meta__run_uuid', 'description', 'address')
-        meta_data_dict = {um.meta.run_uuid: {"description": um.description, "address": um.address} for um in usermeta}
+        usermeta = UserProvidedMeta.objects.filter(meta__run_uuid__in=run_uuids).values_list('meta__run_uuid', 'description', 'address')
+        meta_data_dict = {str(run_uuid): {"description": description, "address": address} for (run_uuid, description, address) in usermeta}
+        full_data = summarize_vector_data_for_table(run_uuids, table_config_name)
 
         return {
             "scenarios": [
                 {
                     "run_uuid": str(run_uuid),
-                    "full_data": summarize_vector_data(request, run_uuid),
+                    "full_data": full_data[run_uuid],
                     "meta_data": meta_data_dict.get(run_uuid, {})
                 }
                 for run_uuid in run_uuids
@@ -1816,14 +1834,85 @@ def access_raw_data(run_uuids: List[str], request: Any) -> Dict[str, List[Dict[s
     except Exception:
         log_and_raise_error('access_raw_data')
     
-def summarize_vector_data(request: Any, run_uuid: str) -> Dict[str, Any]:
+@lru_cache(maxsize=None)
+def get_table_fields(table_config_name: str, config_module: Any = table_config_module, extra_keys: tuple = ()) -> Dict[str, Any]:
+    """
+    Find the results fields that a table uses from the string constants in its definition in config_module,
+    e.g. "outputs.ElectricTariff.year_one_bill_before_tax" or "webtool_uuid".
+    Args:
+        table_config_name: name of the table in config_module, or None for all of the tables.
+        config_module: custom_table_config or custom_timeseries_table_config.
+        extra_keys: keys used outside of the table definition, e.g. "inputs.Settings.time_steps_per_hour".
+    Returns:
+        Dict with "meta": set of APIMeta fields, "inputs" and "outputs": {results key: set of model fields}.
+    """
+    tree = ast.parse(inspect.getsource(config_module))
+    nodes = [node for node in tree.body if isinstance(node, ast.Assign)
+             and any(getattr(target, "id", None) == table_config_name for target in node.targets)] or [tree]
+    keys = list(extra_keys)
+    for node in nodes:
+        keys.extend(const.value for const in ast.walk(node) if isinstance(const, ast.Constant) and isinstance(const.value, str))
+    meta_fields = {field.name for field in APIMeta._meta.concrete_fields}
+    # the rate names in the excel workbook headers come from the urdb_metadata
+    fields = {"meta": set(), "inputs": defaultdict(set, {"ElectricTariff": {"urdb_metadata"}}), "outputs": defaultdict(set)}
+    for key in keys:
+        parts = key.split(".")
+        if parts[0] in ("inputs", "outputs") and len(parts) >= 3:
+            fields[parts[0]][parts[1]].add(parts[2])
+        elif len(parts) == 1 and parts[0] in meta_fields:
+            fields["meta"].add(parts[0])
+    return fields
+
+def get_table_data(run_uuids: List[str], table_fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Query only the table_fields (from get_table_fields) for all of the run_uuids at once (one query per model)
+    rather than building the full results response for each run_uuid.
+    Returns:
+        Dict of run_uuid: results dict with only the table_fields, or None if the run_uuid does not exist or its
+        status is error (as for the results endpoint).
+    """
+    data = {str(uuid.UUID(run_uuid)): None for run_uuid in run_uuids}
+    run_uuid_by_meta_id = dict()
+    for m in APIMeta.objects.filter(run_uuid__in=run_uuids).values("id", "run_uuid", "status", *(table_fields["meta"] - {"id", "run_uuid", "status"})):
+        if m["status"] == "error":
+            continue  # the results endpoint responds with 400
+        run_uuid_by_meta_id[m["id"]] = str(m["run_uuid"])
+        d = {field: m[field] for field in table_fields["meta"]}
+        d["inputs"] = dict()
+        d["outputs"] = dict()
+        data[str(m["run_uuid"])] = d
+
+    for section, relations in [("inputs", RESULTS_INPUTS), ("outputs", RESULTS_OUTPUTS)]:
+        for key, fields in table_fields[section].items():
+            if key not in relations or not run_uuid_by_meta_id:
+                continue
+            model = APIMeta._meta.get_field(relations[key]).related_model
+            model_fields = {field.name for field in model._meta.concrete_fields}
+            fields = [field for field in sorted(fields) if field in model_fields]
+            if not fields:
+                continue
+            rows = defaultdict(list)
+            for row in model.objects.filter(meta_id__in=run_uuid_by_meta_id.keys()).order_by("pk").values("meta_id", *fields):
+                rows[row.pop("meta_id")].append(row)
+            for meta_id, model_rows in rows.items():
+                # multiple PVs are a list, as in the results
+                data[run_uuid_by_meta_id[meta_id]][section][key] = model_rows[0] if len(model_rows) == 1 else model_rows
+
+    return {run_uuid: data[str(uuid.UUID(run_uuid))] for run_uuid in run_uuids}
+
+def summarize_vector_data_for_table(run_uuids: List[str], table_config_name: str = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Results for each run_uuid with the vectors summed (except monthly vectors), as used by the results tables.
+    Only the fields used by the table are queried (see get_table_data).
+    """
     try:
-        response = results(request, run_uuid)
-        if response.status_code == 200:
-            return sum_vectors(json.loads(response.content), preserve_monthly=True)
-        return {"error": f"Failed to fetch data for run_uuid {run_uuid}"}
+        data = get_table_data(run_uuids, get_table_fields(table_config_name))
+        return {
+            run_uuid: sum_vectors(d, preserve_monthly=True) if d is not None else {"error": f"Failed to fetch data for run_uuid {run_uuid}"}
+            for run_uuid, d in data.items()
+        }
     except Exception:
-        log_and_raise_error('summarize_vector_data')
+        log_and_raise_error('summarize_vector_data_for_table')
 
 def generate_data_dict(config: List[Dict[str, Any]], df_gen: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -1937,7 +2026,7 @@ def generate_results_table(request: Any) -> HttpResponse:
         if not target_custom_table:
             return JsonResponse({"Error": f"Invalid table configuration: {table_config_name}. Please provide a valid configuration name."}, status=400)
 
-        scenarios = access_raw_data(run_uuids, request)
+        scenarios = access_raw_data(run_uuids, request, table_config_name)
         final_df = process_scenarios(scenarios['scenarios'], target_custom_table)
         final_df_transpose = final_df.transpose()
         final_df_transpose.columns = final_df_transpose.iloc[0]
@@ -2361,6 +2450,32 @@ def generate_excel_workbook(df: pd.DataFrame, custom_table: List[Dict[str, Any]]
 ################################################# START Get Timeseries Table #####################################################
 ##############################################################################################################################
 
+# keys used by get_timeseries_table in addition to those in the table configuration
+TIMESERIES_TABLE_EXTRA_KEYS = ("inputs.ElectricLoad.year", "inputs.Settings.time_steps_per_hour")
+TIMESERIES_TABLE_FORMATS = ["xlsx", "csv"]
+CSV_ROWS_PER_CHUNK = 1000
+
+class EchoBuffer:
+    """
+    File-like object for csv.writer that returns the written line instead of storing it, for streaming responses
+    """
+    def write(self, value):
+        return value
+
+def stream_csv(header: List[str], rows: Any):
+    """
+    Yield CSV text in chunks of CSV_ROWS_PER_CHUNK rows for a StreamingHttpResponse
+    """
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(header)
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) == CSV_ROWS_PER_CHUNK:
+            yield "".join(chunk)
+            chunk = []
+    yield "".join(chunk)
+
 def get_timeseries_table(request: Any) -> HttpResponse:
     """
     Generate an Excel file with timeseries data for one or more scenarios.
@@ -2369,12 +2484,15 @@ def get_timeseries_table(request: Any) -> HttpResponse:
     Query Parameters:
     - run_uuid[0], run_uuid[1], etc.: UUIDs of scenarios to include
     - table_config_name: Name of configuration to use (default: 'custom_timeseries_energy_demand')
+    - format: 'xlsx' (default) or 'csv' (streamed, with ISO 8601 datetimes and no formatting, for machine clients)
     
     The columns, formatting, and data extraction are defined in custom_timeseries_table_config.py
+    The workbook is written with xlsxwriter's constant_memory mode to a temporary file and streamed from there.
     """
     from reoptjl.custom_timeseries_table_helpers import (
-        generate_datetime_column, 
-        get_monthly_peak_for_timestep,
+        generate_datetime_index,
+        datetime_index_to_excel,
+        expand_monthly_values,
         safe_get_list,
         safe_get_value
     )
@@ -2392,6 +2510,10 @@ def get_timeseries_table(request: Any) -> HttpResponse:
         if not target_config:
             return JsonResponse({"Error": f"Invalid table configuration: {table_config_name}. Please provide a valid configuration name."}, status=400)
         
+        output_format = request.GET.get('format', 'xlsx').lower()
+        if output_format not in TIMESERIES_TABLE_FORMATS:
+            return JsonResponse({"Error": f"Invalid format: {output_format}. Please provide one of {TIMESERIES_TABLE_FORMATS}."}, status=400)
+        
         # Extract configuration components
         columns_config = target_config.get('columns', [])
         formatting_config = target_config.get('formatting', {})
@@ -2409,18 +2531,17 @@ def get_timeseries_table(request: Any) -> HttpResponse:
             except ValueError:
                 return JsonResponse({"Error": f"Invalid UUID format: {r_uuid}. Ensure that each run_uuid is a valid UUID."}, status=400)
         
-        # Fetch data for all run_uuids
+        # Fetch the fields used by the table for all run_uuids
+        table_fields = get_table_fields(table_config_name, timeseries_config, TIMESERIES_TABLE_EXTRA_KEYS)
+        table_data = get_table_data(run_uuids, table_fields)
         scenarios_data = []
         for run_uuid in run_uuids:
-            response = results(request, run_uuid)
-            if response.status_code == 200:
-                data = json.loads(response.content)
-                scenarios_data.append({
-                    'run_uuid': run_uuid,
-                    'data': data
-                })
-            else:
+            if table_data[run_uuid] is None:
                 return JsonResponse({"Error": f"Failed to fetch data for run_uuid {run_uuid}"}, status=500)
+            scenarios_data.append({
+                'run_uuid': run_uuid,
+                'data': table_data[run_uuid]
+            })
         
         if not scenarios_data:
             return JsonResponse({"Error": "No valid scenario data found."}, status=500)
@@ -2433,15 +2554,71 @@ def get_timeseries_table(request: Any) -> HttpResponse:
         time_steps_per_hour = safe_get_value(first_scenario, 'inputs.Settings.time_steps_per_hour', 1)
         
         # Generate datetime column
-        datetime_col = generate_datetime_column(year, time_steps_per_hour)
+        datetime_index = generate_datetime_index(year, time_steps_per_hour)
+        n_rows = len(datetime_index)
         
         # Log for debugging
         log.info(f"get_timeseries_table - year: {year}, time_steps_per_hour: {time_steps_per_hour}")
-        log.info(f"get_timeseries_table - datetime_col length: {len(datetime_col)}")
+        log.info(f"get_timeseries_table - datetime_col length: {n_rows}")
         
-        # Create Excel workbook
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+        def fit_to_rows(data: Any) -> List[Any]:
+            # Missing values are 0 and extra values are dropped
+            data = data if isinstance(data, list) else []
+            return data[:n_rows] + [0] * (n_rows - len(data))
+        
+        base_columns = [col for col in columns_config if col.get('is_base_column', False)]
+        scenario_columns = [col for col in columns_config if not col.get('is_base_column', False)]
+        
+        # Build the headers and column data, each column is a list of n_rows values
+        headers = []  # (column config, header text, scenario index or None for base columns)
+        column_data = []
+        for col in base_columns:
+            headers.append((col, col['label'], None))
+            if col['key'] == 'datetime':
+                # Excel dates are written as numbers with the column's date format
+                if output_format == "csv":
+                    column_data.append(np.datetime_as_string(datetime_index, unit='m').tolist())
+                else:
+                    column_data.append(datetime_index_to_excel(datetime_index).tolist())
+            elif col['key'] == 'peak_monthly_load_kw':
+                # Special handling for monthly peaks - expand to all timesteps
+                monthly_peaks = safe_get_list(first_scenario, 'outputs.ElectricLoad.monthly_peaks_kw', [])
+                column_data.append(expand_monthly_values(monthly_peaks, time_steps_per_hour))
+            else:
+                # Extract timeseries data using lambda function
+                column_data.append(fit_to_rows(col['timeseries_path'](first_scenario)))
+        
+        for scenario_idx, scenario in enumerate(scenarios_data):
+            # Get rate name from urdb_metadata for header
+            rate_name = safe_get_value(scenario['data'], 'inputs.ElectricTariff.urdb_metadata.rate_name', f'Scenario {scenario_idx + 1}')
+            for col in scenario_columns:
+                # Build header text with units and rate name
+                header_text = col['label']
+                if col.get('units'):
+                    header_text = f"{header_text}: \n{rate_name} {col['units']}"
+                else:
+                    header_text = f"{header_text}: \n{rate_name}"
+                headers.append((col, header_text, scenario_idx))
+                
+                data = col['timeseries_path'](scenario['data'])
+                # Log on first scenario for debugging
+                if scenario_idx == 0:
+                    log.info(f"get_timeseries_table - {col['key']} length: {len(data) if isinstance(data, list) else 0}")
+                column_data.append(fit_to_rows(data))
+        
+        rows = zip(*column_data)
+        
+        if output_format == "csv":
+            response = StreamingHttpResponse(
+                stream_csv([header_text.replace(": \n", ": ") for (_, header_text, _) in headers], rows),
+                content_type='text/csv'
+            )
+            response['Content-Disposition'] = 'attachment; filename="get_timeseries_table.csv"'
+            return response
+        
+        # Create Excel workbook, constant_memory flushes each row to a temporary file once the next row is started
+        output = tempfile.TemporaryFile()
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
         worksheet_name = formatting_config.get('worksheet_name')
         worksheet = workbook.add_worksheet(worksheet_name)
         
@@ -2474,101 +2651,18 @@ def get_timeseries_table(request: Any) -> HttpResponse:
             else:
                 column_formats[col['key']] = workbook.add_format(base_data_opts)
         
-        # Set column widths and write headers
-        col_idx = 0
-        base_columns = [col for col in columns_config if col.get('is_base_column', False)]
-        scenario_columns = [col for col in columns_config if not col.get('is_base_column', False)]
-        
-        # Write base column headers
-        for col in base_columns:
-            width = col.get('column_width', 15)
-            worksheet.set_column(col_idx, col_idx, width)
-            worksheet.write(0, col_idx, col['label'], base_header_format)
-            col_idx += 1
-        
-        # Write scenario column headers (repeated for each scenario)
-        for scenario_idx, scenario in enumerate(scenarios_data):
-            # Get rate name from urdb_metadata for header
-            rate_name = safe_get_value(scenario['data'], 'inputs.ElectricTariff.urdb_metadata.rate_name', f'Scenario {scenario_idx + 1}')
-            
-            # Use different colored header for each scenario (cycle through colors)
-            scenario_header = scenario_header_formats[scenario_idx % len(scenario_header_formats)]
-            
-            for col in scenario_columns:
-                width = col.get('column_width', 15)
-                worksheet.set_column(col_idx, col_idx, width)
-                
-                # Build header text with units and rate name
-                header_text = col['label']
-                if col.get('units'):
-                    header_text = f"{header_text}: \n{rate_name} {col['units']}"
-                else:
-                    header_text = f"{header_text}: \n{rate_name}"
-                
-                worksheet.write(0, col_idx, header_text, scenario_header)
-                col_idx += 1
-        
-        # Extract base column data from first scenario
-        base_column_data = {}
-        for col in base_columns:
-            if col['key'] == 'datetime':
-                # Special handling for datetime column
-                base_column_data['datetime'] = datetime_col
-            elif col['key'] == 'peak_monthly_load_kw':
-                # Special handling for monthly peaks - expand to all timesteps
-                monthly_peaks = safe_get_list(first_scenario, 'outputs.ElectricLoad.monthly_peaks_kw', [])
-                base_column_data['peak_monthly_load_kw'] = [
-                    get_monthly_peak_for_timestep(i, monthly_peaks, time_steps_per_hour) 
-                    for i in range(len(datetime_col))
-                ]
+        # Set column widths and formats (used by the data cells, which are written without a format) and write headers
+        for col_idx, (col, header_text, scenario_idx) in enumerate(headers):
+            worksheet.set_column(col_idx, col_idx, col.get('column_width', 15), column_formats[col['key']])
+            if scenario_idx is None:
+                worksheet.write(0, col_idx, header_text, base_header_format)
             else:
-                # Extract timeseries data using lambda function
-                path_func = col['timeseries_path']
-                data = path_func(first_scenario)
-                base_column_data[col['key']] = data if isinstance(data, list) else []
-        
-        # Extract scenario column data for all scenarios
-        scenario_column_data = []
-        for scenario_idx, scenario in enumerate(scenarios_data):
-            scenario_data = {}
-            for col in scenario_columns:
-                path_func = col['timeseries_path']
-                data = path_func(scenario['data'])
-                scenario_data[col['key']] = data if isinstance(data, list) else []
-                
-                # Log on first scenario for debugging
-                if scenario_idx == 0:
-                    log.info(f"get_timeseries_table - {col['key']} length: {len(scenario_data[col['key']])}")
-            
-            scenario_column_data.append(scenario_data)
+                # Use different colored header for each scenario (cycle through colors)
+                worksheet.write(0, col_idx, header_text, scenario_header_formats[scenario_idx % len(scenario_header_formats)])
         
         # Write data rows
-        for row_idx in range(len(datetime_col)):
-            col_idx = 0
-            
-            # Write base column data
-            for col in base_columns:
-                data_list = base_column_data.get(col['key'], [])
-                
-                if col['key'] == 'datetime':
-                    # Special handling for datetime - convert string to Excel datetime
-                    datetime_str = data_list[row_idx] if row_idx < len(data_list) else ''
-                    if datetime_str:
-                        dt = datetime.strptime(datetime_str, '%m/%d/%Y %H:%M')
-                        worksheet.write_datetime(row_idx + 1, col_idx, dt, column_formats[col['key']])
-                else:
-                    value = data_list[row_idx] if row_idx < len(data_list) else 0
-                    worksheet.write(row_idx + 1, col_idx, value, column_formats[col['key']])
-                
-                col_idx += 1
-            
-            # Write scenario column data
-            for scenario_data in scenario_column_data:
-                for col in scenario_columns:
-                    data_list = scenario_data.get(col['key'], [])
-                    value = data_list[row_idx] if row_idx < len(data_list) else 0
-                    worksheet.write(row_idx + 1, col_idx, value, column_formats[col['key']])
-                    col_idx += 1
+        for row_idx, row in enumerate(rows):
+            worksheet.write_row(row_idx + 1, 0, row)
         
         # Freeze panes based on configuration
         freeze_panes = formatting_config.get('freeze_panes', (1, 0))
@@ -2578,13 +2672,13 @@ def get_timeseries_table(request: Any) -> HttpResponse:
         workbook.close()
         output.seek(0)
         
-        # Return as downloadable file
-        response = HttpResponse(
-            output, 
+        # Return as downloadable file, streamed from the temporary file which is deleted when the response closes it
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename="get_timeseries_table.xlsx",
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        response['Content-Disposition'] = 'attachment; filename="get_timeseries_table.xlsx"'
-        return response
         
     except Exception as e:
         log.error(f"Error in get_timeseries_table: {e}")
@@ -1,9 +1,18 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
 #!usr/bin/python
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from math import floor
+import numpy as np
 import pandas as pd
-from celery import group, shared_task, chord
-from time import sleep
+from celery import current_task, group, shared_task
+
+OUTAGE_SIM_BACKENDS = ("eager", "processes", "celery")
+INCREMENTAL_MODES = (None, "exact", "approximate")
+SOC_TOLERANCE_KWH = 0.01
+FUEL_TOLERANCE_GAL = 0.01
 
 
 @shared_task
@@ -78,9 +87,229 @@ def simulate_outage(init_time_step, diesel_kw, fuel_available, b, m, batt_kwh, b
     return n_timesteps / n_steps_per_hour  # met the critical load for all time steps
 
 
+def simulate_outage_batch(init_time_steps, diesel_kw, fuel_available, b, m, batt_kwh, batt_kw,
+                          batt_roundtrip_efficiency, n_timesteps, n_steps_per_hour, batt_soc_kwh, crit_load, chp_kw,
+                          incremental=None, soc_tolerance_kwh=SOC_TOLERANCE_KWH, fuel_tolerance_gal=FUEL_TOLERANCE_GAL):
+    """
+    Vectorized equivalent of simulate_outage: advances the outage simulations for every initial time step in
+    init_time_steps at once as numpy arrays. Once an outage fails to meet the critical load it is dropped from the
+    arrays so that no more work is done for it.
+
+    With incremental set, work is reused between outages with nearby initial time steps: an outage reaches each
+    time step after the outages that start later. Once it arrives at a time step with the same battery state of
+    charge and fuel as the closest later outage that was simulated through that time step, the rest of its
+    trajectory is the same, so it is dropped and its result is taken from that outage (plus the difference in
+    initial time steps, up to the length of the outage).
+        - "exact": states must be equal, results are identical to the full simulation
+        - "approximate": states may differ by up to soc_tolerance_kwh and fuel_tolerance_gal. Each result is
+            the survival time of a trajectory whose state was perturbed at most once within these tolerances;
+            outages whose chain of reused results would perturb the state more than once are re-simulated.
+            Only the difference in state is bounded, not the error in hours survived: a slightly lower state of
+            charge or fuel can make an outage fail time steps earlier.
+
+    :param init_time_steps: list of int, initial time steps
+    :param diesel_kw: float, generator capacity
+    :param fuel_available: float, gallons
+    :param b: float, diesel fuel burn rate intercept coefficient (y = m*x + b)  [gal/hr]
+    :param m: float, diesel fuel burn rate slope (y = m*x + b)  [gal/kWh]
+    :param batt_kwh: float, battery capacity
+    :param batt_kw: float, battery inverter capacity (AC rating)
+    :param batt_roundtrip_efficiency:
+    :param n_timesteps: int, number of time steps in a year
+    :param n_steps_per_hour: int, number of time steps per hour
+    :param batt_soc_kwh: list of float, battery state of charge in kWh at each initial time step
+    :param crit_load: list of float, load after DER (PV, Wind, ...)
+    :param incremental: None, "exact", or "approximate"
+    :param soc_tolerance_kwh: float, battery state of charge tolerance for incremental="approximate"
+    :param fuel_tolerance_gal: float, fuel tolerance for incremental="approximate"
+    :return: list of float, number of hours that the critical load can be met using load following for each
+        initial time step
+    """
+    if incremental not in INCREMENTAL_MODES:
+        raise ValueError("incremental must be one of {}, got {}.".format(INCREMENTAL_MODES, incremental))
+    load_minus_chp = np.asarray(crit_load, dtype=float) - chp_kw  # Run CHP. No limit on fuel, no turndown constraint
+    starts = np.asarray(init_time_steps, dtype=int)
+    n_starts = len(starts)
+    steps_survived = np.full(n_starts, n_timesteps)  # default: met the critical load for all time steps
+
+    # state of the outages that have not failed yet
+    alive = np.arange(n_starts)
+    soc = np.asarray(batt_soc_kwh, dtype=float).copy()
+    fuel = np.full(n_starts, float(fuel_available))
+    max_charge_kwh = batt_kw / n_steps_per_hour * batt_roundtrip_efficiency
+
+    if incremental is not None:
+        # state just before each absolute time step (not wrapped around the end of the year) as last recorded by a
+        # simulated outage, and the position of that outage in init_time_steps
+        seen_soc = np.full(2 * n_timesteps, np.nan)
+        seen_fuel = np.full(2 * n_timesteps, np.nan)
+        seen_by = np.full(2 * n_timesteps, -1)
+        seen_soc[starts] = soc
+        seen_fuel[starts] = fuel
+        seen_by[starts] = alive
+        follows = np.full(n_starts, -1)  # position of the outage whose result is reused
+        approx_link = np.zeros(n_starts, dtype=bool)
+        perturbed = np.zeros(n_starts, dtype=bool)  # result is reused through an approximate link
+
+    for i in range(n_timesteps):
+        if len(alive) == 0:
+            break
+        load_kw = load_minus_chp[(starts[alive] + i) % n_timesteps]  # for wrapping around end of year
+
+        # load is met, charge battery if there's room in the battery
+        charging = (load_kw < 0) & (soc < batt_kwh)
+        if charging.any():
+            soc[charging] += np.minimum(
+                np.minimum(batt_kwh - soc[charging],  # room available
+                           max_charge_kwh),  # inverter capacity
+                -load_kw[charging] / n_steps_per_hour * batt_roundtrip_efficiency,  # excess energy
+            )
+
+        # check if we can meet load with generator then storage
+        discharging = np.flatnonzero(load_kw >= 0)
+        if len(discharging) > 0:
+            ld = load_kw[discharging]
+            fl = fuel[discharging]
+            fuel_needed = (m * ld + b) / n_steps_per_hour
+            diesel_meets_load = (ld <= diesel_kw) & (fuel_needed <= fl)
+            tank_limited = (fuel_needed > fl) & (ld <= diesel_kw)
+            capacity_limited = (fuel_needed <= fl) & (ld > diesel_kw)
+
+            if tank_limited.any():
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    ld[tank_limited] -= np.maximum(0, (fl[tank_limited] * n_steps_per_hour - b) / m)
+                fl[tank_limited] = 0
+            if capacity_limited.any():
+                ld[capacity_limited] -= diesel_kw
+                # run diesel gen at max output
+                fl[capacity_limited] = np.maximum(0, fl[capacity_limited] - (diesel_kw * m + b) / n_steps_per_hour)
+            fl[diesel_meets_load] -= fuel_needed[diesel_meets_load]
+            ld[diesel_meets_load] = 0
+
+            # check if battery can meet remaining load_kw
+            sc = soc[discharging]
+            battery_meets_load = ~diesel_meets_load & (np.minimum(batt_kw, sc * n_steps_per_hour) >= ld)
+            # prevent battery charge from going negative
+            sc[battery_meets_load] = np.maximum(0, sc[battery_meets_load] - ld[battery_meets_load] / n_steps_per_hour)
+            ld[battery_meets_load] = 0
+
+            fuel[discharging] = fl
+            soc[discharging] = sc
+            load_kw[discharging] = ld
+
+        failed = np.round(load_kw, 5) > 0  # failed to meet load in this time step
+        if failed.any():
+            steps_survived[alive[failed]] = i
+            keep = ~failed
+            alive = alive[keep]
+            soc = soc[keep]
+            fuel = fuel[keep]
+
+        if incremental is not None and len(alive) > 0:
+            # compare with the state that the closest later outage start time had at this absolute time step
+            next_step = starts[alive] + i + 1
+            owner = seen_by[next_step]
+            merged = (soc == seen_soc[next_step]) & (fuel == seen_fuel[next_step])
+            perturbed[owner[merged & perturbed[alive]]] = True
+            if incremental == "approximate":
+                # only reuse approximately from outages that are still simulated and not reused approximately
+                close = ~merged & (owner >= 0) & ~perturbed[alive] & ~perturbed[owner] & (follows[owner] < 0) \
+                        & (np.abs(soc - seen_soc[next_step]) <= soc_tolerance_kwh) \
+                        & (np.abs(fuel - seen_fuel[next_step]) <= fuel_tolerance_gal)
+                close &= ~np.isin(alive, owner[close])
+                approx_link[alive[close]] = True
+                perturbed[owner[close]] = True
+                merged |= close
+
+            seen_soc[next_step] = soc
+            seen_fuel[next_step] = fuel
+            seen_by[next_step] = alive
+
+            if merged.any():
+                follows[alive[merged]] = owner[merged]
+                keep = ~merged
+                alive = alive[keep]
+                soc = soc[keep]
+                fuel = fuel[keep]
+
+    if incremental is not None and (follows >= 0).any():
+        # resolve reused results from the latest outage start time backwards. Outages whose chain of reused results
+        # has more than one approximate link are re-simulated in full.
+        reusing = np.flatnonzero(follows >= 0)
+        reusing = reusing[np.argsort(starts[reusing])[::-1]]
+        n_approx_links = np.zeros(n_starts, dtype=int)
+        resimulate = np.zeros(n_starts, dtype=bool)
+        for pos in reusing:
+            n_links = n_approx_links[follows[pos]] + approx_link[pos]
+            if n_links > 1:
+                resimulate[pos] = True
+            else:
+                n_approx_links[pos] = n_links
+        if resimulate.any():
+            steps_survived[resimulate] = np.round(np.array(simulate_outage_batch(
+                starts[resimulate].tolist(), diesel_kw, fuel_available, b, m, batt_kwh, batt_kw,
+                batt_roundtrip_efficiency, n_timesteps, n_steps_per_hour,
+                np.asarray(batt_soc_kwh, dtype=float)[resimulate].tolist(), crit_load, chp_kw, incremental="exact"
+            )) * n_steps_per_hour).astype(int)
+        for pos in reusing[~resimulate[reusing]]:
+            steps_survived[pos] = min(steps_survived[follows[pos]] + starts[follows[pos]] - starts[pos], n_timesteps)
+
+    return (steps_survived / n_steps_per_hour).tolist()
+
+
+@shared_task
+def simulate_outage_chunk(init_time_steps, diesel_kw, fuel_available, b, m, batt_kwh, batt_kw,
+                          batt_roundtrip_efficiency, n_timesteps, n_steps_per_hour, batt_soc_kwh, crit_load, chp_kw,
+                          incremental=None, soc_tolerance_kwh=SOC_TOLERANCE_KWH, fuel_tolerance_gal=FUEL_TOLERANCE_GAL):
+    """
+    Celery task used to run simulate_outage_batch for a contiguous chunk of initial time steps.
+    See simulate_outage_batch for parameters.
+    """
+    return simulate_outage_batch(init_time_steps, diesel_kw, fuel_available, b, m, batt_kwh, batt_kw,
+                                 batt_roundtrip_efficiency, n_timesteps, n_steps_per_hour, batt_soc_kwh, crit_load,
+                                 chp_kw, incremental=incremental, soc_tolerance_kwh=soc_tolerance_kwh,
+                                 fuel_tolerance_gal=fuel_tolerance_gal)
+
+
+def get_outage_sim_backend(celery_eager=True, backend=None):
+    """
+    Choose how simulate_outages runs the outage simulations:
+        - "eager": all initial time steps in this process
+        - "processes": contiguous chunks of initial time steps in a local process pool
+        - "celery": contiguous chunks of initial time steps as Celery tasks
+    The parallel backend is set with the OUTAGE_SIM_BACKEND environment variable (default "processes").
+    A daemonic process, such as a Celery prefork worker, cannot start a process pool, so "processes" falls back to
+    "eager" there. Inside a Celery task (e.g. run_bau_outage_sim_task) "celery" also falls back to "eager", since
+    waiting on subtasks could take up every worker and deadlock.
+    :param celery_eager: bool, if True run in this process
+    :param backend: str, one of OUTAGE_SIM_BACKENDS; overrides celery_eager and OUTAGE_SIM_BACKEND
+    :return: str, one of OUTAGE_SIM_BACKENDS
+    """
+    if backend is None:
+        if celery_eager:
+            return "eager"
+        backend = os.environ.get('OUTAGE_SIM_BACKEND', "processes")
+    if backend not in OUTAGE_SIM_BACKENDS:
+        raise ValueError("OUTAGE_SIM_BACKEND must be one of {}, got {}.".format(OUTAGE_SIM_BACKENDS, backend))
+    if backend == "processes" and multiprocessing.current_process().daemon:
+        return "eager"
+    if backend == "celery" and current_task:
+        return "eager"
+    return backend
+
+
+def get_outage_sim_n_chunks():
+    """
+    Number of chunks to split the initial time steps into for the parallel backends, set with the OUTAGE_SIM_CHUNKS
+    environment variable (default is the number of CPUs).
+    """
+    return max(1, int(os.environ.get('OUTAGE_SIM_CHUNKS', os.cpu_count() or 1)))
+
+
 def simulate_outages(batt_kwh=0, batt_kw=0, pv_kw_ac_hourly=[], init_soc=0, critical_loads_kw=[], wind_kw_ac_hourly=None,
                      batt_roundtrip_efficiency=0.829, diesel_kw=0, fuel_available=0, b=0, m=0,
-                     celery_eager=True, chp_kw=0
+                     celery_eager=True, chp_kw=0, backend=None, incremental=None,
+                     soc_tolerance_kwh=SOC_TOLERANCE_KWH, fuel_tolerance_gal=FUEL_TOLERANCE_GAL
                      ):
     """
     :param batt_kwh: float, battery storage capacity
@@ -94,6 +323,13 @@ def simulate_outages(batt_kwh=0, batt_kw=0, pv_kw_ac_hourly=[], init_soc=0, crit
     :param fuel_available: float, gallons of diesel fuel available
     :param b: float, diesel fuel burn rate intercept coefficient (y = m*x + b*rated_capacity)  [gal/kwh/kw]
     :param m: float, diesel fuel burn rate slope (y = m*x + b*rated_capacity)  [gal/kWh]
+    :param celery_eager: bool, if True run all outage simulations in this process, otherwise in parallel
+    :param chp_kw: float, CHP capacity
+    :param backend: str, one of OUTAGE_SIM_BACKENDS; overrides the backend chosen by celery_eager
+    :param incremental: None, "exact", or "approximate"; reuse work between adjacent outage start times, see
+        simulate_outage_batch
+    :param soc_tolerance_kwh: float, battery state of charge tolerance for incremental="approximate"
+    :param fuel_tolerance_gal: float, fuel tolerance for incremental="approximate"
     :return: dict,
         {
             "resilience_by_timestep": r,
@@ -145,46 +381,89 @@ def simulate_outages(batt_kwh=0, batt_kw=0, pv_kw_ac_hourly=[], init_soc=0, crit
     Simulation starts here
     '''
     # outer loop: do simulation starting at each time step
-    if not celery_eager:  # run jobs in parallel
-        jobs = group(simulate_outage.s(
-            init_time_step=time_step,
-            diesel_kw=diesel_kw,
-            fuel_available=fuel_available,
-            b=b, m=m,
-            batt_kwh=batt_kwh,
-            batt_kw=batt_kw,
-            batt_roundtrip_efficiency=batt_roundtrip_efficiency,
-            n_timesteps=n_timesteps,
-            n_steps_per_hour=n_steps_per_hour,
-            batt_soc_kwh=init_soc[time_step]*batt_kwh,
-            crit_load=load_minus_der,
-            chp_kw=chp_kw
-        ) for time_step in range(n_timesteps)
-        )
-        result = chord(jobs, process_results.s(n_steps_per_hour, n_timesteps)).delay()
-        while not result.ready():
-            sleep(2)
-        if not result.successful():
-            raise Exception("Outage simulator failed.")
-        return result.result
-    else:  # run jobs serially, faster when each job only takes a small amount of time
-        for time_step in range(n_timesteps):
-            r[time_step] = simulate_outage(
-                init_time_step=time_step,
-                diesel_kw=diesel_kw,
-                fuel_available=fuel_available,
-                b=b, m=m,
-                batt_kwh=batt_kwh,
-                batt_kw=batt_kw,
-                batt_roundtrip_efficiency=batt_roundtrip_efficiency,
-                n_timesteps=n_timesteps,
-                n_steps_per_hour=n_steps_per_hour,
-                batt_soc_kwh=init_soc[time_step] * batt_kwh,
-                crit_load=load_minus_der,
-                chp_kw=chp_kw
-            )
-        results = process_results(r, n_steps_per_hour, n_timesteps)
-        return results
+    backend = get_outage_sim_backend(celery_eager, backend)
+    sim_kwargs = dict(
+        diesel_kw=diesel_kw,
+        fuel_available=fuel_available,
+        b=b, m=m,
+        batt_kwh=batt_kwh,
+        batt_kw=batt_kw,
+        batt_roundtrip_efficiency=batt_roundtrip_efficiency,
+        n_timesteps=n_timesteps,
+        n_steps_per_hour=n_steps_per_hour,
+        crit_load=load_minus_der,
+        chp_kw=chp_kw,
+        incremental=incremental,
+        soc_tolerance_kwh=soc_tolerance_kwh,
+        fuel_tolerance_gal=fuel_tolerance_gal
+    )
+    batt_soc_kwh = [soc * batt_kwh for soc in init_soc]
+
+    if backend == "eager":  # run all outage start times together as vectorized arrays in this process
+        r = simulate_outage_batch(init_time_steps=list(range(n_timesteps)), batt_soc_kwh=batt_soc_kwh, **sim_kwargs)
+    else:  # split the outage start times into contiguous chunks, shipping the load once per chunk
+        chunks = [c.tolist() for c in np.array_split(np.arange(n_timesteps), get_outage_sim_n_chunks()) if len(c)]
+        chunk_socs = [batt_soc_kwh[c[0]:c[-1] + 1] for c in chunks]
+
+        if backend == "processes":
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                futures = [executor.submit(simulate_outage_batch, init_time_steps=c, batt_soc_kwh=soc, **sim_kwargs)
+                           for c, soc in zip(chunks, chunk_socs)]
+                chunk_results = [f.result() for f in futures]
+        else:
+            jobs = group(simulate_outage_chunk.s(init_time_steps=c, batt_soc_kwh=soc, **sim_kwargs)
+                         for c, soc in zip(chunks, chunk_socs))
+            result = jobs.apply_async()
+            try:
+                chunk_results = result.get()
+            except Exception as e:
+                raise Exception("Outage simulator failed.") from e
+        r = [hrs for chunk_result in chunk_results for hrs in chunk_result]
+
+    return process_results(r, n_steps_per_hour, n_timesteps)
+
+
+@lru_cache(maxsize=None)
+def month_and_hour_of_timesteps(n_steps_per_hour):
+    """
+    Month and hour of the day used to group the results of each time step, from a date range of
+    8760*n_steps_per_hour periods starting on 1/1/2017. Cached so that the date range is only built once per resolution.
+    :param n_steps_per_hour: int, number of time steps per hour
+    :return: tuple of numpy arrays, (months, hours)
+    """
+    time = pd.date_range('1/1/2017', periods=8760*n_steps_per_hour, freq='{}min'.format(n_steps_per_hour*60))
+    months = time.month.to_numpy()
+    hours = time.hour.to_numpy()
+    months.flags.writeable = False
+    hours.flags.writeable = False
+    return months, hours
+
+
+def survival_probabilities(r, durations):
+    """
+    Fraction of outages in r that survive at least each of the durations.
+    :param r: numpy array of float, hours survived for each outage start time step
+    :param durations: iterable of int, outage durations in hours
+    :return: list of float, rounded to 4 decimals
+    """
+    r_sorted = np.sort(r)
+    n_surviving = len(r_sorted) - np.searchsorted(r_sorted, list(durations), side='left')
+    return [round(float(n) / float(len(r_sorted)), 4) for n in n_surviving.tolist()]
+
+
+def survival_probabilities_by_group(r, group_keys):
+    """
+    Survival probabilities for outages grouped by group_keys (e.g. month), from 0 hours up to the longest outage
+    survived in each group. Groups are padded with zeros to the same length because PostgreSQL requires that the
+    arrays are rectangular.
+    :param r: numpy array of float, hours survived for each outage start time step
+    :param group_keys: numpy array of int, group key of each outage start time step
+    :return: list of lists of float, one list per group sorted by key
+    """
+    groups = [r[group_keys == k] for k in np.unique(group_keys)]
+    max_hrs = [int(v.max()) + 1 for v in groups]
+    width = max(max_hrs)
+    return [survival_probabilities(v, range(max_hr)) + [0] * (width - max_hr) for v, max_hr in zip(groups, max_hrs)]
 
 
 @shared_task
@@ -194,49 +473,16 @@ def process_results(r, n_steps_per_hour, n_timesteps):
     r_max = max(r)
     r_avg = round((float(sum(r)) / float(len(r))), 2)
 
-    # Create a time series of 8760*n_steps_per_hour elements starting on 1/1/2017
-    time = pd.date_range('1/1/2017', periods=8760*n_steps_per_hour, freq='{}min'.format(n_steps_per_hour*60))
-    r_series = pd.Series(r, index=time)
-
-    r_group_month = r_series.groupby(r_series.index.month)
-    r_group_hour = r_series.groupby(r_series.index.hour)
-
+    r_array = np.asarray(r, dtype=float)
     x_vals = list(range(1, int(floor(r_max)+1)))
-    y_vals = list()
+    y_vals = survival_probabilities(r_array, x_vals) if len(x_vals) > 0 else list()
     y_vals_group_month = list()
     y_vals_group_hour = list()
 
-    for hrs in x_vals:
-        y_vals.append(round(float(sum([1 if h >= hrs else 0 for h in r])) / float(n_timesteps), 4))
-
     if len(x_vals) > 0:
-        width = 0
-        for k, v in r_group_month:
-            tmp = list()
-            max_hr = int(v.max()) + 1
-            for hrs in range(max_hr):
-                tmp.append(round(float(sum([1 if h >= hrs else 0 for h in v])) / float(len(v)), 4))
-            y_vals_group_month.append(tmp)
-            if max_hr > width:
-                width = max_hr
-
-        # PostgreSQL requires that the arrays are rectangular
-        for i, v in enumerate(y_vals_group_month):
-            y_vals_group_month[i] = v + [0] * (width - len(v))
-
-        width = 0
-        for k, v in r_group_hour:
-            tmp = list()
-            max_hr = int(v.max()) + 1
-            for hrs in range(max_hr):
-                tmp.append(round(float(sum([1 if h >= hrs else 0 for h in v])) / float(len(v)), 4))
-            y_vals_group_hour.append(tmp)
-            if max_hr > width:
-                width = max_hr
-
-        # PostgreSQL requires that the arrays are rectangular
-        for i, v in enumerate(y_vals_group_hour):
-            y_vals_group_hour[i] = v + [0] * (width - len(v))
+        months, hours = month_and_hour_of_timesteps(n_steps_per_hour)
+        y_vals_group_month = survival_probabilities_by_group(r_array, months)
+        y_vals_group_hour = survival_probabilities_by_group(r_array, hours)
 
     return {"resilience_by_timestep": r,
             "resilience_hours_min": r_min,
@@ -0,0 +1,66 @@
+# REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+import os
+import sys
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.core.cache import cache
+from django.utils import timezone
+from reo.exceptions import UnexpectedError
+from resilience_stats.models import ResilienceModel
+logger = get_task_logger(__name__)
+
+# A queued or running BAU simulation blocks new ones for the same run_uuid for at most this long
+BAU_OUTAGE_SIM_TIMEOUT_SECONDS = int(os.environ.get('BAU_OUTAGE_SIM_TIMEOUT_SECONDS', 3600))
+# A failed BAU simulation is reported for this long before the next request queues it again
+BAU_OUTAGE_SIM_ERROR_SECONDS = 60
+
+
+def bau_outage_sim_key(run_uuid):
+    return "resilience_stats_bau_outage_sim_{}".format(run_uuid)
+
+
+def get_bau_outage_sim_progress(run_uuid):
+    """
+    :return: dict with the status ("Queued", "Running" or "Error") of the BAU outage simulation for run_uuid, when it
+        was queued and started, and the error message if it failed; None if no BAU simulation is queued or running
+    """
+    progress = cache.get(bau_outage_sim_key(run_uuid))
+    if progress is not None and progress.get("started") is not None and progress["status"] == "Running":
+        progress["elapsed_seconds"] = round((timezone.now() - progress["started"]).total_seconds(), 1)
+    return progress
+
+
+def queue_bau_outage_sim(scenariomodel_id, run_uuid):
+    """
+    Queue the BAU outage simulation for run_uuid unless it is already queued or running, so that concurrent requests
+    (from any web worker) share one simulation.
+    :return: dict, progress of the BAU outage simulation (see get_bau_outage_sim_progress)
+    """
+    progress = {"status": "Queued", "queued": timezone.now(), "started": None}
+    if cache.add(bau_outage_sim_key(run_uuid), progress, timeout=BAU_OUTAGE_SIM_TIMEOUT_SECONDS):
+        run_bau_outage_sim_task.delay(scenariomodel_id, run_uuid)
+    return get_bau_outage_sim_progress(run_uuid)
+
+
+@shared_task
+def run_bau_outage_sim_task(scenariomodel_id, run_uuid):
+    # imported here because resilience_stats.views imports this module
+    from resilience_stats.views import run_outage_sim
+
+    key = bau_outage_sim_key(run_uuid)
+    progress = cache.get(key) or {"status": "Queued", "queued": timezone.now()}
+    progress.update({"status": "Running", "started": timezone.now()})
+    cache.set(key, progress, timeout=BAU_OUTAGE_SIM_TIMEOUT_SECONDS)
+    try:
+        bau_results = run_outage_sim(run_uuid, with_tech=False, bau=True)
+        ResilienceModel.objects.filter(scenariomodel_id=scenariomodel_id).update(**bau_results)
+    except Exception:
+        exc_type, exc_value, exc_traceback = sys.exc_info()
+        err = UnexpectedError(exc_type, exc_value.args[0], exc_traceback, task='resilience_stats', run_uuid=run_uuid)
+        err.save_to_db()
+        logger.error("BAU outage simulation failed: UUID: " + str(run_uuid))
+        progress.update({"status": "Error", "error": err.message})
+        cache.set(key, progress, timeout=BAU_OUTAGE_SIM_ERROR_SECONDS)
+        return False
+    cache.delete(key)
+    return True
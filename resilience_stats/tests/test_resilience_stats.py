@@ -1,9 +1,20 @@
 # REopt®, Copyright (c) Alliance for Sustainable Energy, LLC. See also https://github.com/NREL/REopt_API/blob/master/LICENSE.
+import copy
 import json
+import multiprocessing
 import os
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
 from tastypie.test import ResourceTestCaseMixin
-from resilience_stats.outage_simulator_LF import simulate_outages
+from resilience_stats.outage_simulator_LF import simulate_outages, simulate_outage, simulate_outage_batch, \
+    get_outage_sim_backend
+from resilience_stats.tasks import bau_outage_sim_key, queue_bau_outage_sim
+
+
+def put_outage_sim_backend(queue, celery_eager, backend=None):
+    queue.put(get_outage_sim_backend(celery_eager, backend))
 
 
 class TestResilStats(ResourceTestCaseMixin, TestCase):
@@ -396,6 +407,22 @@ class TestResilStats(ResourceTestCaseMixin, TestCase):
         results = json.loads(resp.content)
         self.assertTrue(results["survives_specified_outage"])
 
+    def test_bau_outage_sim_is_queued_once(self):
+        """
+        A request for BAU results while the BAU simulation for the same run_uuid is running gets its progress instead
+        of queuing another simulation
+        """
+        run_uuid = "6ea30f0f-3723-4fd1-8a3f-bebf8a3e4dbf"
+        started = timezone.now()
+        cache.set(bau_outage_sim_key(run_uuid), {"status": "Running", "queued": started, "started": started})
+        try:
+            progress = queue_bau_outage_sim(scenariomodel_id=-1, run_uuid=run_uuid)
+        finally:
+            cache.delete(bau_outage_sim_key(run_uuid))
+        self.assertEqual(progress["status"], "Running")
+        self.assertEqual(progress["started"], started)
+        self.assertGreaterEqual(progress["elapsed_seconds"], 0)
+
     def test_outage_sim_chp(self):
         expected = {
             'resilience_hours_min': 0,
@@ -414,3 +441,78 @@ class TestResilStats(ResourceTestCaseMixin, TestCase):
         self.assertListEqual(expected['outage_durations'], resp['outage_durations'])
         for x, y in zip(expected['probs_of_surviving'], resp['probs_of_surviving']):
             self.assertAlmostEqual(x, y, places=4)
+
+    def test_outage_sim_batch_parity(self):
+        """
+        The vectorized simulate_outage_batch should give the same resilience_by_timestep as the scalar
+        simulate_outage loop for battery only, generator only, and CHP cases.
+        """
+        load = self.inputs['critical_loads_kw']
+        load_minus_pv = [ld - pv for ld, pv in zip(load, self.inputs['pv_kw_ac_hourly'])]
+        n_timesteps = len(load)
+        cases = [
+            dict(diesel_kw=0, fuel_available=0, b=0, m=0, batt_kwh=self.inputs['batt_kwh'],
+                 batt_kw=self.inputs['batt_kw'], chp_kw=0, crit_load=load_minus_pv,
+                 batt_soc_kwh=[s * self.inputs['batt_kwh'] for s in self.inputs['init_soc']]),
+            dict(diesel_kw=200, fuel_available=200, b=0.0067, m=0.0648, batt_kwh=0, batt_kw=0, chp_kw=0,
+                 crit_load=load, batt_soc_kwh=[0] * n_timesteps),
+            dict(diesel_kw=0, fuel_available=0, b=0, m=0, batt_kwh=0, batt_kw=0, chp_kw=10,
+                 crit_load=[10] * 10 + [11] * 8750, batt_soc_kwh=[0] * n_timesteps),
+        ]
+        for case in cases:
+            batt_soc_kwh = case.pop('batt_soc_kwh')
+            expected = [simulate_outage(init_time_step=ts, n_timesteps=n_timesteps, n_steps_per_hour=1,
+                                        batt_roundtrip_efficiency=0.829, batt_soc_kwh=batt_soc_kwh[ts], **case)
+                        for ts in range(n_timesteps)]
+            resp = simulate_outage_batch(init_time_steps=list(range(n_timesteps)), n_timesteps=n_timesteps,
+                                         n_steps_per_hour=1, batt_roundtrip_efficiency=0.829,
+                                         batt_soc_kwh=batt_soc_kwh, **case)
+            self.assertListEqual(expected, resp)
+
+    def test_outage_sim_chunked_processes(self):
+        """
+        Running the outage simulations in chunks in a local process pool should give the same results as running them
+        in this process.
+        """
+        expected = simulate_outages(**self.inputs, backend="eager")
+        resp = simulate_outages(**self.inputs, backend="processes")
+        self.assertDictEqual(expected, resp)
+
+    def test_outage_sim_backend_in_daemonic_process(self):
+        """
+        A daemonic process (e.g. a Celery prefork worker) cannot start a process pool, so the "processes" backend
+        should fall back to "eager" there.
+        """
+        self.assertEqual(get_outage_sim_backend(celery_eager=False, backend="processes"), "processes")
+        queue = multiprocessing.Queue()
+        for backend in ("processes", "celery"):
+            worker = multiprocessing.Process(target=put_outage_sim_backend, args=(queue, False, backend), daemon=True)
+            worker.start()
+            worker.join()
+            self.assertEqual(queue.get(timeout=10), {"processes": "eager", "celery": "celery"}[backend])
+
+    def test_outage_sim_backend_in_celery_task(self):
+        """
+        Waiting on the "celery" backend subtasks inside a Celery task could deadlock the workers, so it should fall
+        back to "eager" there.
+        """
+        self.assertEqual(get_outage_sim_backend(celery_eager=False, backend="celery"), "celery")
+        with mock.patch('resilience_stats.outage_simulator_LF.current_task', mock.MagicMock()):
+            self.assertEqual(get_outage_sim_backend(celery_eager=False, backend="celery"), "eager")
+            self.assertEqual(get_outage_sim_backend(celery_eager=False, backend="processes"), "processes")
+
+    def test_outage_sim_incremental(self):
+        """
+        Reusing results between adjacent outage start times with incremental="exact" should give the same results as
+        simulating every outage in full, and so should incremental="approximate" with zero tolerances.
+        """
+        inputs = copy.deepcopy(self.inputs)
+        inputs.update(batt_kwh=inputs['batt_kwh'] * 5, batt_kw=inputs['batt_kw'] * 2,
+                      pv_kw_ac_hourly=[pv * 3 for pv in inputs['pv_kw_ac_hourly']], diesel_kw=100, fuel_available=2000)
+        expected = simulate_outages(**inputs)
+        resp = simulate_outages(**inputs, incremental="exact")
+        self.assertDictEqual(expected, resp)
+        resp = simulate_outages(**inputs, incremental="approximate", soc_tolerance_kwh=0, fuel_tolerance_gal=0)
+        self.assertDictEqual(expected, resp)
+        resp = simulate_outages(**inputs, incremental="approximate")
+        self.assertAlmostEqual(expected['resilience_hours_avg'], resp['resilience_hours_avg'], places=0)
@@ -12,6 +12,7 @@ from reo.models import ScenarioModel, PVModel, StorageModel, LoadProfileModel, G
 from reo.utilities import annuity
 from resilience_stats.models import ResilienceModel, ERPMeta, ERPOutageInputs, ERPGeneratorInputs, ERPPrimeGeneratorInputs, ERPPVInputs, ERPWindInputs, ERPElectricStorageInputs, ERPOutputs
 from resilience_stats.outage_simulator_LF import simulate_outages
+from resilience_stats.tasks import queue_bau_outage_sim
 import numpy as np
 from reo.utilities import empty_record
 from django.views.decorators.http import require_http_methods
@@ -239,9 +240,22 @@ def resilience_stats(request: Union[Dict, HttpRequest], run_uuid=None):
 
             if bau and results[
                 "probs_of_surviving_bau"] is None:  # then need to run outage_sim with existing sizes (BAU)
-                bau_results = run_outage_sim(run_uuid, with_tech=False, bau=bau)
-                ResilienceModel.objects.filter(id=rm.id).update(**bau_results)
-                results.update(bau_results)
+                # run in a celery task, which concurrent requests for the same run_uuid share
+                progress = queue_bau_outage_sim(rm.scenariomodel_id, run_uuid)
+                rm.refresh_from_db()  # the task has already finished if celery is eager
+                if rm.probs_of_surviving_bau is None:
+                    if progress is not None and progress["status"] == "Error":
+                        return JsonResponse({"Error": progress["error"]}, status=500)
+                    response = JsonResponse({
+                        "run_uuid": run_uuid,
+                        "outage_sim_bau_progress": progress,
+                        "Message": "The business-as-usual outage simulation is running. Please try again later."
+                    }, content_type='application/json', status=202)
+                    response["Retry-After"] = "5"
+                    return response
+                results = model_to_dict(rm)
+                del results['scenariomodel']
+                del results['id']
 
             if not bau:  # remove BAU results from results dict (if they're there)
                 filtered_dict = {k: v for k, v in results.items() if "_bau" not in k}